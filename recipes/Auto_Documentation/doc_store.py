@@ -0,0 +1,259 @@
+"""
+Incremental re-documentation driven by normalized-AST hashes.
+
+The notebook regenerates documentation for every function on every run. This
+module keeps a docs store keyed by a hash of each function's normalized AST,
+so edits to whitespace, comments or docstrings don't count as changes. A
+function's key also covers the keys of the functions it calls, so it is
+re-documented when a callee changes behaviour. Only functions without a
+stored entry are sent to the model, and the results are spliced back into the
+generated Markdown file between per-function markers, leaving the rest of the
+file alone.
+
+Example:
+    store = DocStore("docs_store.json")
+    functions = extract_functions(repo_packer.read_repo_files("utils/src"))
+    redocument(functions, store, invoke)
+    update_markdown("API.md", functions, store)
+"""
+import ast
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+FUNCTION_PROMPT = """{path}
+```python
+{source}
+```
+
+Provide detailed developer documentation for the function `{name}` provided above.
+
+Response Template:
+## `{name}`
+
+* _param1_: (type) description"
+
+Synopsis of the function
+
+_**returns**_:
+"""
+
+SECTION_RE = re.compile(r"<!-- doc:(?P<id>\S+) -->\n.*?<!-- /doc:(?P=id) -->\n?", re.DOTALL)
+
+
+def _strip_docstring(node: ast.AST) -> ast.AST:
+    """Drop a leading docstring from a function or class body, in place."""
+    body = getattr(node, "body", None)
+    if (body and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)):
+        node.body = body[1:] or [ast.Pass()]
+    return node
+
+
+def normalized_hash(node: ast.AST) -> str:
+    """Hash a function's AST, ignoring positions, comments and docstrings.
+
+    Comments and whitespace never reach the AST, and `ast.dump` leaves out
+    line and column attributes by default, so only docstrings need stripping.
+    Nested functions and classes are normalized the same way.
+    """
+    node = ast.parse(ast.unparse(node)).body[0]  # work on a copy
+    for child in ast.walk(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            _strip_docstring(child)
+    return hashlib.sha256(ast.dump(node).encode("utf-8")).hexdigest()
+
+
+def _called_names(node: ast.AST) -> set[str]:
+    """Return the simple names of everything a function calls."""
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            if isinstance(child.func, ast.Name):
+                names.add(child.func.id)
+            elif isinstance(child.func, ast.Attribute):
+                names.add(child.func.attr)
+    return names
+
+
+def extract_functions(files: list[dict]) -> list[dict]:
+    """Collect top-level functions and methods from Python files.
+
+    Each entry has an `id` (`path::Class.method`), the function `name`, its
+    `source`, its own `hash`, and the simple names it calls. Files that
+    don't parse are skipped.
+    """
+    functions = []
+    for file in files:
+        if not file["path"].endswith(".py"):
+            continue
+        try:
+            tree = ast.parse(file["content"])
+        except SyntaxError:
+            print(f"  Skipping {file['path']}: not valid Python")
+            continue
+
+        scopes = [("", tree)]
+        scopes += [(node.name + ".", node) for node in tree.body if isinstance(node, ast.ClassDef)]
+        for prefix, scope in scopes:
+            for node in scope.body:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    functions.append({
+                        "id": f"{file['path']}::{prefix}{node.name}",
+                        "path": file["path"],
+                        "name": prefix + node.name,
+                        "source": ast.get_source_segment(file["content"], node),
+                        "hash": normalized_hash(node),
+                        "calls": _called_names(node),
+                    })
+    return functions
+
+
+def _components(functions: list[dict], callees: dict[str, list[dict]]) -> list[list[dict]]:
+    """Tarjan's strongly connected components of the call graph, callees before callers."""
+    index, low, on_stack, stack, components = {}, {}, set(), [], []
+
+    def visit(function):
+        index[function["id"]] = low[function["id"]] = len(index)
+        stack.append(function)
+        on_stack.add(function["id"])
+        for callee in callees[function["id"]]:
+            if callee["id"] not in index:
+                visit(callee)
+                low[function["id"]] = min(low[function["id"]], low[callee["id"]])
+            elif callee["id"] in on_stack:
+                low[function["id"]] = min(low[function["id"]], index[callee["id"]])
+        if low[function["id"]] == index[function["id"]]:
+            component = []
+            while not component or component[-1] is not function:
+                component.append(stack.pop())
+                on_stack.discard(component[-1]["id"])
+            components.append(component)
+
+    for function in functions:
+        if function["id"] not in index:
+            visit(function)
+    return components
+
+
+def assign_keys(functions: list[dict]) -> None:
+    """Set each function's store `key` from its own hash and its callees' keys.
+
+    Calls are resolved by simple name against the extracted functions, which
+    is approximate but errs towards re-documenting. Mutually recursive
+    functions form a strongly connected component, which is keyed by the
+    sorted hashes of its members and the keys of the functions it calls
+    outside itself, so the keys don't depend on the order functions are
+    visited in. A change to any member re-documents the whole component.
+    """
+    by_name = {}
+    for function in functions:
+        by_name.setdefault(function["name"].rsplit(".", 1)[-1], []).append(function)
+    callees = {
+        function["id"]: [callee for name in sorted(function["calls"]) for callee in by_name.get(name, [])
+                         if callee["id"] != function["id"]]
+        for function in functions
+    }
+
+    keys = {}
+    for component in _components(functions, callees):
+        members = {function["id"] for function in component}
+        external_keys = {keys[callee["id"]] for function in component for callee in callees[function["id"]]
+                         if callee["id"] not in members}
+        parts = sorted(function["hash"] for function in component) + sorted(external_keys)
+        component_key = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        for function in component:
+            if len(component) == 1:
+                keys[function["id"]] = component_key
+            else:
+                digest = hashlib.sha256(f"{component_key}\n{function['hash']}".encode("utf-8"))
+                keys[function["id"]] = digest.hexdigest()
+
+    for function in functions:
+        function["key"] = keys[function["id"]]
+
+
+class DocStore:
+    """A JSON file mapping function keys to generated Markdown."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.docs = {}
+        if self.path.exists():
+            self.docs = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.docs
+
+    def get(self, key: str) -> str | None:
+        return self.docs.get(key)
+
+    def put(self, key: str, markdown: str) -> None:
+        self.docs[key] = markdown
+
+    def prune(self, keys: set[str]) -> None:
+        """Forget entries for functions that no longer exist."""
+        self.docs = {key: doc for key, doc in self.docs.items() if key in keys}
+
+    def save(self) -> None:
+        self.path.write_text(json.dumps(self.docs, indent=2), encoding="utf-8")
+
+
+def stale_functions(functions: list[dict], store: DocStore) -> list[dict]:
+    """Return the functions whose key has no stored documentation."""
+    assign_keys(functions)
+    return [function for function in functions if function["key"] not in store]
+
+
+def redocument(functions: list[dict], store: DocStore, invoke, max_workers: int = 4) -> list[dict]:
+    """Generate documentation for stale functions only and save the store.
+
+    `invoke` takes a prompt and returns generated text. Returns the functions
+    that were re-documented.
+    """
+    stale = stale_functions(functions, store)
+    print(f"{len(stale)} of {len(functions)} functions need documentation")
+
+    prompts = [FUNCTION_PROMPT.format(**function) for function in stale]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for function, markdown in zip(stale, pool.map(invoke, prompts)):
+            store.put(function["key"], markdown.strip())
+
+    store.prune({function["key"] for function in functions})
+    store.save()
+    return stale
+
+
+def splice_markdown(text: str, sections: dict[str, str]) -> str:
+    """Replace marked per-function sections in `text`, in order.
+
+    Sections present in `text` but missing from `sections` are removed; new
+    sections are appended at the end. Anything outside the markers, such as a
+    hand-written introduction, is kept as is.
+    """
+    remaining = dict(sections)
+
+    def replace(match):
+        markdown = remaining.pop(match.group("id"), None)
+        if markdown is None:
+            return ""
+        return f"<!-- doc:{match.group('id')} -->\n{markdown}\n<!-- /doc:{match.group('id')} -->\n"
+
+    text = SECTION_RE.sub(replace, text)
+    for function_id, markdown in remaining.items():
+        if text and not text.endswith("\n"):
+            text += "\n"
+        text += f"<!-- doc:{function_id} -->\n{markdown}\n<!-- /doc:{function_id} -->\n"
+    return text
+
+
+def update_markdown(path: str | Path, functions: list[dict], store: DocStore) -> None:
+    """Splice the stored documentation for `functions` into a Markdown file."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8") if path.exists() else ""
+    sections = {function["id"]: store.get(function["key"]) for function in functions
+                if function["key"] in store}
+    path.write_text(splice_markdown(text, sections), encoding="utf-8")
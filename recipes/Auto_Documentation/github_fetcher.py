@@ -0,0 +1,218 @@
+"""
+Fetch a GitHub directory through the contents API, concurrently and with an HTTP cache.
+
+The notebook's `get_github_repo_contents` downloads the listing and then every
+file one after another, sleeping between calls and opening a new connection
+each time, and downloads everything again on the next run. `GitHubFetcher`
+instead:
+
+- shares one pooled `requests.Session` between all requests and runs up to
+  `max_concurrency` of them at a time on asyncio worker threads;
+- keeps an on-disk cache of responses with their `ETag`s and sends
+  `If-None-Match`, so unchanged listings come back as empty 304 responses,
+  which GitHub doesn't count against the rate limit;
+- skips the download of any file whose git blob `sha` (from the listing) is
+  already cached, since the same sha means the same content; and
+- honours `X-RateLimit-Remaining`/`X-RateLimit-Reset` and `Retry-After`,
+  pausing all requests until the limit resets instead of failing.
+
+    files = fetch_repo_files("ibm-granite-community/utils", "src", github_token=token)
+    prompt = "\\n\\n".join(format_file(file) for file in files)
+
+`files` has the same shape as `repo_packer.read_repo_files`, so it can go
+straight into `pack_files`. `api_url` can point at a local server that mimics
+the contents API, for testing without network access or rate limits.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from repo_packer import format_file
+
+API_URL = "https://api.github.com"
+CACHE_DIR = Path(".github_cache")
+
+# Don't use the last few requests of the quota; wait for the reset instead.
+RATE_LIMIT_RESERVE = 2
+
+
+class RateLimitError(RuntimeError):
+    """The rate limit is exhausted and resets later than `max_wait` allows."""
+
+
+class GitHubFetcher:
+    """Fetch repository contents with bounded concurrency and conditional requests."""
+
+    def __init__(self, github_token: str | None = None, cache_dir: str | Path = CACHE_DIR,
+                 max_concurrency: int = 8, api_url: str = API_URL, max_wait: float = 900):
+        self.api_url = api_url.rstrip("/")
+        self.cache_dir = Path(cache_dir)
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if github_token is not None:
+            self.session.headers["Authorization"] = f"token {github_token}"
+        self.paused_until = 0.0
+        self.stats = {"requests": 0, "not_modified": 0, "blob_hits": 0, "bytes": 0, "rate_limit_waits": 0}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- cache ---
+
+    def _cache_paths(self, key: str) -> tuple[Path, Path]:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json", self.cache_dir / f"{digest}.body"
+
+    def _cached(self, key: str) -> tuple[dict | None, bytes | None]:
+        meta_path, body_path = self._cache_paths(key)
+        if not (meta_path.exists() and body_path.exists()):
+            return None, None
+        return json.loads(meta_path.read_text(encoding="utf-8")), body_path.read_bytes()
+
+    def _store(self, key: str, meta: dict, body: bytes) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._cache_paths(key)
+        # Body first, so a metadata file never points at a missing or partial body.
+        body_path.write_bytes(body)
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    # --- requests ---
+
+    def _wait_time(self, response: requests.Response) -> float | None:
+        """Seconds to wait before retrying, or None if the response isn't rate limited."""
+        headers = response.headers
+        if response.status_code in (403, 429):
+            if "Retry-After" in headers:
+                return float(headers["Retry-After"])
+            if headers.get("X-RateLimit-Remaining") == "0":
+                return max(float(headers.get("X-RateLimit-Reset", 0)) - time.time(), 0) + 1
+        return None
+
+    def _note_rate_limit(self, response: requests.Response) -> None:
+        """Pause further requests once the remaining quota is nearly used up."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None and int(remaining) <= RATE_LIMIT_RESERVE:
+            self.paused_until = max(self.paused_until, float(reset) + 1)
+
+    async def _pause(self, seconds: float) -> None:
+        if seconds > self.max_wait:
+            raise RateLimitError(f"GitHub rate limit exceeded; it resets in {seconds:.0f}s")
+        self.stats["rate_limit_waits"] += 1
+        await asyncio.sleep(seconds)
+
+    async def get(self, url: str, semaphore: asyncio.Semaphore, cache_key: str | None = None) -> bytes:
+        """GET a URL through the ETag cache, retrying after rate limiting."""
+        cache_key = cache_key or url
+        meta, body = self._cached(cache_key)
+        headers = {}
+        if meta is not None and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        elif meta is not None and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        while True:
+            if self.paused_until > time.time():
+                await self._pause(self.paused_until - time.time())
+            async with semaphore:
+                response = await asyncio.to_thread(self.session.get, url, headers=headers, timeout=30)
+            self.stats["requests"] += 1
+            self._note_rate_limit(response)
+            wait = self._wait_time(response)
+            if wait is None:
+                break
+            self.paused_until = max(self.paused_until, time.time() + wait)
+
+        if response.status_code == 304 and body is not None:
+            self.stats["not_modified"] += 1
+            return body
+        response.raise_for_status()
+        self.stats["bytes"] += len(response.content)
+        self._store(cache_key, {"url": url, "etag": response.headers.get("ETag"),
+                                "last_modified": response.headers.get("Last-Modified")}, response.content)
+        return response.content
+
+    async def _file(self, item: dict, semaphore: asyncio.Semaphore) -> dict:
+        # Cached by blob sha rather than URL: a known sha needs no request at all.
+        blob_key = f"blob:{item['sha']}"
+        meta, body = self._cached(blob_key)
+        if body is None:
+            body = await self.get(item["download_url"], semaphore, cache_key=blob_key)
+        else:
+            self.stats["blob_hits"] += 1
+        return {"path": item["path"], "content": body.decode("utf-8", errors="ignore")}
+
+    async def fetch_directory(self, repo: str, directory: str = "", ref: str | None = None,
+                              suffixes: set[str] | None = None,
+                              semaphore: asyncio.Semaphore | None = None) -> list[dict]:
+        """Fetch every file under `directory`, recursing into subdirectories concurrently."""
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        url = f"{self.api_url}/repos/{repo}/contents/{directory}"
+        if ref is not None:
+            url += f"?ref={ref}"
+        listing = json.loads(await self.get(url, semaphore))
+
+        tasks = []
+        for item in listing:
+            if item["type"] == "file":
+                if suffixes is None or Path(item["name"]).suffix in suffixes:
+                    tasks.append(self._file(item, semaphore))
+            elif item["type"] == "dir":
+                tasks.append(self.fetch_directory(repo, item["path"], ref, suffixes, semaphore))
+        files = []
+        for result in await asyncio.gather(*tasks):
+            files.extend(result if isinstance(result, list) else [result])
+        return sorted(files, key=lambda file: file["path"])
+
+
+def fetch_repo_files(repo: str, directory: str = "", github_token: str | None = None,
+                     verbose: bool = True, **fetcher_kwargs) -> list[dict]:
+    """Fetch a repository directory as a list of {"path", "content"} dicts.
+
+    Runs its own event loop, so call `GitHubFetcher.fetch_directory` directly
+    from code (such as a notebook cell) that is already inside one.
+    """
+    with GitHubFetcher(github_token, **fetcher_kwargs) as fetcher:
+        files = asyncio.run(fetcher.fetch_directory(repo, directory))
+        if verbose:
+            print_stats(fetcher.stats)
+    return files
+
+
+def print_stats(stats: dict, file=None) -> None:
+    print(f"GitHub: {stats['requests']} requests ({stats['not_modified']} not modified), "
+          f"{stats['blob_hits']} files unchanged, {stats['bytes'] / 1024:.1f} KiB downloaded, "
+          f"{stats['rate_limit_waits']} rate-limit waits", file=file)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="Fetch a GitHub directory and print it as the notebook's prompt.")
+    parser.add_argument("repo", help="owner/name, e.g. ibm-granite-community/utils")
+    parser.add_argument("directory", nargs="?", default="")
+    parser.add_argument("--api-url", default=API_URL)
+    args = parser.parse_args()
+
+    with GitHubFetcher(os.environ.get("GITHUB_TOKEN"), api_url=args.api_url) as fetcher:
+        files = asyncio.run(fetcher.fetch_directory(args.repo, args.directory))
+        print_stats(fetcher.stats, file=sys.stderr)
+    print("\n\n".join(format_file(file) for file in files))
@@ -0,0 +1,264 @@
+"""
+Pack a repository into context-sized documentation requests.
+
+The notebook fetches a repository one file at a time, concatenates everything
+into a single prompt and only then counts tokens, which can exceed the 128k
+context window of granite-8b-code-instruct-128k. This module instead reads a
+local checkout (or a cached tarball of one), counts tokens per file in
+parallel, and bin-packs the files into groups that each fit the context
+budget. Python files that import each other are kept in the same group where
+possible, so the model sees a function together with the code it calls.
+
+Example:
+    from transformers import AutoTokenizer
+    import replicate
+
+    tokenizer = AutoTokenizer.from_pretrained("ibm-granite/granite-8B-Code-instruct-128k")
+    files = read_repo_files("utils/src")
+    groups = pack_files(files, TokenCounter(tokenizer))
+
+    def invoke(prompt):
+        return "".join(replicate.run("ibm-granite/granite-8b-code-instruct-128k",
+                                     input={"prompt": prompt, "max_tokens": 10000}))
+
+    docs = document_groups(groups, invoke)
+"""
+import ast
+import hashlib
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+# Context window of granite-8b-code-instruct-128k, minus room for the
+# instructions and the generated documentation.
+CONTEXT_TOKENS = 128_000
+RESERVED_TOKENS = 12_000
+
+SOURCE_SUFFIXES = {".py", ".js", ".ts", ".java", ".go", ".sh", ".md"}
+
+LANGUAGES = {
+    "py": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "sh": "bash",
+    "md": "markdown",
+}
+
+DOC_INSTRUCTIONS = """
+
+Provide detailed developer documentation for each function provided above.
+
+Response Template:
+## `function_name`
+
+* _param1_: (type) description"
+
+Synopsis of the function
+
+_**returns**_:
+"""
+
+
+def read_repo_files(source: str | Path, directory: str = "") -> list[dict]:
+    """Read source files from a local checkout or a tarball of one.
+
+    Only files under `directory` (relative to the repository root) with a
+    suffix in SOURCE_SUFFIXES are returned. Tarballs downloaded from GitHub
+    contain a single top-level folder, which is stripped from the paths.
+    """
+    source = Path(source)
+    files = []
+
+    if source.is_dir():
+        root = source / directory
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and path.suffix in SOURCE_SUFFIXES:
+                files.append({
+                    "path": path.relative_to(source).as_posix(),
+                    "content": path.read_text(encoding="utf-8", errors="ignore"),
+                })
+        return files
+
+    with tarfile.open(source) as tar:
+        members = [m for m in tar.getmembers() if m.isfile()]
+        prefix = _common_prefix([m.name for m in members])
+        for member in sorted(members, key=lambda m: m.name):
+            rel_path = member.name[len(prefix):]
+            # is_relative_to compares whole components, so "src" doesn't match "src_old/".
+            if not PurePosixPath(rel_path).is_relative_to(directory):
+                continue
+            if Path(rel_path).suffix not in SOURCE_SUFFIXES:
+                continue
+            content = tar.extractfile(member).read().decode("utf-8", errors="ignore")
+            files.append({"path": rel_path, "content": content})
+    return files
+
+
+def _common_prefix(names: list[str]) -> str:
+    """Return the single top-level folder shared by all tarball members, if any."""
+    tops = {name.split("/", 1)[0] for name in names if "/" in name}
+    if len(tops) == 1 and all("/" in name for name in names):
+        return tops.pop() + "/"
+    return ""
+
+
+def format_file(file: dict) -> str:
+    """Format a file the same way the notebook does: path, then a fenced code block."""
+    language = file["path"].rsplit(".", 1)[-1]
+    language = LANGUAGES.get(language, language)
+    return f"{file['path']}\n```{language}\n{file['content']}\n```"
+
+
+class TokenCounter:
+    """Count tokens with a Hugging Face tokenizer, memoized by content hash.
+
+    Identical files (vendored copies, `__init__.py` boilerplate) are only
+    tokenized once per counter. The cache lives in memory only, so reuse one
+    counter across `pack_files` calls in a session to skip unchanged files.
+    """
+
+    def __init__(self, tokenizer, max_workers: int = 8):
+        self.tokenizer = tokenizer
+        self.max_workers = max_workers
+        self.cache = {}
+
+    def count(self, text: str) -> int:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in self.cache:
+            self.cache[key] = len(self.tokenizer.tokenize(text))
+        return self.cache[key]
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        """Count tokens for several texts in parallel.
+
+        Fast tokenizers release the GIL in their Rust core, so threads give a
+        real speedup without the cost of pickling the tokenizer to processes.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(self.count, texts))
+
+
+def _module_name(path: str) -> str:
+    """Turn `src/pkg/mod.py` into `pkg.mod` style suffixes for import matching."""
+    parts = path[:-len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _imported_modules(content: str) -> set[str]:
+    """Return the dotted names a Python file imports; empty if it doesn't parse."""
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return set()
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return names
+
+
+def dependency_components(files: list[dict]) -> list[list[int]]:
+    """Group file indexes into connected components of the local import graph."""
+    parent = list(range(len(files)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    modules = {}
+    for i, file in enumerate(files):
+        if file["path"].endswith(".py"):
+            modules[_module_name(file["path"])] = i
+
+    for i, file in enumerate(files):
+        if not file["path"].endswith(".py"):
+            continue
+        for name in _imported_modules(file["content"]):
+            # Match on dotted suffix so `from pkg import mod` finds `src/pkg/mod.py`.
+            for module, j in modules.items():
+                if module == name or module.endswith("." + name):
+                    parent[find(i)] = find(j)
+
+    components = {}
+    for i in range(len(files)):
+        components.setdefault(find(i), []).append(i)
+    return list(components.values())
+
+
+def pack_files(files: list[dict], counter: TokenCounter,
+               budget: int = CONTEXT_TOKENS - RESERVED_TOKENS) -> list[list[dict]]:
+    """Bin-pack files into groups whose formatted text fits in `budget` tokens.
+
+    Dependency components are packed first-fit decreasing, so related files
+    share a request. A component larger than the budget is split file by file;
+    a single file larger than the budget gets a group of its own and is
+    reported so it can be trimmed.
+    """
+    formatted = [format_file(file) for file in files]
+    tokens = counter.count_many(formatted)
+
+    items = []
+    for component in dependency_components(files):
+        size = sum(tokens[i] for i in component)
+        if size <= budget:
+            items.append((size, component))
+        else:
+            items.extend((tokens[i], [i]) for i in component)
+    items.sort(key=lambda item: item[0], reverse=True)
+
+    bins = []  # [used_tokens, [file indexes]]
+    for size, indexes in items:
+        if size > budget:
+            print(f"  Warning: {files[indexes[0]]['path']} has {size} tokens, over the {budget} budget")
+        for bin_ in bins:
+            if bin_[0] + size <= budget:
+                bin_[0] += size
+                bin_[1].extend(indexes)
+                break
+        else:
+            bins.append([size, list(indexes)])
+
+    return [[files[i] for i in sorted(indexes)] for _, indexes in bins]
+
+
+def build_prompt(group: list[dict]) -> str:
+    """Build the documentation prompt for one packed group."""
+    return "\n\n".join(format_file(file) for file in group) + DOC_INSTRUCTIONS
+
+
+def document_groups(groups: list[list[dict]], invoke, max_workers: int = 4) -> list[str]:
+    """Send one documentation request per group concurrently.
+
+    `invoke` takes a prompt and returns the generated text, e.g. a wrapper
+    around `replicate.run` or a LangChain LLM's `invoke`. Results are returned
+    in the same order as `groups`.
+    """
+    prompts = [build_prompt(group) for group in groups]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(invoke, prompts))
+
+
+if __name__ == "__main__":
+    import sys
+    from transformers import AutoTokenizer
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "."
+    directory = sys.argv[2] if len(sys.argv) > 2 else ""
+
+    tokenizer = AutoTokenizer.from_pretrained("ibm-granite/granite-8B-Code-instruct-128k")
+    counter = TokenCounter(tokenizer)
+    files = read_repo_files(source, directory)
+    groups = pack_files(files, counter)
+
+    print(f"Packed {len(files)} files into {len(groups)} requests")
+    for i, group in enumerate(groups):
+        size = sum(counter.count(format_file(file)) for file in group)
+        print(f"  Request {i + 1}: {len(group)} files, {size} tokens")
@@ -0,0 +1,131 @@
+# Tests for github_fetcher.py against a local stub of the GitHub contents API (no network access).
+# Run with: python -m pytest test_github_fetcher.py (or python -m unittest test_github_fetcher)
+
+import asyncio
+import hashlib
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from github_fetcher import GitHubFetcher
+
+
+class StubGitHub(ThreadingHTTPServer):
+    """Serves a repository's listings with ETags, and its files as raw downloads, logging every request."""
+
+    def __init__(self, files: dict[str, str]):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.files = files
+        self.log = []  # (path, status)
+        self.throttle = 0  # answer this many requests with 429 first
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def listing(self, directory: str) -> list[dict]:
+        items, subdirectories = [], set()
+        for path, content in sorted(self.files.items()):
+            parent, _, name = path.rpartition("/")
+            if parent == directory:
+                sha = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                items.append({"type": "file", "name": name, "path": path, "sha": sha,
+                              "download_url": f"{self.url}/raw/{path}"})
+            elif parent.startswith(directory + "/"):
+                subdirectories.add(parent[:len(directory) + 1] + parent[len(directory) + 1:].split("/")[0])
+        items += [{"type": "dir", "name": path.rsplit("/", 1)[-1], "path": path} for path in sorted(subdirectories)]
+        return items
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        if server.throttle:
+            server.throttle -= 1
+            return self.respond(429, b"", {"Retry-After": "1"})
+        if self.path.startswith("/raw/"):
+            path = self.path[len("/raw/"):]
+            if path not in server.files:
+                return self.respond(404, b"")
+            return self.respond(200, server.files[path].encode("utf-8"))
+        directory = self.path.split("/contents/", 1)[1].split("?")[0]
+        body = json.dumps(server.listing(directory)).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.respond(304, b"", {"ETag": etag})
+        self.respond(200, body, {"ETag": etag})
+
+    def respond(self, status: int, body: bytes, headers: dict | None = None):
+        self.server.log.append((self.path, status))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGitHubFetcher(unittest.TestCase):
+    """
+    A second run over an unchanged repository should cost only conditional
+    listing requests answered with 304, and a changed file only its own download.
+    """
+
+    def setUp(self):
+        self.server = StubGitHub({
+            "src/a.py": "def a():\n    return 1\n",
+            "src/b.py": "def b():\n    return 2\n",
+            "src/pkg/c.py": "def c():\n    return 3\n",
+        })
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache.cleanup()
+
+    def fetch(self) -> tuple[list[dict], dict, list[tuple[str, int]]]:
+        """Run a fresh fetcher over the shared cache; return its files, stats and the requests it made."""
+        start = len(self.server.log)
+        with GitHubFetcher(cache_dir=self.cache.name, api_url=self.server.url, max_concurrency=2) as fetcher:
+            files = asyncio.run(fetcher.fetch_directory("owner/repo", "src"))
+        return files, fetcher.stats, self.server.log[start:]
+
+    def test_second_run_makes_only_304_requests(self):
+        first, stats, log = self.fetch()
+        self.assertEqual([(file["path"], file["content"]) for file in first], sorted(self.server.files.items()))
+        self.assertEqual(sum(path.startswith("/raw/") for path, _ in log), 3)
+
+        second, stats, log = self.fetch()
+        self.assertEqual(second, first)
+        self.assertEqual(len(log), 2)  # the src and src/pkg listings
+        self.assertTrue(all(status == 304 and "/contents/" in path for path, status in log), log)
+        self.assertEqual(stats["not_modified"], 2)
+        self.assertEqual(stats["blob_hits"], 3)
+        self.assertEqual(stats["bytes"], 0)
+
+    def test_changed_file_is_the_only_download(self):
+        self.fetch()
+        self.server.files["src/pkg/c.py"] = "def c():\n    return 4\n"
+        files, stats, log = self.fetch()
+        self.assertEqual(dict((file["path"], file["content"]) for file in files), self.server.files)
+        self.assertEqual([path for path, _ in log if path.startswith("/raw/")], ["/raw/src/pkg/c.py"])
+        self.assertIn(("/repos/owner/repo/contents/src", 304), log)
+        self.assertEqual(stats["blob_hits"], 2)
+
+    def test_retries_after_rate_limiting(self):
+        self.server.throttle = 2
+        files, stats, log = self.fetch()
+        self.assertEqual(len(files), 3)
+        self.assertEqual([status for _, status in log].count(429), 2)
+        self.assertEqual(stats["rate_limit_waits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
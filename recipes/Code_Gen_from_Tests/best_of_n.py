@@ -0,0 +1,238 @@
+"""
+Best-of-N code generation with test-driven selection.
+
+The notebook makes a single call to the model, writes the answer to
+`rational/rational.py` and runs the Hypothesis tests once. This script
+instead generates N candidates concurrently, runs each one against
+`test_rational.py` in its own worker process and stops at the first
+candidate that passes the full suite. Each candidate goes through cheap
+stages first (does it import? does it pass with a handful of Hypothesis
+examples?) so broken candidates are rejected quickly. If no candidate
+passes, the failure output of the best attempt is added to the prompt for
+the next round.
+
+The model backend is anything with an `invoke(prompt) -> str` method, such as
+the notebook's `granite_via_replicate`. `StubModel` returns canned candidates
+so the loop can run offline:
+
+    python best_of_n.py --stub rational-good-example.py
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+TESTS_FILE = Path("test_rational.py")
+
+PROMPT_TEMPLATE = """
+Here is the Hypothesis test code:
+```Python
+{tests}
+```
+
+Print Python code that makes the test code pass.
+"""
+
+FEEDBACK_TEMPLATE = """
+A previous attempt failed these tests:
+```
+{failures}
+```
+
+Fix the problems and print the complete corrected Python code.
+"""
+
+# Each stage runs the tests with a Hypothesis profile; cheap stages come first
+# so most bad candidates never reach the full run.
+RUNNER = """
+import sys, unittest
+from hypothesis import settings
+settings.register_profile("stage", max_examples=int(sys.argv[1]), deadline=None)
+settings.load_profile("stage")
+import {module}
+unittest.main(module={module}, argv=["tests", "-f"], exit=True)
+"""
+
+STAGES = [
+    ("import", None),
+    ("fast", 10),
+    ("full", 100),
+]
+
+
+class StubModel:
+    """A model backend that returns canned candidates in turn."""
+
+    def __init__(self, candidates: list[str]):
+        self.candidates = candidates
+        self.calls = 0
+
+    @classmethod
+    def from_files(cls, paths: list[str | Path]) -> "StubModel":
+        return cls([Path(path).read_text(encoding="utf-8") for path in paths])
+
+    def invoke(self, prompt: str) -> str:
+        candidate = self.candidates[self.calls % len(self.candidates)]
+        self.calls += 1
+        return candidate
+
+
+def extract_code(response: str) -> str:
+    """Return the first fenced code block in a response, or the whole response."""
+    match = re.search(r"```(?:[Pp]ython)?\n(.*?)```", response, re.DOTALL)
+    return match.group(1) if match else response
+
+
+class Cancellation:
+    """Kills the test processes of the candidates still running once one has passed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processes = set()
+        self.cancelled = False
+
+    def start(self, command: list[str], **kwargs) -> subprocess.Popen | None:
+        """Start a stage's process, or return None if the round is already over."""
+        with self.lock:
+            if self.cancelled:
+                return None
+            proc = subprocess.Popen(command, **kwargs)
+            self.processes.add(proc)
+            return proc
+
+    def finish(self, proc: subprocess.Popen) -> None:
+        with self.lock:
+            self.processes.discard(proc)
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled = True
+            for proc in self.processes:
+                proc.kill()
+
+
+def run_candidate(code: str, tests_file: Path, timeout: float = 120,
+                  cancellation: Cancellation | None = None) -> dict:
+    """Run one candidate through the test stages in an isolated directory.
+
+    The candidate is written to `rational/rational.py` next to a copy of the
+    tests, mirroring the notebook layout, and each stage runs in a fresh
+    Python process so candidates can't interfere with each other or with us.
+    If `cancellation` is cancelled, the running stage is killed and the
+    candidate is reported at stage "cancelled".
+    """
+    cancellation = cancellation or Cancellation()
+    workdir = Path(tempfile.mkdtemp(prefix="candidate_"))
+    try:
+        package = workdir / "rational"
+        package.mkdir()
+        (package / "__init__.py").write_text("from .rational import Rational\n")
+        (package / "rational.py").write_text(code, encoding="utf-8")
+        shutil.copy(tests_file, workdir / tests_file.name)
+        module = tests_file.stem
+
+        for stage, max_examples in STAGES:
+            if max_examples is None:
+                command = [sys.executable, "-c", "import rational"]
+            else:
+                command = [sys.executable, "-c", RUNNER.format(module=module), str(max_examples)]
+            proc = cancellation.start(command, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                      text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+            if proc is None:
+                return {"passed": False, "stage": "cancelled", "output": ""}
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                return {"passed": False, "stage": stage, "output": f"Timed out after {timeout}s"}
+            finally:
+                cancellation.finish(proc)
+            if cancellation.cancelled:
+                return {"passed": False, "stage": "cancelled", "output": ""}
+            if proc.returncode != 0:
+                return {"passed": False, "stage": stage, "output": (stdout + stderr)[-4000:]}
+        return {"passed": True, "stage": "full", "output": ""}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def best_of_n(model, tests_file: Path = TESTS_FILE, n: int = 4, rounds: int = 3,
+              max_workers: int | None = None) -> dict | None:
+    """Generate and test candidates until one passes the full test suite.
+
+    Returns a dict with the passing `code`, its `round` and candidate `index`,
+    or None if every round fails.
+    """
+    tests = tests_file.read_text(encoding="utf-8")
+    prompt = PROMPT_TEMPLATE.format(tests=tests)
+    stage_rank = {stage: rank for rank, (stage, _) in enumerate(STAGES)}
+    max_workers = max_workers or n
+
+    for round_ in range(1, rounds + 1):
+        print(f"=== Round {round_}: generating {n} candidates ===")
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            candidates = [extract_code(response)
+                          for response in pool.map(lambda _: model.invoke(prompt), range(n))]
+
+        best = None
+        cancellation = Cancellation()
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {pool.submit(run_candidate, code, tests_file, cancellation=cancellation): i
+                       for i, code in enumerate(candidates)}
+            for future in as_completed(futures):
+                i = futures[future]
+                result = future.result()
+                print(f"  Candidate {i}: {'passed' if result['passed'] else 'failed at ' + result['stage']}")
+                if result["passed"]:
+                    return {"code": candidates[i], "round": round_, "index": i}
+                if best is None or stage_rank[result["stage"]] > stage_rank[best["stage"]]:
+                    best = result
+        finally:
+            # Stop at the first pass: kill the other candidates' test processes rather than waiting for them.
+            cancellation.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        prompt = PROMPT_TEMPLATE.format(tests=tests) + FEEDBACK_TEMPLATE.format(failures=best["output"])
+
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tests", type=Path, default=TESTS_FILE, help="Hypothesis test file")
+    parser.add_argument("-n", type=int, default=4, help="candidates per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--stub", nargs="+", metavar="FILE",
+                        help="run offline, returning these files as candidates")
+    parser.add_argument("--output", type=Path, default=Path("rational/rational.py"))
+    args = parser.parse_args()
+
+    if args.stub:
+        model = StubModel.from_files(args.stub)
+    else:
+        from langchain_community.llms import Replicate
+        from ibm_granite_community.notebook_utils import get_env_var
+
+        model = Replicate(
+            model="ibm-granite/granite-8b-code-instruct-128k",
+            model_kwargs={"max_tokens": 2000, "temperature": 0.3, "top_p": 0.3},
+            replicate_api_token=get_env_var("REPLICATE_API_TOKEN"),
+        )
+
+    winner = best_of_n(model, args.tests, n=args.n, rounds=args.rounds)
+    if winner is None:
+        print("No candidate passed the tests")
+        sys.exit(1)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    (args.output.parent / "__init__.py").write_text("from .rational import Rational\n")
+    args.output.write_text(winner["code"], encoding="utf-8")
+    print(f"Round {winner['round']}, candidate {winner['index']} passed; saved to {args.output}")
@@ -1,13 +1,29 @@
 from math import gcd
+from numbers import Rational as RationalABC
+import sys
+
+# Modulus used by Python's numeric hash, so equal ints, Fractions, floats and
+# Rationals all hash the same way.
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_INF = sys.hash_info.inf
+
 
 class Rational:
     """
-    A class representing rational numbers. Note this implementation doesn't cover any 
-    algebraic operations, because the tests don't cover them either. This is left as
-    an exercise for you to do ;) However, it does correctly divide the numerator and
-    denominator by their greatest common divisor, "M", e.g., 
+    A class representing rational numbers. It divides the numerator and
+    denominator by their greatest common divisor, "M", e.g.,
     N/D == (M*N')/(M*D') == N'/D'
 
+    Because every instance is kept in this reduced form, equality doesn't need
+    to cross-multiply, and the arithmetic operators use the reduced operands to
+    skip or shrink the gcd of the result where the algebra allows, like
+    `fractions.Fraction` does. Ints and other `numbers.Rational` values, such as
+    `Fraction`, can be mixed with Rational in arithmetic and comparisons.
+
+    Note that the constructor keeps the sign where it was given, so
+    Rational(1, -2) has numerator 1 and denominator -2. Results of arithmetic
+    always have a positive denominator.
+
     Attributes:
         numerator (int): The numerator of the rational number.
         denominator (int): The denominator of the rational number.
@@ -16,8 +32,15 @@ class Rational:
         __init__(self, numerator, denominator): Initializes a Rational object with the given numerator and denominator.
         __str__(self): Returns a string representation of the Rational object.
         __eq__(self, other): Checks if two Rational objects are equal.
+        __hash__(self): Returns a hash consistent with int, float and fractions.Fraction.
+        __add__, __sub__, __mul__, __truediv__, __floordiv__, __mod__, __divmod__, __pow__ and their
+            reflected forms: Arithmetic, with // returning an int as it does for Fraction.
+        __lt__, __le__, __gt__, __ge__: Ordering comparisons.
+        __int__, __trunc__, __floor__, __ceil__, __float__: Conversions.
     """
 
+    __slots__ = ("numerator", "denominator")
+
     def __init__(self, numerator, denominator):
         """
         Initializes a Rational object with the given numerator and denominator.
@@ -36,6 +59,28 @@ class Rational:
         self.numerator = numerator // divisor
         self.denominator = denominator // divisor
 
+    def _signed(self):
+        """
+        Returns (numerator, denominator) with a positive denominator.
+        """
+        if self.denominator < 0:
+            return -self.numerator, -self.denominator
+        return self.numerator, self.denominator
+
+    @staticmethod
+    def _operand(other):
+        """
+        Returns other as (numerator, denominator) with a positive denominator,
+        or None if other is not an int or a rational number.
+        """
+        if isinstance(other, Rational):
+            return other._signed()
+        if isinstance(other, int):
+            return other, 1
+        if isinstance(other, RationalABC):
+            return other.numerator, other.denominator
+        return None
+
     def __str__(self):
         """
         Returns a string representation of the Rational object.
@@ -45,14 +90,310 @@ class Rational:
         """
         return f"{self.numerator}/{self.denominator}"
 
+    def __repr__(self):
+        return f"Rational({self.numerator}, {self.denominator})"
+
     def __eq__(self, other):
         """
         Checks if two Rational objects are equal.
 
+        Both values are in reduced form, so they are equal exactly when their
+        numerators and denominators match, up to the sign of both.
+
         Args:
             other (Rational): The other Rational object to compare with.
 
         Returns:
             bool: True if the two Rational objects are equal, False otherwise.
         """
-        return self.numerator * other.denominator == self.denominator * other.numerator
\ No newline at end of file
+        if isinstance(other, Rational):
+            if self.denominator == other.denominator:
+                return self.numerator == other.numerator
+            return self.denominator == -other.denominator and self.numerator == -other.numerator
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return self._signed() == operand
+
+    def __hash__(self):
+        """
+        Returns a hash equal to that of the int, float or fractions.Fraction
+        with the same value, using the same algorithm as Fraction.
+
+        Returns:
+            int: The hash value.
+        """
+        numerator, denominator = self.numerator, self.denominator
+        if denominator == 1:
+            return hash(numerator)
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        try:
+            inverse = pow(denominator, -1, _HASH_MODULUS)
+        except ValueError:
+            # The denominator is divisible by the modulus, so there's no inverse.
+            hash_ = _HASH_INF
+        else:
+            hash_ = hash(hash(abs(numerator)) * inverse)
+        result = hash_ if numerator >= 0 else -hash_
+        return -2 if result == -1 else result
+
+    def __add__(self, other):
+        if isinstance(other, Rational):
+            return _add(self.numerator, self.denominator, other.numerator, other.denominator)
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _add(self.numerator, self.denominator, *operand)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Rational):
+            return _add(self.numerator, self.denominator, -other.numerator, other.denominator)
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _add(self.numerator, self.denominator, -operand[0], operand[1])
+
+    def __rsub__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _add(operand[0], operand[1], -self.numerator, self.denominator)
+
+    def __mul__(self, other):
+        if isinstance(other, Rational):
+            return _mul(self.numerator, self.denominator, other.numerator, other.denominator)
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _mul(self.numerator, self.denominator, *operand)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        if operand[0] == 0:
+            raise ZeroDivisionError(f"Rational({self.numerator}, {self.denominator}) / 0")
+        return _mul(self.numerator, self.denominator, operand[1], operand[0])
+
+    def __rtruediv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        if self.numerator == 0:
+            raise ZeroDivisionError(f"{other} / Rational(0, 1)")
+        return _mul(operand[0], operand[1], self.denominator, self.numerator)
+
+    def __floordiv__(self, other):
+        # Floor division of the cross products is exact whatever the signs of the denominators.
+        if isinstance(other, Rational):
+            return (self.numerator * other.denominator) // (self.denominator * other.numerator)
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return (self.numerator * operand[1]) // (self.denominator * operand[0])
+
+    def __rfloordiv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return (operand[0] * self.denominator) // (operand[1] * self.numerator)
+
+    def __mod__(self, other):
+        if isinstance(other, Rational):
+            return _divmod(self.numerator, self.denominator, other.numerator, other.denominator)[1]
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _divmod(self.numerator, self.denominator, *operand)[1]
+
+    def __rmod__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _divmod(*operand, self.numerator, self.denominator)[1]
+
+    def __divmod__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _divmod(self.numerator, self.denominator, *operand)
+
+    def __rdivmod__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return _divmod(*operand, self.numerator, self.denominator)
+
+    def __pow__(self, exponent):
+        """
+        Raises the Rational to an integer power. Powers of coprime numbers stay
+        coprime, so no gcd is needed.
+
+        Args:
+            exponent (int): The power to raise to.
+
+        Raises:
+            ZeroDivisionError: If a zero Rational is raised to a negative power.
+        """
+        if not isinstance(exponent, int):
+            return NotImplemented
+        numerator, denominator = self._signed()
+        if exponent < 0:
+            if numerator == 0:
+                raise ZeroDivisionError("Rational(0, 1) cannot be raised to a negative power")
+            numerator, denominator, exponent = denominator, numerator, -exponent
+            if denominator < 0:
+                numerator, denominator = -numerator, -denominator
+        return _from_reduced(numerator ** exponent, denominator ** exponent)
+
+    def __neg__(self):
+        numerator, denominator = self._signed()
+        return _from_reduced(-numerator, denominator)
+
+    def __pos__(self):
+        return _from_reduced(*self._signed())
+
+    def __abs__(self):
+        numerator, denominator = self._signed()
+        return _from_reduced(abs(numerator), denominator)
+
+    def _compare(self, other):
+        """
+        Returns (a, b) with a < b, a == b or a > b exactly when self compares
+        that way with other, or None if other is not a rational number.
+        """
+        if isinstance(other, Rational):
+            na, da, nb, db = self.numerator, self.denominator, other.numerator, other.denominator
+            if da == db:
+                return (na, nb) if da > 0 else (nb, na)
+            # Multiplying by da * db flips the order when that product is negative.
+            return (na * db, nb * da) if (da > 0) == (db > 0) else (nb * da, na * db)
+        operand = self._operand(other)
+        if operand is None:
+            return None
+        na, da = self._signed()
+        nb, db = operand
+        return na * db, nb * da
+
+    def __lt__(self, other):
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        pair = self._compare(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def __bool__(self):
+        return self.numerator != 0
+
+    def __float__(self):
+        return self.numerator / self.denominator
+
+    def __floor__(self):
+        numerator, denominator = self._signed()
+        return numerator // denominator
+
+    def __ceil__(self):
+        numerator, denominator = self._signed()
+        return -(-numerator // denominator)
+
+    def __trunc__(self):
+        """
+        Returns the integer part, rounding toward zero like int(Fraction).
+        """
+        numerator, denominator = self._signed()
+        if numerator < 0:
+            return -(-numerator // denominator)
+        return numerator // denominator
+
+    def __int__(self):
+        return self.__trunc__()
+
+
+# The arithmetic helpers below work on reduced operands whose denominators may
+# be negative (the constructor keeps the sign where it was given); they fix the
+# sign of the result once at the end rather than normalizing each operand.
+_new = object.__new__
+
+
+def _from_reduced(numerator, denominator):
+    """
+    Creates a Rational from a numerator and denominator that are already
+    coprime, skipping the gcd. Only for use by the arithmetic operators.
+    """
+    rat = _new(Rational)
+    rat.numerator = numerator
+    rat.denominator = denominator
+    return rat
+
+
+def _add(na, da, nb, db):
+    """
+    Returns na/da + nb/db for reduced operands.
+    """
+    divisor = gcd(da, db)
+    if divisor == 1:
+        # Coprime denominators: the sum is already in reduced form.
+        numerator, denominator = na * db + da * nb, da * db
+    else:
+        scale = da // divisor
+        numerator = na * (db // divisor) + nb * scale
+        divisor2 = gcd(numerator, divisor)
+        if divisor2 == 1:
+            denominator = scale * db
+        else:
+            numerator, denominator = numerator // divisor2, scale * (db // divisor2)
+    if denominator < 0:
+        return _from_reduced(-numerator, -denominator)
+    return _from_reduced(numerator, denominator)
+
+
+def _mul(na, da, nb, db):
+    """
+    Returns na/da * nb/db for reduced operands. Cancelling across the
+    diagonals first leaves the products reduced.
+    """
+    g1 = gcd(na, db)
+    if g1 > 1:
+        na, db = na // g1, db // g1
+    g2 = gcd(nb, da)
+    if g2 > 1:
+        nb, da = nb // g2, da // g2
+    numerator, denominator = na * nb, da * db
+    if denominator < 0:
+        return _from_reduced(-numerator, -denominator)
+    return _from_reduced(numerator, denominator)
+
+
+def _divmod(na, da, nb, db):
+    """
+    Returns (na/da // nb/db, na/da % nb/db) for reduced operands, as
+    (int, Rational) like divmod of two Fractions. Dividing out the gcd of the
+    denominators first keeps the cross products and the remainder small.
+    """
+    divisor = gcd(da, db)
+    if divisor > 1:
+        da, db_scaled = da // divisor, db // divisor
+    else:
+        db_scaled = db
+    quotient, remainder = divmod(na * db_scaled, da * nb)
+    denominator = da * db
+    divisor2 = gcd(remainder, denominator)
+    if divisor2 > 1:
+        remainder, denominator = remainder // divisor2, denominator // divisor2
+    if denominator < 0:
+        return quotient, _from_reduced(-remainder, -denominator)
+    return quotient, _from_reduced(remainder, denominator)
@@ -0,0 +1,336 @@
+"""
+A vectorized companion to Rational, backed by NumPy int64 arrays.
+
+Summing or comparing millions of ratios with the scalar `Rational` allocates
+one Python object per value. `RationalArray` stores the numerators and
+denominators in two NumPy arrays instead, normalizes them with `np.gcd`, and
+does arithmetic, comparisons and reductions elementwise.
+
+int64 arithmetic silently wraps around, so every operation first bounds the
+magnitude of its intermediate products in floating point. If any element
+could overflow, the operation is redone on `object` arrays of Python ints,
+which are exact but slower, and the result is converted back to int64 when
+it fits again.
+
+    values = RationalArray([1, 2, 3], [2, 3, 4])
+    total = values.sum()   # a scalar Rational, 23/12
+    values[0]              # Rational(1, 2)
+"""
+import numpy as np
+
+from rational_loader import load_rational
+
+Rational = load_rational()
+
+# Products are bounded in float64 before they are computed; staying a factor
+# of two below 2**63 leaves room for the float rounding of the bound itself.
+_INT64_SAFE = float(2 ** 62)
+
+
+def _as_array(values) -> np.ndarray:
+    """Convert ints to an int64 array, or an object array of Python ints if any don't fit.
+
+    Floats are rejected rather than truncated; `RationalArray.from_rationals`
+    converts them exactly.
+    """
+    array = np.asarray(values)
+    if not isinstance(values, np.ndarray) and array.dtype.kind not in "bi":
+        # NumPy infers float64 for Python ints past 2**63 mixed with smaller ones, losing precision.
+        array = np.asarray(values, dtype=object)
+    if array.dtype.kind in "bi" or array.size == 0:
+        return array.astype(np.int64)
+    if array.dtype.kind not in "uO" or (array.dtype == object and not all(
+            isinstance(value, (int, np.integer)) for value in array.flat)):
+        raise TypeError(f"RationalArray needs integer numerators and denominators, not {array.dtype} values")
+    if all(-2 ** 63 <= int(value) < 2 ** 63 for value in array.flat):
+        return array.astype(np.int64)
+    # Python ints, not NumPy integers, which would wrap around in arithmetic.
+    return np.array([int(value) for value in array.flat], dtype=object).reshape(array.shape)
+
+
+def _magnitude(array: np.ndarray) -> np.ndarray:
+    try:
+        return np.abs(array.astype(np.float64))
+    except OverflowError:
+        # Python ints beyond float range certainly don't fit in int64.
+        return np.full(array.shape, np.inf)
+
+
+def _fits(*magnitudes: np.ndarray) -> bool:
+    return all(bool(np.all(m < _INT64_SAFE)) for m in magnitudes)
+
+
+def _promote(*arrays: np.ndarray) -> list[np.ndarray]:
+    return [a.astype(object) if a.dtype != object else a for a in arrays]
+
+
+def _exact(arrays: list[np.ndarray], *products: tuple[int, int]) -> list[np.ndarray]:
+    """Promote all of `arrays` to Python ints if any product of two could overflow.
+
+    Each product is a pair of indexes into `arrays`; a pair of pairs is a sum
+    of two products. Mixed int64/object operands are always promoted, since
+    NumPy would otherwise multiply the int64 elements with wraparound.
+    """
+    if any(a.dtype == object for a in arrays):
+        return _promote(*arrays)
+    magnitudes = [_magnitude(a) for a in arrays]
+    for product in products:
+        if isinstance(product[0], tuple):
+            (i, j), (k, l) = product
+            bound = magnitudes[i] * magnitudes[j] + magnitudes[k] * magnitudes[l]
+        else:
+            i, j = product
+            bound = magnitudes[i] * magnitudes[j]
+        if not _fits(bound):
+            return _promote(*arrays)
+    return list(arrays)
+
+
+def _demote(array: np.ndarray) -> np.ndarray:
+    """Convert an object array back to int64 if every element fits."""
+    if array.dtype == object and (array.size == 0 or _fits(_magnitude(array))):
+        return array.astype(np.int64)
+    return array
+
+
+class RationalArray:
+    """
+    An array of rational numbers stored as reduced numerator and denominator arrays.
+
+    Denominators are always positive, so two elements are equal exactly when
+    their numerators and denominators are. Operands can be another
+    RationalArray of the same shape, a Rational, or an int.
+
+    Attributes:
+        numerators (np.ndarray): int64 (or object, after overflow) numerators.
+        denominators (np.ndarray): Positive denominators of the same shape and dtype.
+    """
+
+    __slots__ = ("numerators", "denominators")
+
+    def __init__(self, numerators, denominators=None):
+        """
+        Initializes a RationalArray, reducing every element by its gcd.
+
+        Args:
+            numerators: Integers, array-like.
+            denominators: Nonzero integers of the same shape; defaults to all ones.
+
+        Raises:
+            ValueError: If any denominator is zero or the shapes don't match.
+            TypeError: If any value isn't an integer; use `from_rationals` for floats.
+        """
+        numerators = _as_array(numerators)
+        denominators = np.ones_like(numerators) if denominators is None else _as_array(denominators)
+        if numerators.shape != denominators.shape:
+            raise ValueError(f"Shapes differ: {numerators.shape} and {denominators.shape}")
+        if np.any(denominators == 0):
+            raise ValueError("Cannot create a RationalArray with a zero denominator.")
+        if numerators.dtype != denominators.dtype:
+            numerators, denominators = _promote(numerators, denominators)
+        self.numerators, self.denominators = self._normalize(numerators, denominators)
+
+    @classmethod
+    def _from_reduced(cls, numerators, denominators):
+        """Wrap arrays that are already reduced with positive denominators."""
+        array = object.__new__(cls)
+        array.numerators = _demote(numerators)
+        array.denominators = _demote(denominators)
+        if array.numerators.dtype != array.denominators.dtype:
+            array.numerators, array.denominators = _promote(array.numerators, array.denominators)
+        return array
+
+    @classmethod
+    def from_rationals(cls, values) -> "RationalArray":
+        """Build an array from Rational, Fraction, int or float values (floats are converted exactly)."""
+        pairs = [value.as_integer_ratio() if isinstance(value, (float, np.floating))
+                 else (getattr(value, "numerator", value), getattr(value, "denominator", 1)) for value in values]
+        return cls([n for n, _ in pairs], [d for _, d in pairs])
+
+    @staticmethod
+    def _normalize(numerators, denominators):
+        """Divide by the elementwise gcd and move signs to the numerators."""
+        if numerators.dtype != object and (np.any(numerators == np.iinfo(np.int64).min)
+                                           or np.any(denominators == np.iinfo(np.int64).min)):
+            # -2**63 has no int64 negation, which the sign fix below needs.
+            numerators, denominators = _promote(numerators, denominators)
+        divisors = np.gcd(numerators, denominators)
+        numerators = numerators // divisors
+        denominators = denominators // divisors
+        negative = denominators < 0
+        numerators = np.where(negative, -numerators, numerators)
+        denominators = np.where(negative, -denominators, denominators)
+        return _demote(numerators), _demote(denominators)
+
+    def _operand(self, other):
+        """Return other as (numerators, denominators) arrays, or None if unsupported."""
+        if isinstance(other, RationalArray):
+            if other.numerators.shape != self.numerators.shape:
+                raise ValueError(f"Shapes differ: {self.numerators.shape} and {other.numerators.shape}")
+            return other.numerators, other.denominators
+        if isinstance(other, int):
+            numerator, denominator = other, 1
+        elif hasattr(other, "numerator") and hasattr(other, "denominator"):
+            numerator, denominator = other.numerator, other.denominator
+            if denominator < 0:
+                numerator, denominator = -numerator, -denominator
+        else:
+            return None
+        numerator, denominator = _as_array(numerator), _as_array(denominator)
+        if numerator.dtype != object and numerator == np.iinfo(np.int64).min:
+            # -2**63 has no int64 negation, which subtraction and division need.
+            numerator, denominator = _promote(numerator, denominator)
+        return numerator, denominator
+
+    def _add(self, nb, db, sign=1):
+        na, da = self.numerators, self.denominators
+        if sign < 0:
+            nb = np.array(-nb, dtype=nb.dtype)  # negating a 0-d scalar operand would give a bare int
+        na, da, nb, db = _exact([na, da, nb, db])
+        divisors = np.gcd(da, db)
+        da_part, db_part = da // divisors, db // divisors
+        na, nb, da_part, db_part, db = _exact([na, nb, da_part, db_part, db], ((0, 3), (1, 2)), (2, 4))
+        numerators = na * db_part + nb * da_part
+        denominators = da_part * db
+        # Only factors of the denominators' gcd can survive in the result.
+        divisors2 = np.gcd(numerators, divisors)
+        return RationalArray._from_reduced(numerators // divisors2, denominators // divisors2)
+
+    def _mul(self, nb, db):
+        na, da, nb, db = _exact([self.numerators, self.denominators, nb, db])
+        g1 = np.gcd(na, db)
+        g2 = np.gcd(nb, da)
+        na, db, nb, da = na // g1, db // g1, nb // g2, da // g2
+        na, nb, da, db = _exact([na, nb, da, db], (0, 1), (2, 3))
+        return RationalArray._from_reduced(na * nb, da * db)
+
+    def __add__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self._add(*operand)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self._add(*operand, sign=-1)
+
+    def __rsub__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else (-self)._add(*operand)
+
+    def __mul__(self, other):
+        operand = self._operand(other)
+        return NotImplemented if operand is None else self._mul(*operand)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        nb, db = operand
+        if np.any(nb == 0):
+            raise ZeroDivisionError("RationalArray division by zero")
+        negative = nb < 0
+        return self._mul(np.where(negative, -db, db), np.where(negative, -nb, nb))
+
+    def __rtruediv__(self, other):
+        return self.reciprocal() * other
+
+    def reciprocal(self) -> "RationalArray":
+        if np.any(self.numerators == 0):
+            raise ZeroDivisionError("RationalArray division by zero")
+        negative = self.numerators < 0
+        return RationalArray._from_reduced(np.where(negative, -self.denominators, self.denominators),
+                                           np.where(negative, -self.numerators, self.numerators))
+
+    def __neg__(self):
+        return RationalArray._from_reduced(-self.numerators, self.denominators)
+
+    def __abs__(self):
+        return RationalArray._from_reduced(np.abs(self.numerators), self.denominators)
+
+    def _cross(self, other):
+        """Return arrays (a, b) that order the same way as self and other."""
+        operand = self._operand(other)
+        if operand is None:
+            return None
+        na, da, nb, db = _exact([self.numerators, self.denominators, *operand], (0, 3), (2, 1))
+        return na * db, nb * da
+
+    def __eq__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        # Both sides are reduced with positive denominators.
+        return (self.numerators == operand[0]) & (self.denominators == operand[1])
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else ~equal
+
+    def __lt__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else np.asarray(pair[0] < pair[1], dtype=bool)
+
+    def __le__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else np.asarray(pair[0] <= pair[1], dtype=bool)
+
+    def __gt__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else np.asarray(pair[0] > pair[1], dtype=bool)
+
+    def __ge__(self, other):
+        pair = self._cross(other)
+        return NotImplemented if pair is None else np.asarray(pair[0] >= pair[1], dtype=bool)
+
+    __hash__ = None
+
+    def sum(self):
+        """
+        Returns the sum of all elements as a scalar Rational.
+
+        Elements are added pairwise, halving the array on each pass, so the
+        reduction takes log2(n) vectorized steps and intermediate
+        denominators grow as slowly as possible.
+        """
+        numerators, denominators = self.numerators.ravel(), self.denominators.ravel()
+        if numerators.size == 0:
+            return Rational(0, 1)
+        while numerators.size > 1:
+            if numerators.size % 2:
+                # Pad odd lengths with 0/1 so the halves line up.
+                numerators = np.append(numerators, 0)
+                denominators = np.append(denominators, 1)
+            half = numerators.size // 2
+            left = RationalArray._from_reduced(numerators[:half], denominators[:half])
+            right = RationalArray._from_reduced(numerators[half:], denominators[half:])
+            total = left + right
+            numerators, denominators = total.numerators, total.denominators
+        return Rational(int(numerators[0]), int(denominators[0]))
+
+    def to_float(self) -> np.ndarray:
+        if self.numerators.dtype == object:
+            return np.array([n / d for n, d in zip(self.numerators.ravel(), self.denominators.ravel())],
+                            dtype=np.float64).reshape(self.numerators.shape)
+        return self.numerators / self.denominators
+
+    def to_rationals(self) -> list:
+        return [Rational(int(n), int(d)) for n, d in zip(self.numerators.ravel(), self.denominators.ravel())]
+
+    @property
+    def shape(self) -> tuple:
+        return self.numerators.shape
+
+    def __len__(self):
+        return len(self.numerators)
+
+    def __getitem__(self, index):
+        numerators, denominators = self.numerators[index], self.denominators[index]
+        if isinstance(numerators, np.ndarray):
+            return RationalArray._from_reduced(numerators, denominators)
+        return Rational(int(numerators), int(denominators))
+
+    def __repr__(self):
+        return f"RationalArray({self.numerators.tolist()}, {self.denominators.tolist()})"
@@ -0,0 +1,82 @@
+"""
+Benchmark rational-good-example.py's Rational against fractions.Fraction.
+
+Each operation is timed with `timeit` on the same pseudo-random operands for
+both types, and the results are checked against Fraction before timing so a
+fast but wrong implementation can't sneak through. Expect `hash` and `sum`
+to run at about Fraction's speed: they use the same algorithms, and their
+time goes to the modular inverse and to big-integer gcds rather than to
+Python-level overhead.
+
+    python rational_benchmark.py
+"""
+import random
+import timeit
+from fractions import Fraction
+
+from rational_loader import load_rational
+
+
+def make_operands(count: int = 1000, bits: int = 32, seed: int = 0) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    limit = 2 ** bits
+    operands = []
+    while len(operands) < count:
+        denominator = rng.randrange(-limit, limit)
+        if denominator:
+            operands.append((rng.randrange(-limit, limit), denominator))
+    return operands
+
+
+OPERATIONS = {
+    "construct": lambda cls, pairs, values: [cls(n, d) for n, d in pairs],
+    "add": lambda cls, pairs, values: [a + b for a, b in zip(values, values[1:])],
+    "sub": lambda cls, pairs, values: [a - b for a, b in zip(values, values[1:])],
+    "mul": lambda cls, pairs, values: [a * b for a, b in zip(values, values[1:])],
+    "div": lambda cls, pairs, values: [a / b for a, b in zip(values, values[1:]) if b],
+    "floordiv": lambda cls, pairs, values: [a // b for a, b in zip(values, values[1:]) if b],
+    "mod": lambda cls, pairs, values: [a % b for a, b in zip(values, values[1:]) if b],
+    "eq": lambda cls, pairs, values: [a == b for a, b in zip(values, values[1:])],
+    "lt": lambda cls, pairs, values: [a < b for a, b in zip(values, values[1:])],
+    "hash": lambda cls, pairs, values: [hash(a) for a in values],
+    "sum": lambda cls, pairs, values: sum(values, cls(0, 1)),
+}
+
+
+def check(rational: type, pairs: list[tuple[int, int]]) -> None:
+    """Assert every operation gives the same values as Fraction."""
+    fractions = [Fraction(n, d) for n, d in pairs]
+    rationals = [rational(n, d) for n, d in pairs]
+    for name, operation in OPERATIONS.items():
+        if name == "construct":
+            continue
+        expected = operation(Fraction, pairs, fractions)
+        actual = operation(rational, pairs, rationals)
+        if isinstance(expected, list):
+            assert all(a == e for a, e in zip(actual, expected)), f"{name} disagrees with Fraction"
+        else:
+            assert actual == expected, f"{name} disagrees with Fraction"
+
+
+def benchmark(rational: type, pairs: list[tuple[int, int]], repeat: int = 5, number: int = 20) -> list[dict]:
+    """Return the best time per operation for Rational and Fraction."""
+    results = []
+    for name, operation in OPERATIONS.items():
+        timings = {}
+        for cls in (rational, Fraction):
+            values = [cls(n, d) for n, d in pairs]
+            timer = timeit.Timer(lambda: operation(cls, pairs, values))
+            timings[cls.__name__] = min(timer.repeat(repeat=repeat, number=number)) / number
+        results.append({"operation": name, **timings})
+    return results
+
+
+if __name__ == "__main__":
+    Rational = load_rational()
+    pairs = make_operands()
+    check(Rational, pairs)
+
+    print(f"{'operation':<10} {'Rational (ms)':>14} {'Fraction (ms)':>14} {'speedup':>8}")
+    for row in benchmark(Rational, pairs):
+        speedup = row["Fraction"] / row["Rational"]
+        print(f"{row['operation']:<10} {row['Rational'] * 1e3:>14.3f} {row['Fraction'] * 1e3:>14.3f} {speedup:>7.2f}x")
@@ -0,0 +1,25 @@
+"""
+Import the Rational class from rational-good-example.py.
+
+The example's file name isn't a valid module name, so it can't be imported
+with a plain `import`. The class is loaded once and cached, so every module
+that calls `load_rational()` shares the same `Rational` type and
+`isinstance` checks work across them.
+
+    from rational_loader import load_rational
+    Rational = load_rational()
+"""
+import functools
+import importlib.util
+from pathlib import Path
+
+EXAMPLE_FILE = Path(__file__).with_name("rational-good-example.py")
+
+
+@functools.cache
+def load_rational(path: Path = EXAMPLE_FILE) -> type:
+    """Import Rational from a file whose name isn't a valid module name."""
+    spec = importlib.util.spec_from_file_location("rational_good_example", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Rational
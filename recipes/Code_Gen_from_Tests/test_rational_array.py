@@ -0,0 +1,178 @@
+# Property-based tests for RationalArray, checked elementwise against fractions.Fraction.
+# Run with: python -m pytest test_rational_array.py (or python -m unittest test_rational_array)
+
+from fractions import Fraction
+import unittest
+
+import numpy as np
+from hypothesis import given, strategies as st
+
+from rational_array import RationalArray
+from rational_loader import load_rational
+
+Rational = load_rational()
+
+INT64_MAX = 2 ** 63 - 1
+INT64_MIN = -2 ** 63
+
+# Small values stay on the int64 path; values near the int64 limits force the
+# Python-int fallback in products and sums. Hypothesis mixes both in one array.
+# INT64_MIN matters on its own: it has no int64 negation.
+small_integers = st.integers(min_value=-1000, max_value=1000)
+int64_integers = st.one_of(small_integers, st.integers(min_value=INT64_MIN, max_value=INT64_MAX),
+                           st.sampled_from([INT64_MAX, -INT64_MAX, INT64_MIN, 2 ** 62, -2 ** 62, 2 ** 31 + 1]))
+nonzero = int64_integers.filter(lambda i: i != 0)
+pairs = st.tuples(int64_integers, nonzero)
+pair_lists = st.integers(min_value=1, max_value=12).flatmap(
+    lambda n: st.tuples(st.lists(pairs, min_size=n, max_size=n), st.lists(pairs, min_size=n, max_size=n)))
+scalars = st.one_of(st.builds(Rational, int64_integers, nonzero), int64_integers,
+                    st.builds(Fraction, int64_integers, nonzero))
+
+
+def as_array(pairs):
+    return RationalArray([n for n, _ in pairs], [d for _, d in pairs])
+
+
+def as_fractions(pairs):
+    return [Fraction(n, d) for n, d in pairs]
+
+
+def fractions_of(array):
+    """The elements of a RationalArray as Fractions, checking they are reduced with positive denominators."""
+    result = []
+    for n, d in zip(array.numerators.tolist(), array.denominators.tolist()):
+        assert d > 0 and Fraction(n, d).denominator == d, f"{n}/{d} isn't normalized"
+        result.append(Fraction(n, d))
+    return result
+
+
+def as_fraction(value):
+    if isinstance(value, Rational):
+        return Fraction(value.numerator, value.denominator)
+    return Fraction(value)
+
+
+class TestRationalArrayAgainstFraction(unittest.TestCase):
+    """
+    Every elementwise operation should give the same values as the same
+    operation on lists of fractions.Fraction, whether it runs on int64 or
+    falls back to Python ints.
+    """
+
+    @given(st.lists(pairs, max_size=20))
+    def test_construction_is_reduced(self, values):
+        self.assertEqual(fractions_of(as_array(values)), as_fractions(values))
+
+    @given(pair_lists)
+    def test_arithmetic(self, operands):
+        a, b = as_array(operands[0]), as_array(operands[1])
+        fa, fb = as_fractions(operands[0]), as_fractions(operands[1])
+        self.assertEqual(fractions_of(a + b), [x + y for x, y in zip(fa, fb)])
+        self.assertEqual(fractions_of(a - b), [x - y for x, y in zip(fa, fb)])
+        self.assertEqual(fractions_of(a * b), [x * y for x, y in zip(fa, fb)])
+        self.assertEqual(fractions_of(-a), [-x for x in fa])
+        self.assertEqual(fractions_of(abs(a)), [abs(x) for x in fa])
+        if all(fb):
+            self.assertEqual(fractions_of(a / b), [x / y for x, y in zip(fa, fb)])
+        else:
+            with self.assertRaises(ZeroDivisionError):
+                a / b
+
+    @given(st.lists(pairs, min_size=1, max_size=12), scalars)
+    def test_scalar_operands(self, values, scalar):
+        a, fa, fs = as_array(values), as_fractions(values), as_fraction(scalar)
+        self.assertEqual(fractions_of(a + scalar), [x + fs for x in fa])
+        self.assertEqual(fractions_of(scalar + a), [fs + x for x in fa])
+        self.assertEqual(fractions_of(a - scalar), [x - fs for x in fa])
+        self.assertEqual(fractions_of(scalar - a), [fs - x for x in fa])
+        self.assertEqual(fractions_of(a * scalar), [x * fs for x in fa])
+        self.assertEqual(fractions_of(scalar * a), [fs * x for x in fa])
+        if fs:
+            self.assertEqual(fractions_of(a / scalar), [x / fs for x in fa])
+        if all(fa):
+            self.assertEqual(fractions_of(scalar / a), [fs / x for x in fa])
+
+    @given(pair_lists)
+    def test_comparisons(self, operands):
+        a, b = as_array(operands[0]), as_array(operands[1])
+        fa, fb = as_fractions(operands[0]), as_fractions(operands[1])
+        self.assertEqual((a == b).tolist(), [x == y for x, y in zip(fa, fb)])
+        self.assertEqual((a != b).tolist(), [x != y for x, y in zip(fa, fb)])
+        self.assertEqual((a < b).tolist(), [x < y for x, y in zip(fa, fb)])
+        self.assertEqual((a <= b).tolist(), [x <= y for x, y in zip(fa, fb)])
+        self.assertEqual((a > b).tolist(), [x > y for x, y in zip(fa, fb)])
+        self.assertEqual((a >= b).tolist(), [x >= y for x, y in zip(fa, fb)])
+
+    @given(st.lists(pairs, max_size=40))
+    def test_sum(self, values):
+        total = as_array(values).sum()
+        self.assertIsInstance(total, Rational)
+        self.assertEqual(as_fraction(total), sum(as_fractions(values), Fraction(0)))
+
+    @given(st.lists(pairs, min_size=1, max_size=12))
+    def test_interoperates_with_rational(self, values):
+        a = as_array(values)
+        rationals = a.to_rationals()
+        self.assertEqual([as_fraction(r) for r in rationals], as_fractions(values))
+        self.assertEqual([as_fraction(a[i]) for i in range(len(a))], as_fractions(values))
+        self.assertEqual(fractions_of(RationalArray.from_rationals(rationals)), as_fractions(values))
+        self.assertEqual(fractions_of(RationalArray.from_rationals(as_fractions(values))), as_fractions(values))
+
+    @given(st.lists(st.floats(allow_nan=False, allow_infinity=False, width=32), min_size=1, max_size=12))
+    def test_floats_convert_exactly(self, values):
+        self.assertEqual(fractions_of(RationalArray.from_rationals(values)), [Fraction(v) for v in values])
+        with self.assertRaises(TypeError):
+            RationalArray(values)
+
+
+class TestOverflowFallback(unittest.TestCase):
+    """
+    int64 products that would wrap around must be redone exactly with Python
+    ints, and results must return to int64 once they fit again.
+    """
+
+    # Results move back to int64 only well inside its range (below 2**62), so stay below that here.
+    @given(st.lists(st.integers(min_value=2 ** 32, max_value=2 ** 61), min_size=1, max_size=12))
+    def test_products_beyond_int64_fall_back(self, values):
+        a = RationalArray(values)
+        self.assertEqual(a.numerators.dtype, np.int64)
+        squared = a * a
+        self.assertEqual(squared.numerators.dtype, object)
+        self.assertEqual(fractions_of(squared), [Fraction(v) ** 2 for v in values])
+        back = squared / a
+        self.assertEqual(back.numerators.dtype, np.int64)
+        self.assertEqual(fractions_of(back), [Fraction(v) for v in values])
+
+    @given(st.lists(st.integers(min_value=2 ** 62, max_value=INT64_MAX), min_size=1, max_size=12))
+    def test_sums_beyond_int64_fall_back(self, values):
+        a = RationalArray(values)
+        self.assertEqual(fractions_of(a + a), [2 * Fraction(v) for v in values])
+        self.assertEqual(as_fraction(a.sum()), sum(values))
+
+    @given(st.lists(st.integers(min_value=2 ** 63, max_value=2 ** 200), min_size=1, max_size=12),
+           st.lists(st.integers(min_value=1, max_value=2 ** 200), min_size=1, max_size=12))
+    def test_values_beyond_int64_are_exact(self, numerators, denominators):
+        size = min(len(numerators), len(denominators))
+        numerators, denominators = numerators[:size], denominators[:size]
+        a = RationalArray(numerators, denominators)
+        expected = [Fraction(n, d) for n, d in zip(numerators, denominators)]
+        self.assertEqual(fractions_of(a), expected)
+        self.assertEqual(fractions_of(a - a), [Fraction(0)] * size)
+        self.assertEqual(fractions_of(a * 3), [3 * x for x in expected])
+        self.assertEqual((a > 1).tolist(), [x > 1 for x in expected])
+
+    def test_int64_minimum_scalar(self):
+        a = RationalArray([0, 1])
+        self.assertEqual(fractions_of(a - INT64_MIN), [Fraction(2 ** 63), Fraction(2 ** 63 + 1)])
+        self.assertEqual(fractions_of(a / INT64_MIN), [Fraction(0), Fraction(1, INT64_MIN)])
+        self.assertEqual(fractions_of(a / Fraction(INT64_MIN, 3)), [Fraction(0), Fraction(3, INT64_MIN)])
+        self.assertEqual(fractions_of(INT64_MIN - a), [Fraction(INT64_MIN), Fraction(INT64_MIN - 1)])
+
+    def test_int64_minimum(self):
+        """-2**63 has no int64 negation, so normalizing it needs Python ints."""
+        a = RationalArray([-2 ** 63, 4], [-1, -2 ** 63])
+        self.assertEqual(fractions_of(a), [Fraction(2 ** 63), Fraction(4, -2 ** 63)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# Property-based tests for rational-good-example.py, checked against fractions.Fraction.
+# Run with: python -m pytest test_rational_example.py (or python -m unittest test_rational_example)
+
+from fractions import Fraction
+import math
+import unittest
+
+from hypothesis import given, strategies as st
+
+from rational_loader import load_rational
+
+Rational = load_rational()
+
+nonzero_integers = st.integers().filter(lambda i: i != 0)
+rationals = st.builds(Rational, st.integers(), nonzero_integers)
+operands = st.one_of(rationals, st.integers(), st.fractions())
+
+
+def as_fraction(value):
+    """The Fraction equal to a Rational, int or Fraction."""
+    if isinstance(value, Rational):
+        return Fraction(value.numerator, value.denominator)
+    return Fraction(value)
+
+
+class TestRationalAgainstFraction(unittest.TestCase):
+    """
+    Every operation of Rational should give the same value as the same operation
+    on fractions.Fraction, including when ints and Fractions are mixed in.
+    """
+
+    def assertSameValue(self, actual, expected):
+        if isinstance(expected, tuple):
+            self.assertEqual(len(actual), len(expected))
+            for a, e in zip(actual, expected):
+                self.assertSameValue(a, e)
+            return
+        if isinstance(expected, int):
+            # //, divmod's quotient and the int conversions return plain ints, like Fraction's do.
+            self.assertIs(type(actual), int)
+            self.assertEqual(actual, expected)
+            return
+        self.assertIsInstance(actual, Rational)
+        self.assertEqual(as_fraction(actual), expected)
+
+    @given(st.integers(), nonzero_integers)
+    def test_construction_is_reduced(self, numer, denom):
+        rat = Rational(numer, denom)
+        self.assertEqual(math.gcd(rat.numerator, rat.denominator), 1)
+        self.assertEqual(as_fraction(rat), Fraction(numer, denom))
+
+    @given(rationals, operands)
+    def test_arithmetic(self, a, b):
+        fa, fb = as_fraction(a), as_fraction(b)
+        self.assertSameValue(a + b, fa + fb)
+        self.assertSameValue(b + a, fb + fa)
+        self.assertSameValue(a - b, fa - fb)
+        self.assertSameValue(b - a, fb - fa)
+        self.assertSameValue(a * b, fa * fb)
+        self.assertSameValue(b * a, fb * fa)
+
+    @given(rationals, operands)
+    def test_division(self, a, b):
+        fa, fb = as_fraction(a), as_fraction(b)
+        if fb:
+            self.assertSameValue(a / b, fa / fb)
+            self.assertSameValue(a // b, fa // fb)
+            self.assertSameValue(a % b, fa % fb)
+            self.assertSameValue(divmod(a, b), divmod(fa, fb))
+        else:
+            for operation in (lambda: a / b, lambda: a // b, lambda: a % b, lambda: divmod(a, b)):
+                with self.assertRaises(ZeroDivisionError):
+                    operation()
+        if fa:
+            self.assertSameValue(b / a, fb / fa)
+            self.assertSameValue(b // a, fb // fa)
+            self.assertSameValue(b % a, fb % fa)
+            self.assertSameValue(divmod(b, a), divmod(fb, fa))
+
+    @given(rationals, st.integers(min_value=-20, max_value=20))
+    def test_power(self, a, exponent):
+        fa = as_fraction(a)
+        if fa == 0 and exponent < 0:
+            with self.assertRaises(ZeroDivisionError):
+                a ** exponent
+        else:
+            self.assertSameValue(a ** exponent, fa ** exponent)
+
+    @given(rationals)
+    def test_unary_and_conversions(self, a):
+        fa = as_fraction(a)
+        self.assertSameValue(-a, -fa)
+        self.assertSameValue(+a, +fa)
+        self.assertSameValue(abs(a), abs(fa))
+        self.assertSameValue(int(a), int(fa))
+        self.assertSameValue(math.trunc(a), math.trunc(fa))
+        self.assertSameValue(math.floor(a), math.floor(fa))
+        self.assertSameValue(math.ceil(a), math.ceil(fa))
+        self.assertEqual(bool(a), bool(fa))
+        self.assertEqual(float(a), float(fa))
+
+    @given(rationals, operands)
+    def test_comparisons(self, a, b):
+        fa, fb = as_fraction(a), as_fraction(b)
+        self.assertEqual(a == b, fa == fb)
+        self.assertEqual(a != b, fa != fb)
+        self.assertEqual(a < b, fa < fb)
+        self.assertEqual(a <= b, fa <= fb)
+        self.assertEqual(a > b, fa > fb)
+        self.assertEqual(a >= b, fa >= fb)
+
+    @given(st.integers(), nonzero_integers, st.integers().filter(lambda i: i != 0))
+    def test_equal_values_are_equal(self, numer, denom, scale):
+        """
+        Rational(N*numerator, N*denominator) is the same value as
+        Rational(numerator, denominator), whatever the signs.
+        """
+        self.assertEqual(Rational(numer, denom), Rational(scale * numer, scale * denom))
+        self.assertEqual(Rational(numer, denom), Rational(-numer, -denom))
+
+    @given(rationals)
+    def test_hash_matches_fraction(self, a):
+        """
+        Equal values must hash equally, so Rationals, Fractions and ints can share dict keys.
+        """
+        self.assertEqual(hash(a), hash(as_fraction(a)))
+        self.assertEqual(hash(a), hash(Rational(-a.numerator, -a.denominator)))
+
+    @given(st.integers(), st.floats(allow_nan=False, allow_infinity=False))
+    def test_hash_matches_int_and_float(self, i, f):
+        self.assertEqual(hash(Rational(i, 1)), hash(i))
+        self.assertEqual(hash(Rational(i, -1)), hash(-i))
+        self.assertEqual(hash(Rational(*f.as_integer_ratio())), hash(f))
+
+    @given(st.lists(rationals, max_size=20))
+    def test_sum(self, values):
+        self.assertSameValue(sum(values, Rational(0, 1)), sum(map(as_fraction, values), Fraction(0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
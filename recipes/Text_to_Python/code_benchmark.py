@@ -0,0 +1,239 @@
+"""
+Check and time model-generated Python functions in isolated subprocesses.
+
+The notebook prints a generated function, such as `fibonacci` or
+`calculate_gt_gpa`, and stops there. This harness runs the generated code in
+a separate Python process under a timeout and reports:
+
+- correctness, from tests derived automatically from the function itself:
+  doctests in its docstring, smoke calls with inputs built from its type
+  hints, the exceptions its docstring says it raises for negative input,
+  and (optionally) agreement with a reference implementation;
+- speed, as the best of several `timeit`-style repeated runs; and
+- scaling, by timing growing input sizes and fitting the slope of
+  log(time) against log(size). A slope well above the expected exponent
+  is flagged as a regression, catching code that is correct but
+  asymptotically slow. Note that `fibonacci` is about 2, not 1: its O(n)
+  loop adds integers that grow to O(n) digits.
+
+    results = benchmark_many([
+        {"code": response, "function": "fibonacci", "expected_exponent": 2},
+    ])
+
+Run as a script to benchmark a file: `python code_benchmark.py generated.py fibonacci`.
+"""
+import json
+import math
+import re
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SIZES = [1_000, 2_000, 4_000, 8_000, 16_000]
+
+# Slack allowed above the expected exponent before flagging; timings of
+# small inputs are noisy and constant factors bend the curve a little.
+EXPONENT_TOLERANCE = 0.4
+
+
+def extract_code(response: str) -> str:
+    """Return the first fenced code block in a response, or the whole response."""
+    match = re.search(r"```(?:[Pp]ython)?\n(.*?)```", response, re.DOTALL)
+    return match.group(1) if match else response
+
+
+def _worker() -> None:
+    """Entry point of the benchmark subprocess: read a job on stdin, print a report."""
+    import doctest
+    import inspect
+    import os
+    import time
+    import typing
+
+    # Reports go out on the original stdout; everything the generated code prints, from Python or from
+    # C extensions and child processes writing to fd 1, is sent to stderr instead.
+    reports = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    job = json.load(sys.stdin)
+    report = {"function": job["function"], "tests": [], "timings": []}
+
+    namespace = {"__name__": "generated"}
+    exec(compile(job["code"], "<generated>", "exec"), namespace)
+    function = namespace[job["function"]]
+    reference = None
+    if job.get("reference"):
+        reference_namespace = {"__name__": "reference"}
+        exec(compile(job["reference"], "<reference>", "exec"), reference_namespace)
+        reference = reference_namespace[job["function"]]
+
+    parameters = list(inspect.signature(function).parameters.values())
+    hints = typing.get_type_hints(function) if function.__annotations__ else {}
+
+    def sample(annotation, size):
+        origin = typing.get_origin(annotation) or annotation
+        args = typing.get_args(annotation)
+        if origin in (list, tuple, set):
+            item = sample(args[0], 1) if args else 1
+            return origin([item] * size)
+        if origin is str:
+            return "A" * size
+        if origin is float:
+            return float(size)
+        if origin is bool:
+            return bool(size % 2)
+        return size  # ints and unannotated parameters
+
+    def make_args(size):
+        if job.get("make_args"):
+            return eval(job["make_args"])(size)
+        return tuple(sample(hints.get(p.name, p.annotation), size) for p in parameters
+                     if p.default is inspect.Parameter.empty)
+
+    def record(name, passed, detail=""):
+        report["tests"].append({"name": name, "passed": passed, "detail": detail})
+
+    # Doctests in the generated docstring.
+    finder = doctest.DocTestFinder()
+    for test in finder.find(function, job["function"], globs=namespace):
+        if test.examples:
+            result = doctest.DocTestRunner(verbose=False).run(test, out=lambda _: None)
+            record("doctest", result.failed == 0, f"{result.failed} of {result.attempted} failed")
+
+    # Smoke calls on small inputs, checking the annotated return type.
+    return_type = typing.get_origin(hints.get("return")) or hints.get("return")
+    for size in (0, 1, 2, 5, 10):
+        args = make_args(size)
+        try:
+            value = function(*args)
+        except Exception as e:
+            record(f"call size={size}", False, f"{type(e).__name__}: {e}")
+            continue
+        if isinstance(return_type, type) and not isinstance(value, return_type):
+            record(f"call size={size}", False, f"returned {type(value).__name__}, not {return_type.__name__}")
+        elif reference is not None and value != reference(*args):
+            record(f"call size={size}", False, f"{value!r} != reference {reference(*args)!r}")
+        else:
+            record(f"call size={size}", True)
+
+    # Documented exceptions for negative input, e.g. "ValueError: If n is negative".
+    docstring = inspect.getdoc(function) or ""
+    for name in re.findall(r"^\s*(\w+Error):.*\bnegative\b", docstring, re.MULTILINE):
+        expected = namespace.get(name) or getattr(__builtins__, name, None) or Exception
+        try:
+            function(*make_args(-1))
+        except expected:
+            record(f"raises {name} for negative input", True)
+        except Exception as e:
+            record(f"raises {name} for negative input", False, f"raised {type(e).__name__}")
+        else:
+            record(f"raises {name} for negative input", False, "nothing raised")
+
+    # Timing: like timeit.autorange, then keep the best of `repeat` runs.
+    for size in job["sizes"]:
+        args = make_args(size)
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                function(*args)
+            elapsed = time.perf_counter() - start
+            if elapsed >= job["min_time"]:
+                break
+            number *= 2
+        best = elapsed
+        for _ in range(job["repeat"] - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                function(*args)
+            best = min(best, time.perf_counter() - start)
+        report["timings"].append({"size": size, "seconds": best / number})
+        print(json.dumps({"partial": report}), file=reports, flush=True)
+
+    print(json.dumps({"report": report}), file=reports, flush=True)
+
+
+def fit_exponent(timings: list[dict]) -> float | None:
+    """Fit the slope of log(time) against log(size); None with fewer than two points."""
+    points = [(t["size"], t["seconds"]) for t in timings if t["size"] > 0 and t["seconds"] > 0]
+    if len(points) < 2:
+        return None
+    slope, _ = statistics.linear_regression([math.log(s) for s, _ in points],
+                                            [math.log(t) for _, t in points])
+    return slope
+
+
+def benchmark(code: str, function: str, reference: str | None = None, make_args: str | None = None,
+              sizes: list[int] = SIZES, expected_exponent: float | None = None,
+              timeout: float = 60, repeat: int = 3, min_time: float = 0.02) -> dict:
+    """Check and time one generated function in a subprocess.
+
+    `make_args` is an optional lambda source, such as `"lambda n: (n,)"`,
+    that builds the arguments for input size n when type hints aren't enough.
+    If the subprocess times out, timings gathered so far are kept and the
+    remaining sizes count as too slow.
+    """
+    job = {"code": extract_code(code), "function": function, "reference": reference,
+           "make_args": make_args, "sizes": sizes, "repeat": repeat, "min_time": min_time}
+    proc = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--worker"],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    timed_out = False
+    try:
+        stdout, stderr = proc.communicate(json.dumps(job), timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate()
+        timed_out = True
+
+    report = {"function": function, "tests": [], "timings": []}
+    for line in stdout.splitlines():
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(message, dict):
+            report = message.get("report") or message.get("partial") or report
+    report["timed_out"] = timed_out
+    report["error"] = stderr.strip().splitlines()[-1] if proc.returncode and not timed_out and stderr.strip() else None
+    report["passed"] = bool(report["tests"]) and all(t["passed"] for t in report["tests"]) and not report["error"]
+    report["exponent"] = fit_exponent(report["timings"])
+    report["regression"] = timed_out or (
+        expected_exponent is not None and report["exponent"] is not None
+        and report["exponent"] > expected_exponent + EXPONENT_TOLERANCE)
+    return report
+
+
+def benchmark_many(jobs: list[dict], max_workers: int = 4) -> list[dict]:
+    """Run `benchmark(**job)` for each job on a pool of subprocesses."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda job: benchmark(**job), jobs))
+
+
+def print_report(report: dict) -> None:
+    status = "PASS" if report["passed"] else "FAIL"
+    print(f"=== {report['function']}: {status} ===")
+    if report["error"]:
+        print(f"  error: {report['error']}")
+    for test in report["tests"]:
+        mark = "ok " if test["passed"] else "BAD"
+        print(f"  [{mark}] {test['name']} {test['detail']}")
+    for timing in report["timings"]:
+        print(f"  size {timing['size']:>8}: {timing['seconds'] * 1e6:>12.1f} us")
+    if report["exponent"] is not None:
+        print(f"  fitted exponent: {report['exponent']:.2f}")
+    if report["timed_out"]:
+        print("  timed out")
+    if report["regression"]:
+        print("  WARNING: slower growth than expected")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        _worker()
+    else:
+        code = Path(sys.argv[1]).read_text(encoding="utf-8")
+        expected = float(sys.argv[3]) if len(sys.argv) > 3 else None
+        print_report(benchmark(code, sys.argv[2], expected_exponent=expected))
@@ -0,0 +1,303 @@
+"""
+Generate a large synthetic social_media.db with the same schema as the small one.
+
+TwitterSyntheticDataGen.ipynb builds `social_media.db` from three hand-written
+CSV files (20 tweets, 10 users, 10 locations), which is too small for any
+generated query to be slow. This script generates tens of millions of rows
+for the same `tweet`, `user` and `location` tables, so the Text_to_SQL
+queries can be benchmarked at production size:
+
+    python generate_social_media_db.py --tweets 20000000 --users 2000000 --output social_media_large.db
+
+The data is correlated and skewed rather than uniform:
+
+- tweets per user and tweets per location follow Zipf-like distributions,
+  so a few accounts and cities produce most of the traffic;
+- each user has a home location that most of their tweets come from, and
+  an influence that drives their tweets' Reach, Klout, retweets and likes;
+- `Lang` depends on the country, `Weekday` and `Day` come from a real date,
+  and `Hour` follows a daily cycle that peaks in the evening.
+
+Rows are generated with NumPy in chunks and loaded with `executemany`, a
+transaction per `--transaction-rows` rows, with WAL and `synchronous=OFF`
+during the load. Indexes on the key columns are created only after the load,
+followed by `ANALYZE`, and `synchronous` goes back to NORMAL at the end. The
+same `--seed` always gives the same database.
+"""
+import argparse
+import datetime
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Same column names and types as the tables pandas' to_sql created in the notebook.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "tweet" (
+"TweetId" TEXT,
+  "Weekday" TEXT,
+  "Hour" INTEGER,
+  "Day" INTEGER,
+  "Lang" TEXT,
+  "IsReshare" INTEGER,
+  "Reach" INTEGER,
+  "RetweetCount" INTEGER,
+  "Likes" INTEGER,
+  "Klout" INTEGER,
+  "Sentiment" REAL,
+  "Text" TEXT,
+  "LocationID" INTEGER,
+  "UserID" TEXT
+);
+CREATE TABLE IF NOT EXISTS "location" (
+"LocationID" INTEGER,
+  "Country" TEXT,
+  "State" TEXT,
+  "StateCode" TEXT,
+  "City" TEXT
+);
+CREATE TABLE IF NOT EXISTS "user" (
+"UserID" TEXT,
+  "Gender" TEXT
+);
+"""
+
+# Created after the load: building an index once is much faster than updating it per row.
+INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS tweet_id ON tweet (TweetId);
+CREATE UNIQUE INDEX IF NOT EXISTS user_id ON user (UserID);
+CREATE UNIQUE INDEX IF NOT EXISTS location_id ON location (LocationID);
+CREATE INDEX IF NOT EXISTS tweet_user ON tweet (UserID);
+CREATE INDEX IF NOT EXISTS tweet_location ON tweet (LocationID);
+"""
+
+# (country, state, state code, city), starting with the rows of Location.csv
+CITIES = [
+    ("USA", "California", "CA", "Los Angeles"), ("UK", "England", "ENG", "London"),
+    ("India", "Maharashtra", "MH", "Mumbai"), ("Canada", "Ontario", "ON", "Toronto"),
+    ("Australia", "New South Wales", "NSW", "Sydney"), ("India", "Karnataka", "KA", "Bangalore"),
+    ("India", "Telangana", "TS", "Hyderabad"), ("India", "Uttar Pradesh", "UP", "Banaras"),
+    ("India", "Odisha", "OD", "Bhubaneswar"), ("India", "West Bengal", "WB", "kolkata"),
+    ("USA", "New York", "NY", "New York"), ("USA", "Texas", "TX", "Houston"), ("USA", "Illinois", "IL", "Chicago"),
+    ("USA", "Washington", "WA", "Seattle"), ("USA", "Florida", "FL", "Miami"),
+    ("UK", "Scotland", "SCT", "Edinburgh"), ("UK", "England", "ENG", "Manchester"),
+    ("Canada", "Quebec", "QC", "Montreal"), ("Canada", "British Columbia", "BC", "Vancouver"),
+    ("Canada", "Ontario", "ON", "Ottawa"), ("Australia", "Victoria", "VIC", "Melbourne"),
+    ("India", "Delhi", "DL", "New Delhi"), ("India", "Tamil Nadu", "TN", "Chennai"),
+    ("Spain", "Madrid", "MD", "Madrid"), ("Spain", "Catalonia", "CT", "Barcelona"),
+    ("France", "Ile-de-France", "IDF", "Paris"), ("France", "Provence-Alpes-Cote d'Azur", "PAC", "Marseille"),
+    ("Germany", "Berlin", "BE", "Berlin"), ("Germany", "Bavaria", "BY", "Munich"),
+    ("Italy", "Lazio", "LZ", "Rome"), ("Italy", "Lombardy", "LM", "Milan"),
+    ("Mexico", "Mexico City", "CMX", "Mexico City"),
+]
+
+# Language mix per country, over the languages of the original data
+LANGUAGES = ["en", "es", "fr", "de", "it"]
+COUNTRY_LANGUAGES = {
+    "USA": [0.85, 0.13, 0.01, 0.005, 0.005], "UK": [0.94, 0.02, 0.02, 0.01, 0.01],
+    "India": [0.97, 0.01, 0.01, 0.005, 0.005], "Canada": [0.75, 0.02, 0.22, 0.005, 0.005],
+    "Australia": [0.96, 0.02, 0.01, 0.005, 0.005], "Spain": [0.15, 0.8, 0.03, 0.01, 0.01],
+    "France": [0.12, 0.02, 0.84, 0.01, 0.01], "Germany": [0.15, 0.01, 0.01, 0.82, 0.01],
+    "Italy": [0.12, 0.01, 0.01, 0.01, 0.85], "Mexico": [0.1, 0.88, 0.01, 0.005, 0.005],
+}
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Relative tweet volume per hour of the day: quiet at night, peaking in the evening
+HOURLY = np.array([2, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 7, 8, 7, 7, 7, 8, 9, 10, 11, 11, 10, 7, 4], dtype=float)
+
+POSITIVE = ["Loving the weather today!", "Just had a great meeting!", "Excited for the weekend!",
+            "What a fantastic game last night!", "Great coffee at a new place downtown.",
+            "Finished my first marathon!", "So proud of the team today."]
+NEUTRAL = ["Heading to work.", "Anyone watching the news?", "Trying a new recipe tonight.",
+           "Reading a book on the train.", "Back-to-back meetings all afternoon."]
+NEGATIVE = ["Feeling a bit tired today.", "Traffic is terrible this morning.", "My flight got delayed again.",
+            "Not happy with the service today.", "Rainy day, staying inside."]
+RESHARES = ["Retweeting an amazing fact.", "Sharing this great article.", "This is worth a read.",
+            "Everyone should see this.", "Couldn't agree more with this thread."]
+
+
+def zipf_weights(n: int, exponent: float, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Zipf-like popularity weights, shuffled with `rng` so popularity doesn't follow id order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    if rng is not None:
+        rng.shuffle(weights)
+    return weights
+
+
+def sample(cumulative: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw indices from precomputed cumulative weights (cheaper than rng.choice(p=...) per chunk)."""
+    return np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side="right")
+
+
+def make_locations(count: int, rng: np.random.Generator) -> list[tuple]:
+    """The known cities first, then extra towns in their states to reach `count` locations."""
+    rows = [(i + 1, *city) for i, city in enumerate(CITIES[:count])]
+    for location_id in range(len(rows) + 1, count + 1):
+        country, state, code, city = CITIES[rng.integers(len(CITIES))]
+        rows.append((location_id, country, state, code, f"{city} Area {location_id}"))
+    return rows
+
+
+def make_users(count: int, location_count: int, rng: np.random.Generator) -> dict:
+    """User ids and genders, plus each user's activity, influence and home location."""
+    width = max(3, len(str(count)))
+    return {
+        "ids": np.array([f"U{n:0{width}d}" for n in range(1, count + 1)], dtype=object),
+        "gender": np.where(rng.random(count) < 0.52, "Male", "Female").astype(object),
+        "activity": zipf_weights(count, 0.7, rng),
+        # Log-normal influence: most accounts reach a few hundred people, a few reach millions.
+        "influence": rng.lognormal(mean=6.5, sigma=1.4, size=count),
+        # Unshuffled, so the big cities listed first are the most popular.
+        "home": sample(np.cumsum(zipf_weights(location_count, 1.0)), count, rng),
+    }
+
+
+def tweet_chunks(count: int, users: dict, locations: list[tuple], chunk_size: int,
+                 rng: np.random.Generator, start_date: datetime.date = datetime.date(2024, 1, 1), days: int = 365):
+    """Yield lists of tweet rows, `chunk_size` at a time."""
+    user_cumulative = np.cumsum(users["activity"])
+    location_cumulative = np.cumsum(zipf_weights(len(locations), 1.0))
+    hour_cumulative = np.cumsum(HOURLY)
+    countries = np.array([row[1] for row in locations], dtype=object)
+    language_cumulative = {country: np.cumsum(mix) for country, mix in COUNTRY_LANGUAGES.items()}
+    languages = np.array(LANGUAGES, dtype=object)
+    weekdays = np.array(WEEKDAYS, dtype=object)
+    start_ordinal = start_date.toordinal()
+    ordinals = np.arange(start_ordinal, start_ordinal + days)
+    month_days = np.array([datetime.date.fromordinal(int(o)).day for o in ordinals])
+    month_weekdays = np.array([datetime.date.fromordinal(int(o)).weekday() for o in ordinals])
+    texts = {"positive": np.array(POSITIVE, dtype=object), "neutral": np.array(NEUTRAL, dtype=object),
+             "negative": np.array(NEGATIVE, dtype=object), "reshare": np.array(RESHARES, dtype=object)}
+    width = max(3, len(str(count)))
+
+    for first in range(0, count, chunk_size):
+        n = min(chunk_size, count - first)
+        user = sample(user_cumulative, n, rng)
+        # Most tweets come from the user's home location, the rest from anywhere.
+        location = np.where(rng.random(n) < 0.85, users["home"][user], sample(location_cumulative, n, rng))
+        day = rng.integers(0, days, n)
+        hour = sample(hour_cumulative, n, rng)
+
+        language = np.empty(n, dtype=object)
+        country = countries[location]
+        for name, cumulative in language_cumulative.items():
+            mask = country == name
+            if mask.any():
+                language[mask] = languages[sample(cumulative, int(mask.sum()), rng)]
+
+        reshare = rng.random(n) < 0.3
+        influence = users["influence"][user]
+        reach = np.maximum(1, influence * rng.lognormal(0, 0.5, n)).astype(np.int64)
+        retweets = rng.poisson(reach * np.where(reshare, 0.004, 0.008))
+        likes = rng.poisson(reach * 0.02)
+        klout = np.clip(np.log10(influence) * 18 + rng.normal(0, 5, n), 1, 100).astype(np.int64)
+        sentiment = np.round(np.clip(rng.normal(0.15, 0.45, n), -1, 1), 1)
+
+        text = np.empty(n, dtype=object)
+        kinds = {"reshare": reshare, "positive": ~reshare & (sentiment > 0.2),
+                 "negative": ~reshare & (sentiment < -0.2), "neutral": ~reshare & (np.abs(sentiment) <= 0.2)}
+        for kind, mask in kinds.items():
+            text[mask] = texts[kind][rng.integers(0, len(texts[kind]), int(mask.sum()))]
+
+        ids = [f"tw-{i:0{width}d}" for i in range(first + 1, first + n + 1)]
+        yield list(zip(ids, weekdays[month_weekdays[day]].tolist(), hour.tolist(), month_days[day].tolist(),
+                       language.tolist(), reshare.astype(np.int64).tolist(), reach.tolist(), retweets.tolist(),
+                       likes.tolist(), klout.tolist(), sentiment.tolist(), text.tolist(),
+                       [locations[i][0] for i in location.tolist()], users["ids"][user].tolist()))
+
+
+def load(connection: sqlite3.Connection, table: str, rows, columns: int, transaction_rows: int) -> int:
+    """Insert an iterable of row chunks with executemany, committing every `transaction_rows` rows."""
+    statement = f'INSERT INTO "{table}" VALUES ({", ".join("?" * columns)})'
+    total = pending = 0
+    connection.execute("BEGIN")
+    for chunk in rows:
+        connection.executemany(statement, chunk)
+        total += len(chunk)
+        pending += len(chunk)
+        if pending >= transaction_rows:
+            connection.execute("COMMIT")
+            connection.execute("BEGIN")
+            pending = 0
+    connection.execute("COMMIT")
+    return total
+
+
+def generate(output: str | Path, tweets: int, users: int, locations: int, chunk_size: int = 100_000,
+             transaction_rows: int = 1_000_000, seed: int = 0, overwrite: bool = False, verbose: bool = True) -> dict:
+    """Generate and bulk-load the database; return row counts and timings."""
+    output = Path(output)
+    if output.exists():
+        if not overwrite:
+            raise FileExistsError(f"{output} exists; pass overwrite=True (--overwrite) to replace it")
+        for path in (output, Path(f"{output}-wal"), Path(f"{output}-shm")):
+            path.unlink(missing_ok=True)
+
+    rng = np.random.default_rng(seed)
+    # Autocommit mode, so the transactions are exactly the BEGIN/COMMITs in load().
+    connection = sqlite3.connect(output, isolation_level=None)
+    connection.execute("PRAGMA journal_mode = WAL")
+    # No fsync during the load: a crash means regenerating, not corrupt data in use.
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("PRAGMA cache_size = -262144")  # 256 MiB
+    connection.execute("PRAGMA temp_store = MEMORY")
+    connection.executescript(SCHEMA)
+    timings = {}
+
+    start = time.perf_counter()
+    location_rows = make_locations(locations, rng)
+    load(connection, "location", [location_rows], 5, transaction_rows)
+    user_data = make_users(users, len(location_rows), rng)
+    user_rows = list(zip(user_data["ids"].tolist(), user_data["gender"].tolist()))
+    load(connection, "user", (user_rows[i:i + chunk_size] for i in range(0, users, chunk_size)), 2,
+         transaction_rows)
+    timings["users_and_locations"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    def progress(chunks):
+        done = 0
+        for chunk in chunks:
+            yield chunk
+            done += len(chunk)
+            if verbose and done % (10 * chunk_size) < len(chunk):
+                elapsed = time.perf_counter() - start
+                print(f"  {done:,} tweets, {done / elapsed:,.0f} rows/s", flush=True)
+
+    load(connection, "tweet", progress(tweet_chunks(tweets, user_data, location_rows, chunk_size, rng)), 14,
+         transaction_rows)
+    timings["tweets"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    connection.executescript(INDEXES)
+    connection.execute("ANALYZE")
+    timings["indexes"] = time.perf_counter() - start
+
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.close()
+    result = {"tweets": tweets, "users": users, "locations": len(location_rows),
+              "bytes": output.stat().st_size, "seconds": timings}
+    if verbose:
+        print(f"Wrote {output}: {tweets:,} tweets, {users:,} users, {len(location_rows):,} locations, "
+              f"{result['bytes'] / 2**20:,.0f} MiB")
+        print("  " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic social_media.db.")
+    parser.add_argument("--output", default="social_media_large.db")
+    parser.add_argument("--tweets", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--locations", type=int, default=2_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--transaction-rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    generate(args.output, args.tweets, args.users, args.locations, args.chunk_size, args.transaction_rows,
+             args.seed, args.overwrite)
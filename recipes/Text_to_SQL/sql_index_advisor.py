@@ -0,0 +1,455 @@
+"""
+Recommend SQLite indexes for the SQL a model generates, measured before applied.
+
+The queries Granite writes for questions like "How many reshared tweets are
+there in Ontario?" join `tweet` with `location` and filter on columns that
+have no index, so each one scans the whole `tweet` table. `IndexAdvisor`
+records the generated SQL as a workload, then:
+
+1. runs `EXPLAIN QUERY PLAN` on each query to find full scans, lookups into
+   the table after an index search and temporary sort B-trees;
+2. proposes indexes per table from the columns each query filters, joins,
+   groups and sorts on, extended with the other columns it reads so the
+   index covers the query (no lookups into the table itself);
+3. tries every proposal on a scratch copy of the database, timing the
+   queries with and without it, and keeps only those that make some query at
+   least `min_speedup` times faster; and
+4. measures the kept indexes together and reports per-query speedups and
+   index sizes. Nothing touches the real database until `apply()`.
+
+    advisor = IndexAdvisor("TwitterDataset/social_media.db")
+    sql_query, result = get_answer_using_fewshot(db_schema, question)
+    advisor.record(sql_query, question)       # appended to sql_workload.jsonl
+    ...
+    report = advisor.evaluate()
+    print_report(report)
+    advisor.apply(report)
+
+or from the command line, with the workload recorded by earlier runs:
+
+    python sql_index_advisor.py TwitterDataset/social_media_large.db --apply
+
+The proposals come from a lightweight tokenizer rather than a full SQL
+parser, so they are guesses; the measurements on the scratch copy decide.
+"""
+import json
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+WORKLOAD_FILE = Path("sql_workload.jsonl")
+
+# Longest index proposed; past this a covering index costs more to maintain than it saves.
+MAX_INDEX_COLUMNS = 6
+
+# Rows sampled per column to estimate how selective an equality filter is.
+SAMPLE_ROWS = 100_000
+
+CLAUSES = {"SELECT", "FROM", "JOIN", "ON", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "USING"}
+KEYWORDS = CLAUSES | {"AS", "INNER", "LEFT", "RIGHT", "OUTER", "CROSS", "NATURAL", "BY", "AND", "OR", "NOT",
+                      "IN", "IS", "NULL", "LIKE", "BETWEEN", "ASC", "DESC", "DISTINCT", "UNION", "ALL",
+                      "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS", "OFFSET"}
+TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|`[^`]*`|\[[^\]]*\]|\d+(?:\.\d+)?|\w+|<=|>=|<>|!=|==|\S")
+COMPARISONS = {"<", ">", "<=", ">=", "BETWEEN", "LIKE", "GLOB"}
+
+
+def clean_sql(text: str) -> str:
+    """The first statement of a model's answer, without Markdown fences or a trailing semicolon."""
+    text = re.sub(r"```(?:sql)?", "", text, flags=re.IGNORECASE).strip()
+    # The first semicolon that completes a statement, not one inside a string literal like '%;%'.
+    for match in re.finditer(";", text):
+        if sqlite3.complete_statement(text[:match.end()]):
+            return text[:match.start()].strip()
+    return text
+
+
+def normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", clean_sql(sql)).strip()
+
+
+def _unquote(token: str) -> str:
+    return token[1:-1] if token[:1] in "\"`[" else token
+
+
+def _is_value(token: str) -> bool:
+    return token[:1] in "'?:@$" or token[:1].isdigit() or token.upper() == "NULL"
+
+
+def column_usage(sql: str, schema: dict[str, list[str]]) -> dict[str, dict[str, list[str]]]:
+    """Classify the columns a query uses, per table: equality, join, range, group, order and read.
+
+    `schema` maps lower-case table names to their column names.
+    """
+    tokens = TOKEN_RE.findall(clean_sql(sql))
+    aliases, referenced = {}, []
+    upper = [token.upper() for token in tokens]
+
+    # Tables and aliases, from FROM/JOIN items and comma-separated FROM lists.
+    clause = None
+    for i, token in enumerate(upper):
+        if token in CLAUSES:
+            clause = token
+        if (token in ("FROM", "JOIN") or (token == "," and clause == "FROM")) and i + 1 < len(tokens):
+            table = _unquote(tokens[i + 1]).lower()
+            if table not in schema:
+                continue
+            referenced.append(table)
+            aliases[table] = table
+            j = i + 2
+            if j < len(tokens) and upper[j] == "AS":
+                j += 1
+            if j < len(tokens) and re.fullmatch(r"\w+", tokens[j]) and upper[j] not in KEYWORDS:
+                aliases[tokens[j].lower()] = table
+
+    usage = {table: {key: [] for key in ("equality", "join", "range", "group", "order", "read")}
+             for table in referenced}
+
+    def resolve(i: int) -> tuple[str, str, int] | None:
+        """The (table, column, last token index) of a column reference starting at token i."""
+        token = _unquote(tokens[i])
+        if i + 2 < len(tokens) and tokens[i + 1] == "." and token.lower() in aliases:
+            table = aliases[token.lower()]
+            column = _unquote(tokens[i + 2])
+            match = next((c for c in schema[table] if c.lower() == column.lower()), None)
+            return (table, match, i + 2) if match else None
+        if i > 0 and tokens[i - 1] == ".":
+            return None
+        owners = [(table, c) for table in referenced for c in schema[table] if c.lower() == token.lower()]
+        return (*owners[0], i) if len(owners) == 1 else None
+
+    clause = None
+    i = 0
+    while i < len(tokens):
+        if upper[i] in CLAUSES:
+            clause = upper[i]
+        reference = resolve(i) if upper[i] not in KEYWORDS and not _is_value(tokens[i]) else None
+        if reference is None:
+            i += 1
+            continue
+        table, column, end = reference
+        following = upper[end + 1] if end + 1 < len(tokens) else ""
+        previous = upper[i - 1] if i > 0 else ""
+        kind = "read"
+        if clause in ("WHERE", "ON", "HAVING"):
+            if following in ("=", "=="):
+                other = resolve(end + 2) if end + 2 < len(tokens) else None
+                kind = "join" if other is not None and other[0] != table else "equality"
+            elif previous in ("=", "=="):
+                other = resolve(i - 2 - (2 if i >= 3 and tokens[i - 3] == "." else 0)) if i >= 2 else None
+                kind = "join" if other is not None and other[0] != table else "equality"
+            elif following == "IN" or (following == "IS" and end + 2 < len(tokens)):
+                kind = "equality"
+            elif following in COMPARISONS or previous in COMPARISONS or following == "NOT":
+                kind = "range"
+        elif clause == "GROUP":
+            kind = "group"
+        elif clause == "ORDER":
+            kind = "order"
+        if column not in usage[table][kind]:
+            usage[table][kind].append(column)
+        i = end + 1
+
+    for table, columns in usage.items():
+        seen = [column for kind in ("equality", "join", "range", "group", "order") for column in columns[kind]]
+        columns["read"] = list(dict.fromkeys(seen + columns["read"]))
+    return usage
+
+
+class IndexAdvisor:
+    """Record generated SQL and recommend indexes measured on a scratch copy of the database."""
+
+    def __init__(self, database: str | Path, workload_file: str | Path = WORKLOAD_FILE):
+        self.database = Path(database)
+        self.workload_file = Path(workload_file)
+        if not self.database.exists():
+            raise FileNotFoundError(self.database)
+
+    # --- workload ---
+
+    def record(self, sql: str, question: str | None = None) -> str | None:
+        """Append a generated query to the workload file; return why it was rejected, if it was.
+
+        Queries that don't prepare against the database (the model sometimes
+        writes invalid SQL) are not recorded.
+        """
+        sql = clean_sql(sql)
+        connection = sqlite3.connect(f"file:{self.database}?mode=ro", uri=True)
+        try:
+            self.explain(connection, sql)
+        except sqlite3.Error as error:
+            return str(error)
+        finally:
+            connection.close()
+        self.workload_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.workload_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"sql": sql, "question": question, "recorded": time.time()}) + "\n")
+        return None
+
+    def workload(self) -> list[dict]:
+        """The recorded read-only queries, deduplicated, each with how often it was recorded."""
+        queries = {}
+        if self.workload_file.exists():
+            with open(self.workload_file, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    key = normalize_sql(entry["sql"])
+                    if not re.match(r"(?i)\s*(SELECT|WITH)\b", key):
+                        continue
+                    query = queries.setdefault(key, {"sql": key, "question": entry.get("question"), "count": 0})
+                    query["count"] += 1
+        return list(queries.values())
+
+    # --- inspection ---
+
+    @staticmethod
+    def schema(connection: sqlite3.Connection) -> dict[str, list[str]]:
+        tables = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return {table.lower(): [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+                for table in tables}
+
+    @staticmethod
+    def existing_indexes(connection: sqlite3.Connection) -> dict[str, list[list[str]]]:
+        """Column lists of the indexes each table already has."""
+        indexes = {}
+        for table, name in connection.execute(
+                "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'"):
+            columns = [row[2] for row in connection.execute(f'PRAGMA index_info("{name}")')]
+            indexes.setdefault(table.lower(), []).append(columns)
+        return indexes
+
+    @staticmethod
+    def explain(connection: sqlite3.Connection, sql: str) -> list[str]:
+        """The EXPLAIN QUERY PLAN steps, e.g. "SCAN T" or "SEARCH L USING INDEX ...". """
+        return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+    @staticmethod
+    def problems(plan: list[str]) -> list[str]:
+        """Plan steps a better index could improve: full scans, table lookups and temporary sort B-trees."""
+        return [step for step in plan
+                if (step.startswith(("SCAN ", "SEARCH ")) and "COVERING INDEX" not in step
+                    and "PRIMARY KEY" not in step) or "TEMP B-TREE" in step]
+
+    def _distinct_ratio(self, connection: sqlite3.Connection, table: str, column: str, cache: dict) -> float:
+        """Distinct values per sampled row; higher means a more selective equality filter."""
+        if (table, column) not in cache:
+            count, distinct = connection.execute(
+                f'SELECT COUNT(*), COUNT(DISTINCT "{column}") FROM (SELECT "{column}" FROM "{table}" LIMIT ?)',
+                (SAMPLE_ROWS,)).fetchone()
+            cache[(table, column)] = distinct / count if count else 0.0
+        return cache[(table, column)]
+
+    def propose(self, connection: sqlite3.Connection, queries: list[dict]) -> list[dict]:
+        """Candidate indexes for the tables that the queries scan or sort."""
+        schema = self.schema(connection)
+        existing = self.existing_indexes(connection)
+        ratios = {}
+        candidates = {}
+        for number, query in enumerate(queries):
+            if not self.problems(self.explain(connection, query["sql"])):
+                continue
+            for table, used in column_usage(query["sql"], schema).items():
+                equality = sorted(used["equality"], reverse=True,
+                                  key=lambda column: self._distinct_ratio(connection, table, column, ratios))
+                tail = used["range"][:1] or used["group"] or used["order"]
+                keys = [equality + used["join"] + tail]
+                if used["join"]:
+                    keys.append(used["join"] + equality + tail)
+                if used["group"] and not equality:
+                    keys.append(used["group"])
+                for key in keys:
+                    key = list(dict.fromkeys(key))
+                    if not key:
+                        continue
+                    covering = list(dict.fromkeys(key + used["read"]))
+                    for columns in ([covering] if len(covering) <= MAX_INDEX_COLUMNS else []) + [key]:
+                        if any(index[:len(columns)] == columns for index in existing.get(table, [])):
+                            continue
+                        candidate = candidates.setdefault((table, tuple(columns)), {
+                            "table": table, "columns": columns, "name": index_name(table, columns),
+                            "queries": []})
+                        if number not in candidate["queries"]:
+                            candidate["queries"].append(number)
+        return list(candidates.values())
+
+    # --- measurement ---
+
+    @staticmethod
+    def _time(connection: sqlite3.Connection, sql: str, repeat: int) -> float:
+        """Best-of-`repeat` wall time of running the query to completion."""
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connection.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def _size(connection: sqlite3.Connection) -> int:
+        """Bytes in use, not counting free pages (the dropped candidates leave some behind)."""
+        pages = connection.execute("PRAGMA page_count").fetchone()[0] - connection.execute(
+            "PRAGMA freelist_count").fetchone()[0]
+        return pages * connection.execute("PRAGMA page_size").fetchone()[0]
+
+    def evaluate(self, queries: list[dict] | None = None, repeat: int = 3, min_speedup: float = 1.2,
+                 min_saved: float = 0.001, verbose: bool = True) -> dict:
+        """Measure every proposal on a scratch copy and return the recommended indexes and speedups.
+
+        An index is recommended when it makes some query at least `min_speedup`
+        times and `min_saved` seconds faster; the second keeps timer noise on
+        small tables from counting as a speedup.
+        """
+        queries = self.workload() if queries is None else queries
+        report = {"database": str(self.database), "queries": [], "indexes": [], "skipped": []}
+        if not queries:
+            return report
+        with tempfile.TemporaryDirectory() as directory:
+            scratch_path = Path(directory) / "scratch.db"
+            start = time.perf_counter()
+            source = sqlite3.connect(self.database)
+            scratch = sqlite3.connect(scratch_path)
+            source.backup(scratch)
+            source.close()
+            # Statistics for the planner, on the copy and the real database alike (apply() runs ANALYZE too).
+            scratch.execute("ANALYZE")
+            if verbose:
+                print(f"Copied {self.database} to a scratch database in {time.perf_counter() - start:.1f}s")
+
+            # Queries that fail here (recorded against another database, or before record() checked them)
+            # are reported and left out rather than aborting the evaluation.
+            valid, baseline, plans = [], [], []
+            for query in queries:
+                try:
+                    plan = self.explain(scratch, query["sql"])
+                    seconds = self._time(scratch, query["sql"], repeat)
+                except sqlite3.Error as error:
+                    report["skipped"].append({**query, "error": str(error)})
+                    continue
+                valid.append(query)
+                plans.append(plan)
+                baseline.append(seconds)
+            queries = valid
+            if not queries:
+                scratch.close()
+                return report
+            candidates = self.propose(scratch, queries)
+            if verbose:
+                print(f"{len(queries)} queries, {len(candidates)} candidate indexes")
+
+            for candidate in candidates:
+                scratch.execute(create_index_sql(candidate))
+                scratch.execute(f'ANALYZE "{candidate["name"]}"')
+                candidate["timings"] = {number: self._time(scratch, queries[number]["sql"], repeat)
+                                        for number in candidate["queries"]}
+                candidate["saved"] = sum((baseline[number] - seconds) * queries[number]["count"]
+                                         for number, seconds in candidate["timings"].items())
+                scratch.execute(f'DROP INDEX "{candidate["name"]}"')
+
+            # For each query, the candidate that made it fastest, if it is fast enough to be worth it.
+            chosen = {}
+            for number in range(len(queries)):
+                timed = [(candidate["timings"][number], candidate["name"], candidate) for candidate in candidates
+                         if number in candidate["timings"]]
+                if timed:
+                    seconds, name, best = min(timed, key=lambda item: item[:2])
+                    speedup = baseline[number] / max(seconds, 1e-9)
+                    if speedup >= min_speedup and baseline[number] - seconds >= min_saved:
+                        chosen[name] = best
+
+            size_before = self._size(scratch)
+            sizes = {}
+            for candidate in chosen.values():
+                before = self._size(scratch)
+                scratch.execute(create_index_sql(candidate))
+                sizes[candidate["name"]] = self._size(scratch) - before
+            scratch.execute("ANALYZE")
+            final = [self._time(scratch, query["sql"], repeat) for query in queries]
+            final_plans = [self.explain(scratch, query["sql"]) for query in queries]
+            scratch.close()
+
+        for number, query in enumerate(queries):
+            report["queries"].append({**query, "baseline": baseline[number], "final": final[number],
+                                      "speedup": baseline[number] / max(final[number], 1e-9),
+                                      "plan": plans[number], "final_plan": final_plans[number]})
+        for candidate in chosen.values():
+            used_by = [number for number, plan in enumerate(final_plans)
+                       if any(candidate["name"] in step for step in plan)]
+            # With the other indexes present the planner may prefer one of them; keep only what is used.
+            if used_by:
+                report["indexes"].append({"name": candidate["name"], "table": candidate["table"],
+                                          "columns": candidate["columns"], "sql": create_index_sql(candidate),
+                                          "bytes": sizes[candidate["name"]], "saved": candidate["saved"],
+                                          "used_by": used_by})
+        report["size_before"] = size_before
+        return report
+
+    def apply(self, report: dict) -> None:
+        """Create the recommended indexes on the real database."""
+        connection = sqlite3.connect(self.database)
+        with connection:
+            for index in report["indexes"]:
+                connection.execute(index["sql"])
+        connection.execute("ANALYZE")
+        connection.close()
+
+
+def index_name(table: str, columns: list[str]) -> str:
+    return "advisor_" + "_".join([table, *columns]).lower()
+
+
+def create_index_sql(candidate: dict) -> str:
+    columns = ", ".join(f'"{column}"' for column in candidate["columns"])
+    return f'CREATE INDEX IF NOT EXISTS "{candidate["name"]}" ON "{candidate["table"]}" ({columns})'
+
+
+def print_report(report: dict, file=None) -> None:
+    for query in report.get("skipped", []):
+        print(f"Skipped (fails on this database): {query['sql'][:100]}\n    {query['error']}", file=file)
+    for number, query in enumerate(report["queries"]):
+        print(f"\n[{number}] {query['question'] or query['sql'][:100]}", file=file)
+        print(f"    {query['sql']}", file=file)
+        print(f"    {query['baseline'] * 1000:.1f} ms -> {query['final'] * 1000:.1f} ms "
+              f"({query['speedup']:.1f}x)", file=file)
+        for before in IndexAdvisor.problems(query["plan"]):
+            print(f"    before: {before}", file=file)
+        if query["speedup"] > 1:
+            for after in query["final_plan"]:
+                print(f"    after:  {after}", file=file)
+    if not report["indexes"]:
+        print("\nNo index made any query fast enough to recommend.", file=file)
+        return
+    print("\nRecommended indexes:", file=file)
+    for index in report["indexes"]:
+        print(f"  {index['sql']};", file=file)
+        print(f"    {index['bytes'] / 2**20:.1f} MiB, used by queries {index['used_by']}, "
+              f"saves {index['saved'] * 1000:.1f} ms per workload run", file=file)
+    total = sum(index["bytes"] for index in report["indexes"])
+    print(f"Total index size {total / 2**20:.1f} MiB "
+          f"({100 * total / max(report['size_before'], 1):.0f}% of the database)", file=file)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recommend indexes for a recorded workload of generated SQL.")
+    parser.add_argument("database")
+    parser.add_argument("--workload", default=str(WORKLOAD_FILE))
+    parser.add_argument("--record", metavar="SQL", action="append", default=[],
+                        help="add a query to the workload before evaluating (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-speedup", type=float, default=1.2)
+    parser.add_argument("--apply", action="store_true", help="create the recommended indexes")
+    args = parser.parse_args()
+
+    advisor = IndexAdvisor(args.database, args.workload)
+    for sql in args.record:
+        error = advisor.record(sql)
+        if error:
+            print(f"Not recorded: {error}")
+    report = advisor.evaluate(repeat=args.repeat, min_speedup=args.min_speedup)
+    print_report(report)
+    if args.apply and report["indexes"]:
+        advisor.apply(report)
+        print(f"\nCreated {len(report['indexes'])} index(es) on {args.database}")
@@ -0,0 +1,305 @@
+"""
+Sandboxed, concurrent execution of generated shell commands (Linux only).
+
+The notebook runs each generated script with `os.system`, one at a time, with
+no timeout, no output cap and no isolation. `ShellExecutor` instead:
+
+- rejects scripts matching destructive patterns (and scripts `bash -n`
+  can't parse) before anything runs,
+- runs scripts on a pool of reusable workers, each with its own scratch
+  working directory that is emptied between commands,
+- applies per-command wall-clock, CPU time, memory and file size limits,
+  and optionally a cap on the number of processes, and
+- streams stdout and stderr, keeping at most `max_output` bytes of each.
+
+Resource limits can only be lowered, never raised again, by an unprivileged
+process, so each command gets a fresh shell with its own limits rather than
+reusing a long-lived shell whose limits would ratchet down.
+
+The process cap (`max_user_processes`, off by default) is `ulimit -u`,
+that is RLIMIT_NPROC, which counts every process of the user running the
+executor, not just the command's: the other workers' commands, and
+anything else the user runs, count towards it too. It bounds a runaway
+fork loop, but set it well above the user's usual process count, or
+commands fail to fork for reasons of their own. A true per-command limit
+needs a cgroup (`pids.max`) or a separate user per worker.
+
+    with ShellExecutor(workers=8) as executor:
+        results = executor.run_many([shell_code1, shell_code2])
+"""
+import os
+import re
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+
+# Recursive deletes are checked per command on the shlex-split script (see _delete_problems);
+# these patterns catch the rest.
+DESTRUCTIVE_PATTERNS = [
+    (r"\brm\s+.*--no-preserve-root", "rm --no-preserve-root"),
+    (r"\bmkfs(\.\w+)?\b", "formats a file system"),
+    (r"\bdd\b.*\bof=/dev/", "dd onto a device"),
+    (r">\s*/dev/(sd|nvme|hd|xvd|vd|disk)\w*", "writes to a block device"),
+    (r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:", "fork bomb"),
+    (r"\b(shutdown|reboot|halt|poweroff|init\s+[06])\b", "shuts down or reboots the host"),
+    (r"\b(sudo|su|doas)\b", "escalates privileges"),
+    (r"\bchmod\s+(-\w+\s+)*-\w*R\w*\s+\S*\s+/(\s|$)", "recursive chmod of /"),
+    (r"\bchown\s+(-\w+\s+)*-\w*R\w*\s+\S*\s+/(\s|$)", "recursive chown of /"),
+    (r"\b(curl|wget)\b[^|;&]*\|\s*(ba|z)?sh\b", "pipes a download into a shell"),
+    (r"\bkill(all)?\s+(-\w+\s+)*-1\b", "kills every process"),
+    (r"\bcrontab\s+-r\b", "removes the crontab"),
+    (r"\bgit\s+push\s+.*(--force|-f)\b", "force-pushes"),
+    (r">\s*/etc/", "overwrites a system file"),
+]
+
+_COMPILED_PATTERNS = [(re.compile(pattern), reason) for pattern, reason in DESTRUCTIVE_PATTERNS]
+
+# /, ~, $HOME, . or .., optionally followed by slashes and a *, or a bare *.
+_ROOT_TARGET = re.compile(r"(/|~|\$\{?HOME\}?|\.\.?)?/*\*?")
+# Targets whose deletion is destructive even when a find expression filters what goes.
+_HOME_OR_ROOT = re.compile(r"(/|~|\$\{?HOME\}?)/*\*?")
+# find options that don't narrow down which files are deleted.
+_FIND_OPTIONS = {"-delete", "-depth", "-xdev", "-mount", "-mindepth", "-maxdepth", "-print", "-L", "-P", "-H"}
+
+
+def _commands(script: str) -> list[list[str]]:
+    """Split a script into simple commands, as lists of words with quotes removed.
+
+    Commands are separated by newlines, ;, &&, ||, |, & and parentheses.
+    """
+    lexer = shlex.shlex(script.replace("\\\n", " "), posix=True, punctuation_chars=";&|()<>\n")
+    lexer.whitespace = " \t\r"
+    lexer.whitespace_split = True
+    commands, words = [], []
+    for token in lexer:
+        if token and set(token) <= set(";&|()\n"):
+            commands.append(words)
+            words = []
+        else:
+            words.append(token)
+    commands.append(words)
+    return [words for words in commands if words]
+
+
+def _delete_problems(script: str) -> list[str]:
+    """Reasons to reject recursive `rm` and `find -delete` commands aimed at /, ~, . or *."""
+    try:
+        commands = _commands(script)
+    except ValueError:
+        return []  # unbalanced quotes; `bash -n` rejects the script anyway
+    problems = []
+    for words in commands:
+        names = [os.path.basename(word) for word in words]
+        if "rm" in names:
+            options, targets, end_of_options = [], [], False
+            for word in words[names.index("rm") + 1:]:
+                if end_of_options or word == "-" or not word.startswith("-"):
+                    targets.append(word)  # GNU rm takes options after targets too, as in `rm / -rf`
+                elif word == "--":
+                    end_of_options = True
+                else:
+                    options.append(word)
+            recursive = any(option == "--recursive" or (not option.startswith("--") and set(option) & {"r", "R"})
+                            for option in options)
+            if recursive and any(_ROOT_TARGET.fullmatch(target) for target in targets):
+                problems.append("recursive rm of /, ~, . or *")
+        if "find" in names:
+            arguments = words[names.index("find") + 1:]
+            if "-delete" in arguments or any(a in ("-exec", "-execdir", "-ok") and i + 1 < len(arguments)
+                                             and os.path.basename(arguments[i + 1]) == "rm"
+                                             for i, a in enumerate(arguments)):
+                paths = []
+                for word in arguments:
+                    if word in ("-L", "-P", "-H"):
+                        continue
+                    if word.startswith(("-", "(", "!")):
+                        break
+                    paths.append(word)
+                unfiltered = all(word in _FIND_OPTIONS or word.isdigit() for word in arguments[len(paths):])
+                if any(_HOME_OR_ROOT.fullmatch(path) or (unfiltered and _ROOT_TARGET.fullmatch(path))
+                       for path in paths or ["."]):
+                    problems.append("find deleting under /, ~, . or *")
+    return list(dict.fromkeys(problems))
+
+
+def check_command(script: str, shell: str = "bash") -> list[str]:
+    """Statically check a script without running it.
+
+    Returns a list of reasons to reject it; an empty list means it passed.
+    Besides the destructive patterns and recursive deletes, the script must
+    parse with `bash -n`.
+    """
+    problems = _delete_problems(script)
+    problems += [reason for pattern, reason in _COMPILED_PATTERNS if pattern.search(script)]
+    syntax = subprocess.run([shell, "-n"], input=script, capture_output=True, text=True)
+    if syntax.returncode != 0:
+        problems.append(f"syntax error: {syntax.stderr.strip()}")
+    return problems
+
+
+def _ulimit_prefix(cpu_time: int, memory_mb: int, file_size_mb: int, max_user_processes: int | None) -> str:
+    """Return a `ulimit` line that applies the resource limits in the command's shell.
+
+    Setting limits in the fresh shell itself, rather than in a `preexec_fn`,
+    keeps process creation safe while the executor's threads are running.
+    """
+    processes = f"-u {max_user_processes} " if max_user_processes is not None else ""
+    return (f"ulimit -t {cpu_time} -v {memory_mb * 1024} -f {file_size_mb * 1024} "
+            f"{processes}-c 0 || exit 125\n")
+
+
+class ShellExecutor:
+    """Run generated shell scripts concurrently under resource limits."""
+
+    def __init__(self, workers: int = 4, wall_time: float = 10, cpu_time: int = 5,
+                 memory_mb: int = 512, file_size_mb: int = 64, max_user_processes: int | None = None,
+                 max_output: int = 64 * 1024, shell: str = "bash"):
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.memory_mb = memory_mb
+        self.file_size_mb = file_size_mb
+        self.max_user_processes = max_user_processes
+        self.max_output = max_output
+        self.shell = shutil.which(shell) or shell
+
+        self.root = Path(tempfile.mkdtemp(prefix="shell_executor_"))
+        self.sandboxes = Queue()
+        for i in range(workers):
+            sandbox = self.root / f"worker{i}"
+            sandbox.mkdir()
+            self.sandboxes.put(sandbox)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run(self, script: str, dry_run: bool = False) -> dict:
+        """Check and run one script, blocking until it finishes.
+
+        With `dry_run=True` the script is only checked. Returns a dict with
+        the `status` ("rejected", "checked", "ok", "failed" or "timeout"),
+        `returncode`, captured `stdout`/`stderr`, whether each was
+        `truncated`, any static-check `problems`, and `elapsed` seconds.
+        """
+        problems = check_command(script, self.shell)
+        result = {"script": script, "problems": problems, "returncode": None,
+                  "stdout": "", "stderr": "", "truncated": False, "elapsed": 0.0}
+        if problems:
+            return {**result, "status": "rejected"}
+        if dry_run:
+            return {**result, "status": "checked"}
+
+        sandbox = self.sandboxes.get()
+        try:
+            return {**result, **self._execute(script, sandbox)}
+        finally:
+            for child in sandbox.iterdir():
+                if child.is_dir() and not child.is_symlink():
+                    shutil.rmtree(child, ignore_errors=True)
+                else:
+                    child.unlink(missing_ok=True)
+            self.sandboxes.put(sandbox)
+
+    def run_many(self, scripts: list[str], dry_run: bool = False) -> list[dict]:
+        """Run scripts on the worker pool; results are in the same order."""
+        return list(self.pool.map(lambda script: self.run(script, dry_run), scripts))
+
+    def _execute(self, script: str, sandbox: Path) -> dict:
+        env = {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": str(sandbox),
+               "TMPDIR": str(sandbox), "LANG": os.environ.get("LANG", "C.UTF-8")}
+        start = time.monotonic()
+        limits = _ulimit_prefix(self.cpu_time, self.memory_mb, self.file_size_mb, self.max_user_processes)
+        proc = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc", "-c", limits + script],
+            cwd=sandbox, env=env, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True,  # own process group, so a timeout can kill the whole tree
+        )
+
+        captured = {proc.stdout: bytearray(), proc.stderr: bytearray()}
+        truncated = False
+        timed_out = False
+        deadline = start + self.wall_time
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ)
+            selector.register(proc.stderr, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                for key, _ in selector.select(timeout=remaining):
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                        continue
+                    buffer = captured[key.fileobj]
+                    room = self.max_output - len(buffer)
+                    if len(chunk) > room:
+                        truncated = True
+                    # Keep draining past the cap so the command never blocks on a full pipe.
+                    buffer.extend(chunk[:max(room, 0)])
+
+        if timed_out:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        try:
+            returncode = proc.wait(timeout=max(deadline - time.monotonic(), 0) + 1)
+        except subprocess.TimeoutExpired:
+            # Output closed but a background child is still running.
+            os.killpg(proc.pid, signal.SIGKILL)
+            returncode = proc.wait()
+            timed_out = True
+        else:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)  # reap anything the script left running
+            except ProcessLookupError:
+                pass
+        proc.stdout.close()
+        proc.stderr.close()
+
+        if timed_out:
+            status = "timeout"
+        else:
+            status = "ok" if returncode == 0 else "failed"
+        return {
+            "status": status,
+            "returncode": returncode,
+            "stdout": captured[proc.stdout].decode("utf-8", errors="replace"),
+            "stderr": captured[proc.stderr].decode("utf-8", errors="replace"),
+            "truncated": truncated,
+            "elapsed": time.monotonic() - start,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    scripts = [Path(path).read_text(encoding="utf-8") for path in sys.argv[1:]] or [sys.stdin.read()]
+    with ShellExecutor() as executor:
+        for result in executor.run_many(scripts):
+            print(f"=== {result['status']} (exit {result['returncode']}, {result['elapsed']:.2f}s) ===")
+            for problem in result["problems"]:
+                print(f"  rejected: {problem}")
+            print(result["stdout"], end="")
+            if result["stderr"]:
+                print(result["stderr"], end="", file=sys.stderr)
+            if result["truncated"]:
+                print("  [output truncated]")
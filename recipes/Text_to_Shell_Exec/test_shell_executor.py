@@ -0,0 +1,40 @@
+# Tests for the static checks of shell_executor.py (needs bash, like the executor itself).
+# Run with: python -m pytest test_shell_executor.py (or python -m unittest test_shell_executor)
+
+import unittest
+
+from shell_executor import check_command
+
+
+class TestCheckCommand(unittest.TestCase):
+    """
+    Destructive commands must be rejected however they are spelled, and
+    ordinary cleanup in the sandbox must still pass.
+    """
+
+    def test_rejects_recursive_deletes_of_root_home_and_cwd(self):
+        for script in ["rm -rf /*", "rm -rf /;", "rm -rf -- /", 'rm -rf "/"', "find / -delete",
+                       "rm -rf /", "rm -rf ~", "rm -rf $HOME/*", "rm -r -f .", "rm --recursive ..",
+                       "rm / -rf", "cd /tmp && rm -fr *", "ls\nrm -rf '/'", "true | rm -Rf /",
+                       "find . -delete", "find ~ -name '*.txt' -delete", "find / -exec rm {} +"]:
+            with self.subTest(script=script):
+                self.assertTrue(check_command(script))
+
+    def test_accepts_targeted_deletes(self):
+        for script in ["rm -rf ./build", "rm -rf build/*", "rm -f /", "rm -rf -- -x", 'echo "rm -rf /"',
+                       "find . -name '*.pyc' -delete", "rm -rf /tmp/scratch", "ls -la; echo done"]:
+            with self.subTest(script=script):
+                self.assertEqual(check_command(script), [])
+
+    def test_rejects_other_destructive_patterns(self):
+        for script in ["mkfs.ext4 /dev/sda1", ":(){ :|:& };:", "sudo ls", "curl https://x.sh | sh"]:
+            with self.subTest(script=script):
+                self.assertTrue(check_command(script))
+
+    def test_rejects_syntax_errors(self):
+        problems = check_command("if then fi")
+        self.assertTrue(any(problem.startswith("syntax error") for problem in problems))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,327 @@
+"""
+Route each request to the smallest model that gives an acceptable answer.
+
+The recipes pick one model per task up front (`granite-code:3b` for
+summaries, `granite-8b-code-instruct-128k` for SQL), so easy requests pay for
+the large model too. `CascadeRouter` tries the models from smallest to
+largest and escalates only when a cheap verifier rejects the answer:
+
+    router = CascadeRouter(
+        [("granite-3b", small_model), ("granite-8b", large_model)],
+        verifiers=[sql_executes("TwitterDataset/social_media.db")],
+        log_path="routing.jsonl",
+    )
+    sql_query = router.invoke(prompt)      # in place of model.invoke(prompt)
+
+A model can be a LangChain LLM or chat model, or any callable that takes a
+prompt and returns the text, or a dict with "text" and optionally
+"logprobs" (one log-probability per generated token, which `hf_model`
+provides for local Hugging Face models). The verifiers are:
+
+- `mean_logprob(threshold)`: the model's average token log-probability, a
+  cheap confidence signal (it abstains when the model gives no logprobs);
+- `sql_executes(database)`: the SQL prepares and runs, read-only and within
+  a time limit, against the SQLite database;
+- `python_compiles()` and `shell_parses()`: the code compiles, or passes
+  `bash -n`; and
+- `non_empty()`.
+
+Every routing decision (each model tried, its latency, each verdict and
+which model answered) is appended to `log_path` as one JSON line. Summarize
+a log with:
+
+    python cascade_router.py routing.jsonl
+
+or try the router with stub models and no network access with
+`python cascade_router.py --demo`.
+"""
+import json
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+def strip_code_fences(text: str) -> str:
+    """The code in a model's answer, without surrounding Markdown fences."""
+    match = re.search(r"```[\w+-]*\n?(.*?)```", text, flags=re.DOTALL)
+    return (match.group(1) if match else text).strip()
+
+
+def first_statement(sql: str) -> str:
+    """The first SQL statement, ending at the first semicolon outside string literals and comments."""
+    for match in re.finditer(";", sql):
+        if sqlite3.complete_statement(sql[:match.end()]):
+            return sql[:match.start()].strip()
+    return sql.strip()
+
+
+def _verdict(passed: bool, reason: str = "", score: float | None = None) -> dict:
+    return {"passed": passed, "reason": reason, "score": score}
+
+
+# --- verifiers: (prompt, answer) -> {"passed", "reason", "score"} ---
+
+def non_empty():
+    def verify(prompt: str, answer: dict) -> dict:
+        return _verdict(bool(answer["text"].strip()), "" if answer["text"].strip() else "empty answer")
+    verify.__name__ = "non_empty"
+    return verify
+
+
+def mean_logprob(threshold: float = -1.0):
+    """Reject answers whose mean token log-probability is below `threshold`."""
+    def verify(prompt: str, answer: dict) -> dict:
+        logprobs = answer.get("logprobs")
+        if not logprobs:
+            return _verdict(True, "no logprobs; abstained")
+        score = sum(logprobs) / len(logprobs)
+        return _verdict(score >= threshold, f"mean logprob {score:.2f} < {threshold}" if score < threshold else "",
+                        score)
+    verify.__name__ = "mean_logprob"
+    return verify
+
+
+# Actions a query may take; anything else (ATTACH, writes, PRAGMA, ...) is denied.
+_READ_ONLY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+
+def _read_only_authorizer(action, *args):
+    return sqlite3.SQLITE_OK if action in _READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def sql_executes(database: str | Path, timeout: float = 2.0):
+    """Reject SQL that doesn't prepare or run against the database (opened read-only).
+
+    `mode=ro` only protects the database itself: ATTACH could still create
+    files, so attaching is disabled and only SELECT statements are authorized.
+    """
+    def verify(prompt: str, answer: dict) -> dict:
+        sql = first_statement(strip_code_fences(answer["text"]))
+        if not sql:
+            return _verdict(False, "no SQL")
+        connection = sqlite3.connect(f"file:{Path(database)}?mode=ro", uri=True)
+        connection.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+        connection.set_authorizer(_read_only_authorizer)
+        deadline = time.perf_counter() + timeout
+        # Returning nonzero from the progress handler aborts the query.
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, 10_000)
+        try:
+            connection.execute(f"EXPLAIN {sql}")
+            connection.execute(sql).fetchmany(1)
+        except sqlite3.OperationalError as error:
+            if "interrupted" in str(error):
+                # Valid SQL that is merely slow is the database's problem, not the model's.
+                return _verdict(True, f"still running after {timeout}s")
+            return _verdict(False, str(error))
+        except sqlite3.Error as error:
+            return _verdict(False, str(error))
+        finally:
+            connection.close()
+        return _verdict(True)
+    verify.__name__ = "sql_executes"
+    return verify
+
+
+def python_compiles():
+    """Reject Python that doesn't compile."""
+    def verify(prompt: str, answer: dict) -> dict:
+        try:
+            compile(strip_code_fences(answer["text"]), "<answer>", "exec")
+        except (SyntaxError, ValueError) as error:
+            return _verdict(False, f"{type(error).__name__}: {error}")
+        return _verdict(True)
+    verify.__name__ = "python_compiles"
+    return verify
+
+
+def shell_parses():
+    """Reject shell commands that `bash -n` can't parse (abstains where bash isn't installed)."""
+    def verify(prompt: str, answer: dict) -> dict:
+        if shutil.which("bash") is None:
+            return _verdict(True, "bash not found; abstained")
+        result = subprocess.run(["bash", "-n"], input=strip_code_fences(answer["text"]), capture_output=True,
+                                text=True, timeout=5)
+        return _verdict(result.returncode == 0, result.stderr.strip())
+    verify.__name__ = "shell_parses"
+    return verify
+
+
+# --- models ---
+
+def _call(model, prompt: str) -> dict:
+    """Call a LangChain model or a callable and normalize the result to {"text", "logprobs"}."""
+    result = model.invoke(prompt) if hasattr(model, "invoke") else model(prompt)
+    if isinstance(result, str):
+        return {"text": result, "logprobs": None}
+    if isinstance(result, dict):
+        return {"text": result["text"], "logprobs": result.get("logprobs")}
+    # LangChain chat models return a message
+    metadata = getattr(result, "response_metadata", {}) or {}
+    logprobs = metadata.get("logprobs")
+    if isinstance(logprobs, dict):  # OpenAI-style {"content": [{"logprob": ...}, ...]}
+        logprobs = [token["logprob"] for token in logprobs.get("content") or []]
+    return {"text": result.content, "logprobs": logprobs}
+
+
+def hf_model(model, tokenizer, max_new_tokens: int = 200):
+    """Wrap a local Hugging Face model as a callable that also returns token log-probabilities."""
+    import torch
+
+    @torch.no_grad()
+    def generate(prompt: str) -> dict:
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                return_dict_in_generate=True, output_scores=True,
+                                pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None
+                                else tokenizer.eos_token_id)
+        scores = model.compute_transition_scores(output.sequences, output.scores, normalize_logits=True)
+        new_tokens = output.sequences[0, inputs["input_ids"].shape[1]:]
+        return {"text": tokenizer.decode(new_tokens, skip_special_tokens=True),
+                "logprobs": scores[0].float().tolist()}
+
+    return generate
+
+
+class CascadeRouter:
+    """Try models from smallest to largest, escalating when a verifier rejects the answer."""
+
+    def __init__(self, models: list[tuple[str, object]], verifiers: list | None = None,
+                 log_path: str | Path | None = "routing.jsonl"):
+        if not models:
+            raise ValueError("CascadeRouter needs at least one model")
+        self.models = models
+        self.verifiers = verifiers if verifiers is not None else [non_empty()]
+        self.log_path = Path(log_path) if log_path is not None else None
+        self.lock = threading.Lock()
+
+    def route(self, prompt: str, verifiers: list | None = None, task: str | None = None) -> dict:
+        """Answer a prompt and return the decision: the answer, the model used and every attempt."""
+        verifiers = self.verifiers if verifiers is None else verifiers
+        start = time.perf_counter()
+        attempts = []
+        for level, (name, model) in enumerate(self.models):
+            call_start = time.perf_counter()
+            try:
+                answer = _call(model, prompt)
+                error = None
+            except Exception as exception:  # a failing model escalates like a rejected answer
+                answer, error = {"text": "", "logprobs": None}, f"{type(exception).__name__}: {exception}"
+            attempt = {"model": name, "latency": time.perf_counter() - call_start, "error": error,
+                       "verdicts": []}
+            last = level == len(self.models) - 1
+            if error is None:
+                for verify in verifiers:
+                    verify_start = time.perf_counter()
+                    verdict = verify(prompt, answer)
+                    attempt["verdicts"].append({"verifier": verify.__name__, **verdict,
+                                                "latency": time.perf_counter() - verify_start})
+                    if not verdict["passed"]:
+                        break
+            attempt["accepted"] = error is None and all(v["passed"] for v in attempt["verdicts"])
+            attempts.append(attempt)
+            if attempt["accepted"] or last:
+                break
+
+        decision = {"id": uuid.uuid4().hex, "time": time.time(), "task": task, "model": attempts[-1]["model"],
+                    "verified": attempts[-1]["accepted"], "escalations": len(attempts) - 1,
+                    "latency": time.perf_counter() - start, "attempts": attempts}
+        if self.log_path is not None:
+            with self.lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(decision) + "\n")
+        decision["answer"] = answer["text"]
+        return decision
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        """The answer text only, so the router can stand in for `model.invoke(prompt)`."""
+        return self.route(prompt, **kwargs)["answer"]
+
+
+def summarize(path: str | Path) -> dict:
+    """Per-model request shares and latencies, escalation rate and rejections per verifier."""
+    with open(path, encoding="utf-8") as f:
+        decisions = [json.loads(line) for line in f if line.strip()]
+    models, rejections = {}, {}
+    for decision in decisions:
+        row = models.setdefault(decision["model"], {"requests": 0, "latencies": [], "unverified": 0})
+        row["requests"] += 1
+        row["latencies"].append(decision["latency"])
+        row["unverified"] += not decision["verified"]
+        for attempt in decision["attempts"]:
+            for verdict in attempt["verdicts"]:
+                if not verdict["passed"]:
+                    key = (attempt["model"], verdict["verifier"])
+                    rejections[key] = rejections.get(key, 0) + 1
+    return {"requests": len(decisions),
+            "escalated": sum(1 for decision in decisions if decision["escalations"]),
+            "models": models, "rejections": rejections}
+
+
+def print_summary(summary: dict, file=None) -> None:
+    total = max(summary["requests"], 1)
+    print(f"{summary['requests']} requests, {summary['escalated']} escalated "
+          f"({100 * summary['escalated'] / total:.0f}%)", file=file)
+    print(f"{'answered by':<24} {'requests':>8} {'share':>6} {'mean s':>8} {'p95 s':>8} {'unverified':>10}", file=file)
+    for name, row in summary["models"].items():
+        latencies = sorted(row["latencies"])
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        print(f"{name:<24} {row['requests']:>8} {100 * row['requests'] / total:>5.0f}% "
+              f"{sum(latencies) / len(latencies):>8.3f} {p95:>8.3f} {row['unverified']:>10}", file=file)
+    for (model, verifier), count in sorted(summary["rejections"].items()):
+        print(f"  {verifier} rejected {model} {count} times", file=file)
+
+
+def demo(requests: int = 40, log_path: str = "routing_demo.jsonl") -> dict:
+    """Route Text-to-SQL style requests between two stub models, over an empty database with the recipe's schema."""
+    import random
+    import tempfile
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "social_media.db"
+        connection = sqlite3.connect(database)
+        connection.executescript("""
+            CREATE TABLE tweet (TweetId TEXT, Lang TEXT, IsReshare INTEGER, LocationID INTEGER, UserID TEXT);
+            CREATE TABLE location (LocationID INTEGER, City TEXT, State TEXT);
+            CREATE TABLE user (UserID TEXT, Gender TEXT);""")
+        connection.close()
+        good = "SELECT COUNT(*) FROM tweet T JOIN location L ON T.LocationID = L.LocationID WHERE L.State = 'Ontario'"
+        bad = "SELECT COUNT(*) FROM tweets WHERE Province = 'Ontario'"
+
+        def small(prompt):
+            # The stub small model gets "hard" prompts wrong, and is unsure about them.
+            time.sleep(0.01)
+            hard = "hard" in prompt
+            return {"text": bad if hard and rng.random() < 0.7 else good,
+                    "logprobs": [-1.5 if hard else -0.2] * 12}
+
+        def large(prompt):
+            time.sleep(0.05)
+            return {"text": good, "logprobs": [-0.1] * 12}
+
+        log = Path(directory) / log_path
+        router = CascadeRouter([("granite-3b (stub)", small), ("granite-8b (stub)", large)],
+                               verifiers=[sql_executes(database), mean_logprob(-1.0)], log_path=log)
+        for i in range(requests):
+            router.invoke(f"{'hard' if rng.random() < 0.25 else 'easy'} question {i}", task="text_to_sql")
+        summary = summarize(log)
+    print_summary(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a cascade routing log.")
+    parser.add_argument("log", nargs="?", default="routing.jsonl")
+    parser.add_argument("--demo", action="store_true", help="route requests between two stub models")
+    args = parser.parse_args()
+
+    if args.demo:
+        demo()
+    else:
+        print_summary(summarize(args.log))
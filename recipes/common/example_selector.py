@@ -0,0 +1,172 @@
+"""
+Semantic few-shot example selection backed by a persisted TF-IDF index.
+
+Text_to_Shell_Exec, Text_to_Python and Text_to_SQL pass their whole
+`examples` list to `FewShotChatMessagePromptTemplate`, so prompt length grows
+with the example bank. `TfidfExampleSelector` keeps a NumPy matrix of term
+counts for the examples, stored sparsely as coordinate arrays, scores a
+question against every example in one vectorized pass, and returns only the k
+most similar examples.
+
+The index is saved to a directory (`index.npz` plus `examples.json`) and
+grows in place: `add_example` appends entries for the new example and widens
+the vocabulary without re-tokenizing earlier examples.
+
+    import sys; sys.path.append("../common")
+    from example_selector import TfidfExampleSelector
+
+    selector = TfidfExampleSelector.load_or_create("examples_index", examples, k=3)
+    few_shot_prompt = FewShotChatMessagePromptTemplate(
+        example_prompt=example_prompt,
+        example_selector=selector,
+        input_variables=["question"],
+    )
+"""
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+from langchain_core.example_selectors import BaseExampleSelector
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+STOP_WORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i",
+              "in", "into", "is", "it", "of", "on", "or", "that", "the", "this", "to",
+              "what", "which", "with", "write"}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, minus stop words, plus adjacent-word bigrams."""
+    words = [word for word in TOKEN_RE.findall(text.lower()) if word not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfExampleSelector(BaseExampleSelector):
+    """Select the k examples whose inputs are most similar to the question.
+
+    Raw term counts are stored as (row, column, count) arrays, since a
+    bigram vocabulary over thousands of examples is far too wide for a dense
+    matrix. The IDF weights and row norms are recomputed lazily on the first
+    query after examples are added, since adding a document changes every
+    term's IDF.
+    """
+
+    def __init__(self, examples: list[dict] | None = None, k: int = 3,
+                 input_keys: tuple[str, ...] = ("question",), path: str | Path | None = None):
+        self.k = k
+        self.input_keys = tuple(input_keys)
+        self.path = Path(path) if path is not None else None
+        self.examples = []
+        self.vocabulary = {}
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.columns = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.float32)
+        self._pending = []
+        self._weights = None
+        for example in examples or []:
+            self._append(example)
+
+    def _text(self, values: dict) -> str:
+        return " ".join(str(values.get(key, "")) for key in self.input_keys)
+
+    def _append(self, example: dict) -> None:
+        row = len(self.examples)
+        terms = {}
+        for token in tokenize(self._text(example)):
+            column = self.vocabulary.setdefault(token, len(self.vocabulary))
+            terms[column] = terms.get(column, 0) + 1
+        self._pending.append((row, terms))
+        self.examples.append(dict(example))
+        self._weights = None
+
+    def _flush(self) -> None:
+        """Move pending additions into the coordinate arrays in one concatenation."""
+        if not self._pending:
+            return
+        rows = [np.full(len(terms), row, dtype=np.int32) for row, terms in self._pending]
+        columns = [np.fromiter(terms.keys(), dtype=np.int32, count=len(terms)) for _, terms in self._pending]
+        counts = [np.fromiter(terms.values(), dtype=np.float32, count=len(terms)) for _, terms in self._pending]
+        self.rows = np.concatenate([self.rows, *rows])
+        self.columns = np.concatenate([self.columns, *columns])
+        self.counts = np.concatenate([self.counts, *counts])
+        self._pending = []
+
+    def _weighted(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return per-entry TF-IDF weights, the IDF vector and the row norms."""
+        if self._weights is None:
+            self._flush()
+            document_frequency = np.bincount(self.columns, minlength=len(self.vocabulary))
+            idf = (np.log((1 + len(self.examples)) / (1 + document_frequency)) + 1).astype(np.float32)
+            weights = np.log1p(self.counts) * idf[self.columns]
+            norms = np.sqrt(np.bincount(self.rows, weights=weights ** 2, minlength=len(self.examples)))
+            self._weights = (weights, idf, np.where(norms == 0, 1, norms))
+        return self._weights
+
+    def add_example(self, example: dict) -> None:
+        """Add an example to the index, saving it if the selector has a path."""
+        self._append(example)
+        if self.path is not None:
+            self.save()
+
+    def select_examples(self, input_variables: dict) -> list[dict]:
+        """Return the k most similar examples, most similar first."""
+        if not self.examples:
+            return []
+        weights, idf, norms = self._weighted()
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for token in tokenize(self._text(input_variables)):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                query[column] += 1
+        query = np.log1p(query) * idf
+        # Cosine similarity up to the query's norm, which doesn't change the ranking.
+        scores = np.bincount(self.rows, weights=weights * query[self.columns],
+                             minlength=len(self.examples)) / norms
+
+        k = min(self.k, len(self.examples))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.examples[i] for i in top]
+
+    def save(self, path: str | Path | None = None) -> None:
+        """Write the index to `path` (or the selector's own path)."""
+        path = Path(path) if path is not None else self.path
+        path.mkdir(parents=True, exist_ok=True)
+        self._flush()
+        np.savez_compressed(path / "index.npz", rows=self.rows, columns=self.columns, counts=self.counts)
+        with open(path / "examples.json", "w", encoding="utf-8") as f:
+            json.dump({"k": self.k, "input_keys": self.input_keys,
+                       "vocabulary": self.vocabulary, "examples": self.examples}, f)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TfidfExampleSelector":
+        """Load an index saved with `save`, without re-tokenizing the examples."""
+        path = Path(path)
+        with open(path / "examples.json", encoding="utf-8") as f:
+            data = json.load(f)
+        selector = cls(k=data["k"], input_keys=data["input_keys"], path=path)
+        selector.examples = data["examples"]
+        selector.vocabulary = data["vocabulary"]
+        with np.load(path / "index.npz") as index:
+            selector.rows, selector.columns, selector.counts = index["rows"], index["columns"], index["counts"]
+        return selector
+
+    @classmethod
+    def load_or_create(cls, path: str | Path, examples: list[dict], k: int = 3,
+                       input_keys: tuple[str, ...] = ("question",)) -> "TfidfExampleSelector":
+        """Load the index at `path`, adding any of `examples` it doesn't have yet."""
+        path = Path(path)
+        if (path / "examples.json").exists():
+            selector = cls.load(path)
+            selector.k = k
+        else:
+            selector = cls(k=k, input_keys=input_keys, path=path)
+
+        known = {json.dumps(example, sort_keys=True) for example in selector.examples}
+        new = [example for example in examples if json.dumps(example, sort_keys=True) not in known]
+        for example in new:
+            selector._append(example)
+        if new or not (path / "examples.json").exists():
+            selector.save()
+        return selector
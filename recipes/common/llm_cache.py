@@ -0,0 +1,171 @@
+"""
+On-disk prompt/response cache for the Replicate- and Ollama-backed recipes.
+
+Re-running a recipe re-sends identical prompts at `temperature=0.0` (or
+close to it), and each one costs another remote round-trip. `DiskLLMCache`
+is a LangChain cache (`BaseCache`) backed by SQLite, so it works with
+`Replicate`, `OllamaLLM` or any other LangChain LLM without changing the
+recipe code:
+
+    import sys; sys.path.append("../common")
+    from llm_cache import enable_cache
+
+    cache = enable_cache("llm_cache.sqlite")   # every LLM in the notebook
+    # or, for one model only: model = Replicate(..., cache=DiskLLMCache(...))
+    ...
+    cache.print_report()
+
+Entries are keyed by a hash of the model configuration (model id and sampling
+parameters, as LangChain serializes them) and the normalized prompt. The
+cache keeps at most `max_entries` entries, evicting the least recently used,
+and treats entries older than `ttl` seconds as misses. It also remembers how
+long each original call took, so the report can show the latency saved.
+
+Code that calls `replicate.run` directly, like Auto_Documentation, can use
+`cache.call(model_id, prompt, params, fn)` instead.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    latency REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def _serialize(generation) -> dict:
+    """Store plain LLM generations as JSON, anything else (chat generations) via LangChain."""
+    if type(generation) is Generation:
+        return {"text": generation.text, "generation_info": generation.generation_info}
+    return {"lc": dumps(generation)}
+
+
+def _deserialize(data: dict):
+    if "lc" in data:
+        return loads(data["lc"])
+    return Generation(text=data["text"], generation_info=data["generation_info"])
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize line endings and trailing whitespace, which don't change the answer."""
+    lines = prompt.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class DiskLLMCache(BaseCache):
+    """A size-bounded LRU cache of LLM generations with a TTL, stored in SQLite."""
+
+    def __init__(self, path: str | Path = "llm_cache.sqlite", max_entries: int = 10_000,
+                 ttl: float | None = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "latency_saved": 0.0}
+        # Start times of calls that missed, so update() can record their latency.
+        self.pending = {}
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        key = self.key(prompt, llm_string)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, created, latency FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.connection.commit()
+                self.stats["expired"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                self.pending[key] = time.monotonic()
+                return None
+            self.connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.stats["hits"] += 1
+            self.stats["latency_saved"] += row[2]
+        return [_deserialize(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        key = self.key(prompt, llm_string)
+        value = json.dumps([_serialize(generation) for generation in return_val])
+        now = time.time()
+        with self.lock:
+            started = self.pending.pop(key, None)
+            latency = time.monotonic() - started if started is not None else 0.0
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed, latency) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, latency))
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries beyond `max_entries`."""
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (excess,))
+            self.stats["evicted"] += excess
+
+    def clear(self, **kwargs) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+
+    def call(self, model_id: str, prompt: str, params: dict, fn) -> str:
+        """Cache a direct model call, e.g. `"".join(replicate.run(model_id, input=...))`.
+
+        `fn` takes no arguments and returns the generated text.
+        """
+        llm_string = json.dumps({"model": model_id, **params}, sort_keys=True, default=str)
+        cached = self.lookup(prompt, llm_string)
+        if cached is not None:
+            return cached[0].text
+        text = fn()
+        self.update(prompt, llm_string, [Generation(text=text)])
+        return text
+
+    def report(self) -> dict:
+        """Return hit/miss counts, the hit rate, latency saved and the cache size."""
+        with self.lock:
+            (entries,) = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "entries": entries,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0}
+
+    def print_report(self) -> None:
+        report = self.report()
+        print(f"LLM cache: {report['hits']} hits, {report['misses']} misses "
+              f"({report['hit_rate']:.0%} hit rate), {report['latency_saved']:.1f}s saved, "
+              f"{report['entries']} entries, {report['evicted']} evicted, {report['expired']} expired")
+
+
+def enable_cache(path: str | Path = "llm_cache.sqlite", max_entries: int = 10_000,
+                 ttl: float | None = None) -> DiskLLMCache:
+    """Install a DiskLLMCache as LangChain's global LLM cache and return it."""
+    cache = DiskLLMCache(path, max_entries=max_entries, ttl=ttl)
+    set_llm_cache(cache)
+    return cache
@@ -0,0 +1,245 @@
+"""
+Latency tracing for model calls: time to first token, tokens/sec and totals.
+
+Every call is recorded as a span (one JSON object per line) in a local JSONL
+file, with prompt and completion token counts, total latency, time to first
+token when the output is streamed, and throughput. Three entry points cover
+the ways the recipes call models:
+
+- `TracingCallbackHandler`, a LangChain callback for `Replicate`,
+  `OllamaLLM` and other LangChain models:
+
+      tracer = Tracer("traces.jsonl")
+      model = Replicate(..., callbacks=[tracer.callback()])
+      for chunk in model.stream(prompt): ...   # streaming gives time to first token
+
+- `tracer.stream(...)`, which wraps an iterator of text chunks, such as the
+  one `replicate.run` returns for streaming models;
+- `traced_generate(...)`, which wraps a local Hugging Face `model.generate`
+  and uses a streamer to time the first token.
+
+`tracer.span(name)` times any other stage, so model calls can be compared with
+the rest of a pipeline. Summarize a trace file with:
+
+    python llm_tracing.py traces.jsonl
+"""
+import json
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) when no tokenizer is given."""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+class Tracer:
+    """Writes spans to a JSONL file; safe to share between threads."""
+
+    def __init__(self, path: str | Path = "traces.jsonl", tokenizer=None):
+        self.path = Path(path)
+        self.tokenizer = tokenizer
+        self.lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> tuple[int, bool]:
+        """Return (token count, whether it is an estimate)."""
+        if self.tokenizer is not None:
+            return len(self.tokenizer.tokenize(text)), False
+        return estimate_tokens(text), True
+
+    def record(self, span: dict) -> dict:
+        """Fill in derived fields and append the span to the trace file."""
+        span.setdefault("id", uuid.uuid4().hex)
+        completion_tokens = span.get("completion_tokens")
+        generating = span["duration"] - (span.get("ttft") or 0)
+        if completion_tokens and generating > 0:
+            span["tokens_per_sec"] = completion_tokens / generating
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(span) + "\n")
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: str = "stage", **attributes):
+        """Time a block of code; fields set on the yielded dict are recorded too."""
+        span = {"name": name, "kind": kind, "start": time.time(), **attributes}
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["duration"] = time.perf_counter() - started
+            self.record(span)
+
+    def stream(self, chunks, model: str, prompt: str, name: str = "llm"):
+        """Yield text chunks from an iterator while timing the first one."""
+        prompt_tokens, estimated = self.count_tokens(prompt)
+        with self.span(name, kind="llm", model=model, prompt_tokens=prompt_tokens,
+                       estimated_tokens=estimated) as span:
+            started = time.perf_counter()
+            pieces = []
+            for chunk in chunks:
+                if not pieces:
+                    span["ttft"] = time.perf_counter() - started
+                pieces.append(chunk)
+                yield chunk
+            span["completion_tokens"], _ = self.count_tokens("".join(pieces))
+
+    def callback(self) -> "TracingCallbackHandler":
+        return TracingCallbackHandler(self)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that records one span per LLM or chat model run."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self.runs = {}
+
+    def _start(self, run_id, serialized, prompt, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = (params.get("model") or params.get("model_name")
+                 or (serialized or {}).get("name") or "unknown")
+        prompt_tokens, estimated = self.tracer.count_tokens(prompt)
+        self.runs[run_id] = {"name": "llm", "kind": "llm", "model": model, "start": time.time(),
+                             "started": time.perf_counter(), "prompt_tokens": prompt_tokens,
+                             "estimated_tokens": estimated, "streamed_tokens": 0}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, serialized, "\n".join(prompts), kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        text = "\n".join(str(message.content) for batch in messages for message in batch)
+        self._start(run_id, serialized, text, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self.runs.get(run_id)
+        if run is not None:
+            if "ttft" not in run:
+                run["ttft"] = time.perf_counter() - run["started"]
+            run["streamed_tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        run["duration"] = time.perf_counter() - run.pop("started")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        text = "".join(g.text for generations in response.generations for g in generations)
+        if usage.get("completion_tokens"):
+            run["completion_tokens"] = usage["completion_tokens"]
+            run["prompt_tokens"] = usage.get("prompt_tokens", run["prompt_tokens"])
+        else:
+            run["completion_tokens"], _ = self.tracer.count_tokens(text)
+        self.tracer.record(run)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        run["duration"] = time.perf_counter() - run.pop("started")
+        run["error"] = f"{type(error).__name__}: {error}"
+        self.tracer.record(run)
+
+
+class _FirstTokenStreamer:
+    """A minimal `transformers` streamer that notes when the first new token arrives.
+
+    `generate` calls `put` once with the prompt ids, then once per new token.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.first_token = None
+
+    def put(self, value):
+        self.calls += 1
+        if self.calls == 2 and self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def end(self):
+        pass
+
+
+def traced_generate(tracer: Tracer, model, inputs: dict, name: str = "generate", **generate_kwargs):
+    """Call `model.generate(**inputs, **generate_kwargs)` and record a span.
+
+    Token counts come from the tensors, so no tokenizer is needed. If the
+    caller passes its own `streamer`, time to first token isn't recorded.
+    """
+    streamer = None
+    if "streamer" not in generate_kwargs:
+        streamer = generate_kwargs["streamer"] = _FirstTokenStreamer()
+    prompt_tokens = int(inputs["input_ids"].shape[-1])
+    model_name = getattr(getattr(model, "config", None), "_name_or_path", type(model).__name__)
+    with tracer.span(name, kind="llm", model=model_name, prompt_tokens=prompt_tokens,
+                     estimated_tokens=False) as span:
+        started = time.perf_counter()
+        outputs = model.generate(**inputs, **generate_kwargs)
+        if streamer is not None and streamer.first_token is not None:
+            span["ttft"] = streamer.first_token - started
+        span["completion_tokens"] = int(outputs.shape[-1]) - prompt_tokens
+    return outputs
+
+
+def load_spans(path: str | Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(spans: list[dict]) -> list[dict]:
+    """Aggregate spans by (kind, name, model), largest share of wall-clock first."""
+    groups = {}
+    for span in spans:
+        groups.setdefault((span.get("kind", ""), span["name"], span.get("model", "")), []).append(span)
+    total = sum(span["duration"] for span in spans) or 1.0
+
+    rows = []
+    for (kind, name, model), group in groups.items():
+        durations = sorted(span["duration"] for span in group)
+        ttfts = [span["ttft"] for span in group if span.get("ttft") is not None]
+        rates = [span["tokens_per_sec"] for span in group if span.get("tokens_per_sec")]
+        rows.append({
+            "kind": kind, "name": name, "model": model, "calls": len(group),
+            "errors": sum(1 for span in group if span.get("error")),
+            "total": sum(durations), "share": sum(durations) / total,
+            "p50": statistics.median(durations),
+            "p95": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+            "ttft": statistics.mean(ttfts) if ttfts else None,
+            "tokens_per_sec": statistics.mean(rates) if rates else None,
+            "prompt_tokens": sum(span.get("prompt_tokens") or 0 for span in group),
+            "completion_tokens": sum(span.get("completion_tokens") or 0 for span in group),
+        })
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+
+def print_summary(rows: list[dict]) -> None:
+    print(f"{'kind':<6} {'name':<16} {'model':<40} {'calls':>5} {'total s':>8} {'share':>6} "
+          f"{'p50 s':>7} {'p95 s':>7} {'ttft s':>7} {'tok/s':>7} {'in tok':>8} {'out tok':>8}")
+    for row in rows:
+        ttft = f"{row['ttft']:.2f}" if row["ttft"] is not None else "-"
+        rate = f"{row['tokens_per_sec']:.1f}" if row["tokens_per_sec"] is not None else "-"
+        print(f"{row['kind']:<6} {row['name'][:16]:<16} {row['model'][-40:]:<40} {row['calls']:>5} "
+              f"{row['total']:>8.2f} {row['share']:>6.1%} {row['p50']:>7.2f} {row['p95']:>7.2f} "
+              f"{ttft:>7} {rate:>7} {row['prompt_tokens']:>8} {row['completion_tokens']:>8}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a JSONL trace file.")
+    parser.add_argument("path", nargs="?", default="traces.jsonl")
+    parser.add_argument("--model", help="only include spans for this model")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if args.model:
+        spans = [span for span in spans if span.get("model") == args.model]
+    print_summary(summarize(spans))
@@ -0,0 +1,384 @@
+"""
+Serve several LoRA adapters from one copy of the base model.
+
+Each fine-tuning recipe saves a PEFT adapter (the GPFS adapter in
+`finetune-gpfs/gpfs_results/final`, the legal adapter from
+Fine_Tuning_Granite), and loading a full model per adapter multiplies the
+memory used. `LoRAServer` loads the base model once and:
+
+- hot-loads adapters on first use, keeping at most `max_adapters` of them and
+  evicting the least recently used;
+- collects requests for up to `batch_wait` seconds and runs them in one
+  batched `generate` call per adapter;
+- can merge one adapter into the base weights (`merge("gpfs")`), so that
+  adapter runs at the speed of a plain model; it is unmerged automatically
+  when another adapter is requested; and
+- keeps latency and memory figures per adapter (`stats()`).
+
+    server = LoRAServer(model, tokenizer, {"gpfs": "../finetune-gpfs/gpfs_results/final"})
+    with server:
+        print(server.submit("gpfs", prompt).result())
+        print_stats(server.stats())
+
+Adapters only fit the base model they were trained on: the GPFS adapter
+needs granite-3.1-2b-instruct and the legal adapter granite-3b-code-instruct-2k,
+so they are served by separate servers. `python lora_server.py --port 8000`
+serves adapters over HTTP (POST /generate, GET /stats), and
+`python lora_server.py --demo` runs a mixed workload on a tiny randomly
+initialized model and random adapters, on CPU, in a few seconds.
+"""
+import resource
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import torch
+
+BASE = None  # requests with adapter=None use the base model without any adapter
+
+
+class LoRAServer:
+    """Batched generation over one base model with LRU-cached PEFT adapters."""
+
+    def __init__(self, model, tokenizer, adapters: dict[str, str] | None = None, max_adapters: int = 4,
+                 max_batch_size: int = 8, batch_wait: float = 0.01):
+        self.base = model
+        self.model = model
+        self.tokenizer = tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        # Decoder-only models continue from the last position, so pad on the left.
+        tokenizer.padding_side = "left"
+        self.paths = dict(adapters or {})
+        self.max_adapters = max_adapters
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+        self.loaded = OrderedDict()  # adapter name -> bytes of its LoRA weights, least recently used first
+        self.merged = None
+        self.queue = []
+        self.condition = threading.Condition()
+        self.worker = None
+        self.running = False
+        self.lock = threading.Lock()  # one generate at a time; the model isn't thread-safe
+        self.records = {}
+
+    def register(self, name: str, path: str) -> None:
+        """Make an adapter available; it is loaded on its first request."""
+        self.paths[name] = path
+
+    # --- adapters ---
+
+    def _record(self, name: str | None) -> dict:
+        return self.records.setdefault(name or "<base>", {"requests": 0, "batches": 0, "latencies": [],
+                                                          "loads": 0, "load_seconds": 0.0, "evictions": 0,
+                                                          "adapter_bytes": 0})
+
+    def _load(self, name: str) -> None:
+        from peft import PeftModel
+
+        if name not in self.paths:
+            raise KeyError(f"Unknown adapter {name!r}; registered: {sorted(self.paths)}")
+        record = self._record(name)
+        start = time.perf_counter()
+        if self.model is self.base:
+            self.model = PeftModel.from_pretrained(self.base, self.paths[name], adapter_name=name)
+        else:
+            self.model.load_adapter(self.paths[name], adapter_name=name)
+        self.model.eval()
+        record["loads"] += 1
+        record["load_seconds"] += time.perf_counter() - start
+        record["adapter_bytes"] = sum(p.numel() * p.element_size() for key, p in self.model.named_parameters()
+                                      if f".{name}." in key)
+        self.loaded[name] = record["adapter_bytes"]
+
+    def _evict(self, keep: str) -> None:
+        while len(self.loaded) > self.max_adapters:
+            victim = next(name for name in self.loaded if name != keep)
+            if self.merged == victim:
+                self.model.unmerge_adapter()
+                self.merged = None
+            self.model.delete_adapter(victim)
+            del self.loaded[victim]
+            self._record(victim)["evictions"] += 1
+
+    def _activate(self, name: str | None) -> None:
+        """Load (if needed) and select the adapter; unmerge any other merged adapter first."""
+        if self.merged is not None and self.merged != name:
+            self.model.unmerge_adapter()
+            self.merged = None
+        if name is BASE:
+            return
+        if self.merged == name:
+            # Already active; set_adapter on a merged model would unmerge it.
+            self.loaded.move_to_end(name)
+            return
+        if name not in self.loaded:
+            self._load(name)
+        self.loaded.move_to_end(name)
+        self.model.set_adapter(name)
+        self._evict(keep=name)
+
+    def merge(self, name: str) -> None:
+        """Merge an adapter into the base weights for the fastest single-tenant generation."""
+        with self.lock:
+            self._activate(name)
+            if self.merged != name:
+                self.model.merge_adapter()
+                self.merged = name
+
+    # --- generation ---
+
+    @torch.no_grad()
+    def generate_batch(self, adapter: str | None, prompts: list[str], max_new_tokens: int = 200,
+                       **generate_kwargs) -> list[str]:
+        """Generate greedily for several prompts with one adapter (or the base model if None)."""
+        with self.lock:
+            self._activate(adapter)
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+            inputs.pop("token_type_ids", None)
+            generate_kwargs.setdefault("do_sample", False)
+            if adapter is BASE and self.model is not self.base:
+                with self.model.disable_adapter():
+                    output = self.model.generate(**inputs, max_new_tokens=max_new_tokens,
+                                                 pad_token_id=self.tokenizer.pad_token_id, **generate_kwargs)
+            else:
+                output = self.model.generate(**inputs, max_new_tokens=max_new_tokens,
+                                             pad_token_id=self.tokenizer.pad_token_id, **generate_kwargs)
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def submit(self, adapter: str | None, prompt: str, max_new_tokens: int = 200) -> Future:
+        """Queue a request for the batching worker; the future resolves to the generated text."""
+        if adapter is not BASE and adapter not in self.paths:
+            raise KeyError(f"Unknown adapter {adapter!r}; registered: {sorted(self.paths)}")
+        future = Future()
+        with self.condition:
+            self.queue.append((adapter, prompt, max_new_tokens, time.perf_counter(), future))
+            self.condition.notify()
+        return future
+
+    def _next_batch(self) -> list[tuple]:
+        """Wait for requests, then take up to `max_batch_size` for the adapter of the oldest one."""
+        with self.condition:
+            while self.running and not self.queue:
+                self.condition.wait()
+            if not self.queue:
+                return []
+        # Give requests arriving at about the same time a chance to join the batch.
+        time.sleep(self.batch_wait)
+        with self.condition:
+            adapter, _, max_new_tokens = self.queue[0][:3]
+            # Prefer the adapter that is already active, to avoid switching while its requests wait.
+            if self.merged is not None and any(request[0] == self.merged for request in self.queue):
+                adapter = self.merged
+            batch = [request for request in self.queue if request[0] == adapter][:self.max_batch_size]
+            for request in batch:
+                self.queue.remove(request)
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            adapter = batch[0][0]
+            record = self._record(adapter)
+            try:
+                texts = self.generate_batch(adapter, [request[1] for request in batch],
+                                            max(request[2] for request in batch))
+            except Exception as error:
+                for request in batch:
+                    request[4].set_exception(error)
+                continue
+            done = time.perf_counter()
+            record["batches"] += 1
+            record["requests"] += len(batch)
+            for request, text in zip(batch, texts):
+                record["latencies"].append(done - request[3])
+                request[4].set_result(text)
+
+    def start(self) -> "LoRAServer":
+        self.running = True
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+        return self
+
+    def stop(self) -> None:
+        """Finish the queued requests, then stop the worker."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.worker is not None:
+            self.worker.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- reporting ---
+
+    def stats(self) -> dict:
+        """Per-adapter request counts, latency percentiles (seconds) and memory (bytes)."""
+        adapters = {}
+        for name, record in self.records.items():
+            latencies = sorted(record["latencies"])
+            adapters[name] = {
+                "requests": record["requests"], "batches": record["batches"],
+                "mean_batch_size": record["requests"] / record["batches"] if record["batches"] else 0,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+                "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else None,
+                "loads": record["loads"], "load_seconds": record["load_seconds"],
+                "evictions": record["evictions"], "adapter_bytes": record["adapter_bytes"],
+                "loaded": name in self.loaded, "merged": name == self.merged}
+        base_bytes = sum(p.numel() * p.element_size() for p in self.base.parameters()) - sum(self.loaded.values())
+        # ru_maxrss is in KiB on Linux
+        return {"base_bytes": base_bytes, "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                "adapters": adapters}
+
+
+def print_stats(stats: dict, file=None) -> None:
+    print(f"Base model: {stats['base_bytes'] / 2**20:.1f} MiB, process peak RSS "
+          f"{stats['max_rss_bytes'] / 2**20:.0f} MiB", file=file)
+    print(f"{'adapter':<12} {'requests':>8} {'batch':>6} {'p50 ms':>8} {'p95 ms':>8} {'loads':>5} "
+          f"{'evicted':>7} {'MiB':>7}  state", file=file)
+    for name, row in stats["adapters"].items():
+        state = "merged" if row["merged"] else "loaded" if row["loaded"] else "-"
+        p50 = f"{row['p50_latency'] * 1000:.1f}" if row["p50_latency"] is not None else "-"
+        p95 = f"{row['p95_latency'] * 1000:.1f}" if row["p95_latency"] is not None else "-"
+        print(f"{name:<12} {row['requests']:>8} {row['mean_batch_size']:>6.1f} {p50:>8} {p95:>8} "
+              f"{row['loads']:>5} {row['evictions']:>7} {row['adapter_bytes'] / 2**20:>7.2f}  {state}", file=file)
+
+
+def serve(server: LoRAServer, port: int = 8000) -> None:
+    """Serve POST /generate ({"adapter", "prompt", "max_new_tokens"}) and GET /stats as JSON."""
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, server.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                return self._reply(404, {"error": "not found"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if not isinstance(request, dict):
+                    raise ValueError("expected a JSON object")
+                future = server.submit(request.get("adapter"), request["prompt"],
+                                       request.get("max_new_tokens", 200))
+            except (KeyError, ValueError) as error:  # bad JSON, no prompt or an unknown adapter
+                return self._reply(400, {"error": f"{type(error).__name__}: {error}"})
+            try:
+                self._reply(200, {"text": future.result()})
+            except Exception as error:  # e.g. an adapter that fails to load, or out of memory
+                self._reply(500, {"error": f"{type(error).__name__}: {error}"})
+
+    with server, ThreadingHTTPServer(("127.0.0.1", port), Handler) as http:
+        print(f"Serving {sorted(server.paths)} on http://127.0.0.1:{port}")
+        http.serve_forever()
+
+
+def tiny_model_and_tokenizer(seed: int = 0):
+    """A tiny randomly initialized Granite-architecture model and a matching word-level tokenizer."""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import GraniteConfig, GraniteForCausalLM, PreTrainedTokenizerFast
+
+    words = ["<|end_of_text|>", "<unk>"] + [f"w{i}" for i in range(254)]
+    backend = Tokenizer(models.WordLevel({word: i for i, word in enumerate(words)}, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<|end_of_text|>",
+                                        unk_token="<unk>", pad_token="<|end_of_text|>")
+    torch.manual_seed(seed)
+    config = GraniteConfig(vocab_size=len(words), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                           num_attention_heads=4, num_key_value_heads=2, eos_token_id=0, pad_token_id=0)
+    return GraniteForCausalLM(config).eval(), tokenizer
+
+
+def random_adapter(model, directory: str | Path, seed: int) -> str:
+    """Save a randomly initialized LoRA adapter for `model` (LoRA B is nonzero so it changes outputs)."""
+    import copy
+
+    from peft import LoraConfig, get_peft_model
+
+    torch.manual_seed(seed)
+    peft_model = get_peft_model(copy.deepcopy(model), LoraConfig(r=16, lora_alpha=32,
+                                                                 target_modules=["q_proj", "v_proj"]))
+    for key, parameter in peft_model.named_parameters():
+        if "lora_B" in key:
+            torch.nn.init.normal_(parameter, std=0.02)
+    peft_model.save_pretrained(directory)
+    return str(directory)
+
+
+def demo(adapters: int = 6, requests: int = 120, max_adapters: int = 3) -> dict:
+    """Run a skewed multi-adapter workload on a tiny random model and print the stats."""
+    import random
+    import tempfile
+
+    model, tokenizer = tiny_model_and_tokenizer()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {f"adapter{i}": random_adapter(model, Path(directory) / f"adapter{i}", seed=i)
+                 for i in range(adapters)}
+        server = LoRAServer(model, tokenizer, paths, max_adapters=max_adapters)
+        rng = random.Random(0)
+        names = list(paths)
+        # Zipf-like popularity: a few adapters get most of the traffic.
+        weights = [1 / (rank + 1) for rank in range(len(names))]
+        with server:
+            futures = [server.submit(rng.choices(names, weights)[0],
+                                     " ".join(f"w{rng.randrange(2, 256)}" for _ in range(rng.randrange(4, 16))),
+                                     max_new_tokens=16)
+                       for _ in range(requests)]
+            for future in futures:
+                future.result()
+            server.merge("adapter0")
+            start = time.perf_counter()
+            for _ in range(10):
+                server.submit("adapter0", "w1 w2 w3", max_new_tokens=16).result()
+            print(f"adapter0 merged: {(time.perf_counter() - start) * 100:.1f} ms per request")
+        stats = server.stats()
+    print_stats(stats)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve several LoRA adapters from one base model.")
+    parser.add_argument("--base", default="ibm-granite/granite-3.1-2b-instruct")
+    parser.add_argument("--adapter", action="append", default=[], metavar="NAME=PATH",
+                        help="an adapter to serve (repeatable), e.g. gpfs=../finetune-gpfs/gpfs_results/final")
+    parser.add_argument("--max-adapters", type=int, default=4)
+    parser.add_argument("--merge", metavar="NAME", help="merge this adapter into the base weights at startup")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--demo", action="store_true", help="run a workload on a tiny random model instead")
+    args = parser.parse_args()
+
+    if args.demo:
+        demo()
+    else:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.base)
+        model = AutoModelForCausalLM.from_pretrained(args.base, dtype="auto", device_map="auto").eval()
+        server = LoRAServer(model, tokenizer, dict(spec.split("=", 1) for spec in args.adapter),
+                            max_adapters=args.max_adapters)
+        if args.merge:
+            server.merge(args.merge)
+        serve(server, args.port)
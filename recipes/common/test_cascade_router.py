@@ -0,0 +1,57 @@
+# Tests for the sql_executes verifier of cascade_router.py on a scratch SQLite database.
+# Run with: python -m pytest test_cascade_router.py (or python -m unittest test_cascade_router)
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from cascade_router import sql_executes
+
+
+class TestSqlExecutes(unittest.TestCase):
+    """
+    Queries are checked against the real database, but nothing they do may
+    change it or create files next to it.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = Path(self.directory.name) / "data.db"
+        with sqlite3.connect(self.database) as connection:
+            connection.execute("CREATE TABLE tweets (id INTEGER, text TEXT)")
+            connection.execute("INSERT INTO tweets VALUES (1, 'hello')")
+        connection.close()
+        self.verify = sql_executes(self.database)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_accepts_queries(self):
+        for sql in ["SELECT text FROM tweets", "```sql\nSELECT count(*) FROM tweets;\n```",
+                    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3) SELECT * FROM n"]:
+            with self.subTest(sql=sql):
+                self.assertTrue(self.verify("", {"text": sql})["passed"])
+
+    def test_rejects_invalid_sql(self):
+        self.assertFalse(self.verify("", {"text": "SELECT nope FROM tweets"})["passed"])
+
+    def test_attach_cannot_create_files(self):
+        attached = Path(self.directory.name) / "attached.db"
+        for sql in [f"ATTACH DATABASE '{attached}' AS extra",
+                    f"ATTACH '{attached}' AS extra; CREATE TABLE extra.t (a)"]:
+            with self.subTest(sql=sql):
+                self.assertFalse(self.verify("", {"text": sql})["passed"])
+        self.assertFalse(attached.exists())
+
+    def test_rejects_statements_other_than_select(self):
+        for sql in ["DELETE FROM tweets", "PRAGMA journal_mode = WAL", "CREATE TABLE t (a)"]:
+            with self.subTest(sql=sql):
+                self.assertFalse(self.verify("", {"text": sql})["passed"])
+        with sqlite3.connect(self.database) as connection:
+            self.assertEqual(connection.execute("SELECT count(*) FROM tweets").fetchone(), (1,))
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
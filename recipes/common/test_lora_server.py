@@ -0,0 +1,56 @@
+# Tests for lora_server.py on a tiny random Granite-architecture model (CPU, a few seconds).
+# Run with: python -m pytest test_lora_server.py (or python -m unittest test_lora_server)
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from lora_server import LoRAServer, random_adapter, tiny_model_and_tokenizer
+
+
+def merged_adapters(server: LoRAServer) -> set[tuple[str, ...]]:
+    """The distinct `merged_adapters` lists of the model's LoRA layers."""
+    return {tuple(module.merged_adapters) for module in server.model.modules() if hasattr(module, "merged_adapters")}
+
+
+class TestMerge(unittest.TestCase):
+    """
+    A merged adapter must stay merged while its requests are served, and be
+    unmerged as soon as another adapter or the base model is requested.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        model, self.tokenizer = tiny_model_and_tokenizer()
+        paths = {name: random_adapter(model, Path(self.directory.name) / name, seed=seed)
+                 for seed, name in enumerate(["a", "b"])}
+        self.server = LoRAServer(model, self.tokenizer, paths)
+        self.prompts = ["w1 w2 w3", "w4 w5"]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_merged_adapter_stays_merged_across_requests(self):
+        unmerged = self.server.generate_batch("a", self.prompts, max_new_tokens=8)
+        self.server.merge("a")
+        self.assertEqual(merged_adapters(self.server), {("a",)})
+        for _ in range(2):
+            self.assertEqual(self.server.generate_batch("a", self.prompts, max_new_tokens=8), unmerged)
+            self.assertEqual(merged_adapters(self.server), {("a",)})
+        self.assertTrue(self.server.stats()["adapters"]["a"]["merged"])
+
+    def test_other_requests_unmerge(self):
+        expected_b = self.server.generate_batch("b", self.prompts, max_new_tokens=8)
+        expected_base = self.server.generate_batch(None, self.prompts, max_new_tokens=8)
+        self.server.merge("a")
+        self.assertEqual(self.server.generate_batch("b", self.prompts, max_new_tokens=8), expected_b)
+        self.assertEqual(merged_adapters(self.server), {()})
+        self.assertIsNone(self.server.merged)
+        self.server.merge("a")
+        self.assertEqual(self.server.generate_batch(None, self.prompts, max_new_tokens=8), expected_base)
+        self.assertEqual(merged_adapters(self.server), {()})
+        self.assertFalse(self.server.stats()["adapters"]["a"]["merged"])
+
+
+if __name__ == "__main__":
+    unittest.main()
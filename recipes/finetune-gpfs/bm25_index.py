@@ -0,0 +1,273 @@
+"""
+BM25 retrieval over the chunks from collect_gpfs_data.py.
+
+Fine-tuning bakes the GPFS documentation into the weights, so the model is
+only as current as its last training run. `BM25Index` instead finds the
+chunks of `gpfs_chunks.json` that best match a question, so they can be
+prepended to the prompt:
+
+    index = BM25Index.open("gpfs_data/bm25")
+    index.update(chunks)            # only new or changed chunks are indexed
+    prompt = rag_prompt("How do I collect debug data?", index, k=3)
+
+The index is a directory of immutable segments, each holding its postings
+as flat NumPy arrays (sorted term ids, offsets into the postings, doc ids
+and term frequencies) that are memory-mapped rather than loaded. An update
+hashes each chunk, writes the new and changed chunks as a new segment and
+marks removed or changed ones as deleted; once there are too many segments
+or deleted documents, everything is compacted into one segment. Chunk
+texts live in an append-only `store.jsonl` and are read by offset only for
+the top-k results.
+
+    python bm25_index.py update
+    python bm25_index.py search "mmdiag network" -k 3
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+CHUNKS_FILE = Path("gpfs_data/extracted/gpfs_chunks.json")
+INDEX_DIR = Path("gpfs_data/bm25")
+
+# Compact into one segment past this many segments or this fraction of deleted documents.
+MAX_SEGMENTS = 8
+MAX_DELETED_FRACTION = 0.3
+
+# Keeps GPFS command names such as gpfs.snap and mm-style flags together.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+
+STOP_WORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+              "how", "i", "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "what",
+              "when", "which", "with", "you"}
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def chunk_key(chunk: dict) -> str:
+    return hashlib.sha256(f"{chunk['source']}\0{chunk['content']}".encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """An incrementally updated BM25 index stored as memory-mapped segments."""
+
+    def __init__(self, path: str | Path, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.keys = []
+        self.segment_names = []
+        self.next_segment = 0
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.live = np.zeros(0, dtype=bool)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.segments = []
+
+    @classmethod
+    def open(cls, path: str | Path = INDEX_DIR) -> "BM25Index":
+        """Open the index at `path`, or an empty one if there isn't one yet."""
+        index = cls(path)
+        meta_path = index.path / "meta.json"
+        if not meta_path.exists():
+            return index
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        index.k1, index.b = meta["k1"], meta["b"]
+        index.vocabulary = meta["vocabulary"]
+        index.keys = meta["keys"]
+        index.segment_names = meta["segments"]
+        index.next_segment = meta["next_segment"]
+        docs = np.load(index.path / "docs.npz")
+        index.lengths, index.live, index.offsets = docs["lengths"], docs["live"], docs["offsets"]
+        index.segments = [index._load_segment(name) for name in index.segment_names]
+        return index
+
+    def _load_segment(self, name: str) -> dict:
+        directory = self.path / name
+        return {array: np.load(directory / f"{array}.npy", mmap_mode="r")
+                for array in ("terms", "starts", "doc_ids", "tfs")}
+
+    # --- writing ---
+
+    def update(self, chunks: list[dict]) -> dict:
+        """Make the index match `chunks`: index new or changed chunks, delete removed ones."""
+        wanted = {chunk_key(chunk): chunk for chunk in chunks}
+        known = {key: doc for doc, key in enumerate(self.keys) if self.live[doc]}
+        removed = [doc for key, doc in known.items() if key not in wanted]
+        added = [chunk for key, chunk in wanted.items() if key not in known]
+
+        self.live = self.live.copy()
+        self.live[removed] = False
+        if added:
+            self._write_segment(added)
+        deleted = int((~self.live).sum())
+        if len(self.segment_names) > MAX_SEGMENTS or deleted > MAX_DELETED_FRACTION * max(len(self.keys), 1):
+            self.compact()
+        else:
+            self._save_meta()
+        return {"added": len(added), "removed": len(removed), "documents": int(self.live.sum()),
+                "segments": len(self.segment_names)}
+
+    def _write_segment(self, chunks: list[dict]) -> None:
+        """Append chunks to the store and write their postings as a new segment."""
+        first_doc = len(self.keys)
+        terms, docs, tfs, lengths, offsets = [], [], [], [], []
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / "store.jsonl", "ab") as store:
+            for i, chunk in enumerate(chunks):
+                offsets.append(store.tell())
+                store.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                tokens = tokenize(chunk["content"])
+                counts = {}
+                for token in tokens:
+                    term = self.vocabulary.setdefault(token, len(self.vocabulary))
+                    counts[term] = counts.get(term, 0) + 1
+                terms.extend(counts.keys())
+                tfs.extend(counts.values())
+                docs.extend([first_doc + i] * len(counts))
+                lengths.append(len(tokens))
+                self.keys.append(chunk_key(chunk))
+
+        terms = np.array(terms, dtype=np.int32)
+        docs = np.array(docs, dtype=np.int32)
+        tfs = np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)
+        order = np.lexsort((docs, terms))
+        unique_terms, starts = np.unique(terms[order], return_index=True)
+        arrays = {"terms": unique_terms.astype(np.int32),
+                  "starts": np.append(starts, len(order)).astype(np.int64),
+                  "doc_ids": docs[order], "tfs": tfs[order]}
+
+        name = f"seg-{self.next_segment:06d}"
+        self.next_segment += 1
+        directory = self.path / name
+        directory.mkdir(parents=True, exist_ok=True)
+        for key, array in arrays.items():
+            np.save(directory / f"{key}.npy", array)
+        self.segment_names.append(name)
+        self.segments.append(self._load_segment(name))
+        self.lengths = np.concatenate([self.lengths, np.array(lengths, dtype=np.int32)])
+        self.live = np.concatenate([self.live, np.ones(len(chunks), dtype=bool)])
+        self.offsets = np.concatenate([self.offsets, np.array(offsets, dtype=np.int64)])
+
+    def _save_meta(self) -> None:
+        """Write the document table and metadata; meta.json is replaced last and atomically."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        np.savez(self.path / "docs.npz", lengths=self.lengths, live=self.live, offsets=self.offsets)
+        meta = {"k1": self.k1, "b": self.b, "vocabulary": self.vocabulary, "keys": self.keys,
+                "segments": self.segment_names, "next_segment": self.next_segment}
+        temporary = self.path / "meta.json.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporary, self.path / "meta.json")
+        # Segments no longer listed in meta.json (after a compaction) can go.
+        for directory in self.path.glob("seg-*"):
+            if directory.name not in self.segment_names:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def compact(self) -> None:
+        """Rewrite the live documents as a single segment with a fresh store."""
+        chunks = [self.document(doc) for doc in np.flatnonzero(self.live)]
+        old_store = self.path / "store.jsonl"
+        if old_store.exists():
+            old_store.replace(self.path / "store.jsonl.old")
+        self.vocabulary, self.keys, self.segment_names, self.segments = {}, [], [], []
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.live = np.zeros(0, dtype=bool)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        if chunks:
+            self._write_segment(chunks)
+        self._save_meta()
+        (self.path / "store.jsonl.old").unlink(missing_ok=True)
+
+    # --- reading ---
+
+    def document(self, doc: int) -> dict:
+        """Read one chunk from the store by its offset."""
+        with open(self.path / "store.jsonl", "rb") as store:
+            store.seek(int(self.offsets[doc]))
+            return json.loads(store.readline())
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """Return the k best-matching chunks, each with its BM25 `score`."""
+        live_count = int(self.live.sum())
+        terms = [self.vocabulary[token] for token in set(tokenize(query)) if token in self.vocabulary]
+        if not terms or not live_count:
+            return []
+        average_length = self.lengths[self.live].mean()
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / average_length)
+        scores = np.zeros(len(self.keys), dtype=np.float64)
+
+        for term in terms:
+            postings = []
+            for segment in self.segments:
+                position = np.searchsorted(segment["terms"], term)
+                if position < len(segment["terms"]) and segment["terms"][position] == term:
+                    start, end = segment["starts"][position], segment["starts"][position + 1]
+                    postings.append((segment["doc_ids"][start:end], segment["tfs"][start:end]))
+            if not postings:
+                continue
+            doc_ids = np.concatenate([docs for docs, _ in postings])
+            tfs = np.concatenate([tf for _, tf in postings]).astype(np.float64)
+            alive = self.live[doc_ids]
+            doc_ids, tfs = doc_ids[alive], tfs[alive]
+            df = len(doc_ids)
+            idf = np.log(1 + (live_count - df + 0.5) / (df + 0.5))
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norms[doc_ids])
+
+        candidates = np.flatnonzero(scores > 0)
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return [{**self.document(doc), "score": float(scores[doc])} for doc in top]
+
+
+def rag_prompt(question: str, index: BM25Index, k: int = 3, max_chars: int = 3000) -> str:
+    """A granite-3.1 prompt with the k best chunks (up to `max_chars` in total) as context."""
+    context, used = [], 0
+    for result in index.search(question, k):
+        text = result["content"][:max_chars - used]
+        if not text:
+            break
+        context.append(f"[{result['source']}]\n{text}")
+        used += len(text)
+    documents = "\n\n".join(context)
+    return (f"<|start_of_role|>system<|end_of_role|>Answer using the following IBM Storage Scale "
+            f"documentation where it is relevant.\n\n{documents}<|end_of_text|>\n"
+            f"<|start_of_role|>user<|end_of_role|>{question}<|end_of_text|>\n"
+            f"<|start_of_role|>assistant<|end_of_role|>")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query the BM25 index over the GPFS chunks.")
+    parser.add_argument("--index", default=str(INDEX_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    update_parser = commands.add_parser("update", help="index new and changed chunks")
+    update_parser.add_argument("--chunks", default=str(CHUNKS_FILE))
+    search_parser = commands.add_parser("search", help="print the top-k chunks for a query")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        with open(args.chunks, encoding="utf-8") as f:
+            chunks = json.load(f)
+        start = time.perf_counter()
+        stats = BM25Index.open(args.index).update(chunks)
+        print(f"Indexed in {time.perf_counter() - start:.2f}s: {stats['added']} added, {stats['removed']} removed, "
+              f"{stats['documents']} documents in {stats['segments']} segment(s)")
+    else:
+        index = BM25Index.open(args.index)
+        start = time.perf_counter()
+        results = index.search(args.query, args.k)
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for result in results:
+            print(f"\n{result['score']:.2f}  {result['source']} ({result['type']})")
+            print("  " + result["content"][:200].replace("\n", " "))
@@ -4,6 +4,7 @@ Collect GPFS/IBM Storage Scale data from GitHub repos and documentation.
 import os
 import subprocess
 import json
+from contextlib import nullcontext
 from pathlib import Path
 
 # Directory to store cloned repos and extracted data
@@ -158,33 +159,37 @@ def extract_code_comments(repo_path: Path) -> list[dict]:
     
     return chunks
 
-def collect_all_data():
-    """Main function to collect all GPFS data."""
+def collect_all_data(step=lambda name: nullcontext()):
+    """Main function to collect all GPFS data.
+
+    `step(name)` returns a context manager wrapped around each sub-step, so
+    a caller such as gpfs_pipeline.py can time them.
+    """
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
     all_chunks = []
     
     # 1. Clone repositories
     print("=== Cloning GitHub repositories ===")
-    clone_repos()
+    with step("clone"):
+        clone_repos()
     
     # 2. Extract from repos
     print("\n=== Extracting documentation from repos ===")
-    for repo_dir in REPOS_DIR.iterdir():
-        if repo_dir.is_dir():
-            print(f"Processing {repo_dir.name}...")
-            
+    with step("walk"):
+        repo_dirs = [repo_dir for repo_dir in REPOS_DIR.iterdir() if repo_dir.is_dir()]
+    for repo_dir in repo_dirs:
+        print(f"Processing {repo_dir.name}...")
+        with step("extract"):
             md_chunks = extract_markdown_files(repo_dir)
-            print(f"  Found {len(md_chunks)} markdown files")
-            all_chunks.extend(md_chunks)
-            
             yaml_chunks = extract_yaml_configs(repo_dir)
-            print(f"  Found {len(yaml_chunks)} YAML configs")
-            all_chunks.extend(yaml_chunks)
-            
             code_chunks = extract_code_comments(repo_dir)
-            print(f"  Found {len(code_chunks)} code docstrings")
-            all_chunks.extend(code_chunks)
+        print(f"  Found {len(md_chunks)} markdown files")
+        print(f"  Found {len(yaml_chunks)} YAML configs")
+        print(f"  Found {len(code_chunks)} code docstrings")
+        all_chunks.extend(md_chunks)
+        all_chunks.extend(yaml_chunks)
+        all_chunks.extend(code_chunks)
     
     # 3. Add GPFS knowledge base
     print("\n=== Adding GPFS diagnostic knowledge ===")
@@ -201,8 +206,9 @@ def collect_all_data():
     
     # 4. Save extracted chunks
     output_file = OUTPUT_DIR / "gpfs_chunks.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, indent=2)
+    with step("save"):
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(all_chunks, f, indent=2)
     
     print(f"\n=== Summary ===")
     print(f"Total chunks extracted: {len(all_chunks)}")
@@ -0,0 +1,234 @@
+"""
+Continual fine-tuning: train the GPFS adapter on what changed since the last run.
+
+run_gpfs_finetune.py trains a new adapter from scratch every time
+generate_qa_pairs.py refreshes `gpfs_dataset.jsonl`, even when only a few
+pairs are new. This mode compares the dataset with the manifest of the last
+run (a hash of every question and its answer) and then:
+
+- loads the previous adapter and its optimizer state, so training continues
+  where it stopped rather than from random LoRA weights and a cold AdamW;
+- trains on the new and changed pairs of the train split, mixed with a
+  replay sample of unchanged ones (`replay_ratio` old pairs per new pair),
+  which keeps the adapter from forgetting what it learned before; and
+- saves the adapter, optimizer state and manifest as a new run and appends
+  a lineage record (parent run, what changed, steps, eval loss) to
+  `gpfs_results/continual/lineage.jsonl`.
+
+    python continual_finetune.py            # or: python run_gpfs_finetune.py --continual
+    python continual_finetune.py --full     # retrain from scratch, starting a new lineage
+    python continual_finetune.py --lineage  # print the run history
+
+The first run, a different base model, or too many removed pairs (the
+adapter can't unlearn them) fall back to a full training run. Pairs keep the
+train/test assignment from dataset_split.py, so the eval loss of every run in
+a lineage is measured on the same held-out questions.
+"""
+import hashlib
+import json
+import math
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+from dataset_split import hash_fraction, question_key
+from run_gpfs_finetune import DATASET_FILE, MODEL_CHECKPOINT, OUTPUT_DIR
+
+CONTINUAL_DIR = Path(OUTPUT_DIR) / "continual"
+LINEAGE_FILE = CONTINUAL_DIR / "lineage.jsonl"
+
+# Retrain from scratch when more than this fraction of the last run's pairs were removed.
+MAX_REMOVED_FRACTION = 0.3
+
+BATCH_SIZE = 2  # per_device_train_batch_size in run_gpfs_finetune.build_trainer
+
+
+def answer_hash(pair: dict) -> str:
+    return hashlib.sha256(pair["answer"].encode("utf-8")).hexdigest()[:16]
+
+
+def last_manifest(directory: str | Path = CONTINUAL_DIR) -> dict | None:
+    """The manifest of the most recent run, or None before the first one."""
+    lineage = Path(directory) / "lineage.jsonl"
+    if not lineage.exists():
+        return None
+    with open(lineage, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        return None
+    run = json.loads(lines[-1])
+    with open(Path(directory) / run["run_id"] / "manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def diff_dataset(pairs: list[dict], manifest: dict | None) -> dict:
+    """Sort pairs into new, changed and unchanged against the manifest; list the removed question keys."""
+    previous = manifest["pairs"] if manifest else {}
+    diff = {"new": [], "changed": [], "unchanged": [], "removed": []}
+    current = set()
+    for pair in pairs:
+        key = question_key(pair["question"])
+        current.add(key)
+        if key not in previous:
+            diff["new"].append(pair)
+        elif previous[key] != answer_hash(pair):
+            diff["changed"].append(pair)
+        else:
+            diff["unchanged"].append(pair)
+    diff["removed"] = [key for key in previous if key not in current]
+    return diff
+
+
+def replay_sample(pairs: list[dict], count: int, seed: str) -> list[dict]:
+    """A deterministic sample of `count` pairs, different for each seed (run id)."""
+    ranked = sorted(pairs, key=lambda pair: hash_fraction(
+        hashlib.sha256(f"{seed}:{question_key(pair['question'])}".encode("utf-8")).hexdigest()))
+    return ranked[:count]
+
+
+def plan_run(pairs: list[dict], splits: dict[str, list[dict]], manifest: dict | None, run_id: str,
+             replay_ratio: float = 1.0, min_replay: int = 4, full: bool = False) -> dict:
+    """Decide between a full and an incremental run and pick the training pairs."""
+    diff = diff_dataset(pairs, manifest)
+    reason = None
+    if full:
+        reason = "requested"
+    elif manifest is None:
+        reason = "first run"
+    elif manifest["base_model"] != MODEL_CHECKPOINT:
+        reason = f"base model changed from {manifest['base_model']}"
+    elif len(diff["removed"]) > MAX_REMOVED_FRACTION * len(manifest["pairs"]):
+        reason = f"{len(diff['removed'])} of {len(manifest['pairs'])} pairs removed"
+    if reason is not None:
+        return {"mode": "full", "reason": reason, "diff": diff, "train": splits["train"], "replayed": 0}
+
+    train_keys = {question_key(pair["question"]) for pair in splits["train"]}
+    fresh = [pair for pair in diff["new"] + diff["changed"] if question_key(pair["question"]) in train_keys]
+    old = [pair for pair in diff["unchanged"] if question_key(pair["question"]) in train_keys]
+    replay = replay_sample(old, max(min_replay, math.ceil(replay_ratio * len(fresh))), run_id) if fresh else []
+    return {"mode": "incremental", "reason": None, "diff": diff, "train": fresh + replay, "replayed": len(replay)}
+
+
+def _restore_optimizer_callback(path: Path):
+    """A TrainerCallback that loads the previous run's optimizer state once the optimizer exists."""
+    import torch
+    from transformers import TrainerCallback
+
+    class RestoreOptimizer(TrainerCallback):
+        def on_train_begin(self, args, state, control, optimizer=None, **kwargs):
+            # Keep the new run's learning-rate schedule; only the moment estimates carry over.
+            schedule = [{key: group[key] for key in ("lr", "initial_lr") if key in group}
+                        for group in optimizer.param_groups]
+            optimizer.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+            for group, rates in zip(optimizer.param_groups, schedule):
+                group.update(rates)
+
+    return RestoreOptimizer()
+
+
+def train_continual(dataset_file: str = DATASET_FILE, directory: str | Path = CONTINUAL_DIR,
+                    replay_ratio: float = 1.0, epochs: int = 3, full: bool = False,
+                    step=lambda name: nullcontext()) -> dict | None:
+    """Run one continual training step and return its lineage record (None if nothing changed)."""
+    from peft import PeftModel
+
+    from run_gpfs_finetune import build_trainer, load_dataset, load_model
+
+    directory = Path(directory)
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    with step("load_dataset"):
+        splits = load_dataset(dataset_file)
+        pairs = splits["train"] + splits["test"]
+        manifest = last_manifest(directory)
+        plan = plan_run(pairs, splits, manifest, run_id, replay_ratio, full=full)
+    diff = plan["diff"]
+    print(f"{len(diff['new'])} new, {len(diff['changed'])} changed, {len(diff['unchanged'])} unchanged, "
+          f"{len(diff['removed'])} removed pairs since {manifest['run_id'] if manifest else 'the start'}")
+    if plan["mode"] == "incremental" and not plan["train"]:
+        print("No new or changed training pairs; the adapter is up to date.")
+        return None
+
+    if plan["mode"] == "full":
+        print(f"Full training run ({plan['reason']})")
+        max_steps = 100  # as in run_gpfs_finetune.py
+    else:
+        print(f"Incremental run from {manifest['run_id']}: {len(plan['train']) - plan['replayed']} new or changed "
+              f"+ {plan['replayed']} replayed pairs")
+        max_steps = math.ceil(epochs * len(plan["train"]) / BATCH_SIZE)
+
+    with step("load_model"):
+        model, tokenizer = load_model()
+        callbacks = []
+        if plan["mode"] == "incremental":
+            parent_dir = directory / manifest["run_id"]
+            model = PeftModel.from_pretrained(model, parent_dir / "adapter", is_trainable=True)
+            if (parent_dir / "optimizer.pt").exists():
+                callbacks.append(_restore_optimizer_callback(parent_dir / "optimizer.pt"))
+
+    with step("tokenize"):
+        trainer = build_trainer(model, tokenizer, {"train": plan["train"], "test": splits["test"]},
+                                max_steps=max_steps, callbacks=callbacks)
+    start = time.perf_counter()
+    with step("train"):
+        result = trainer.train()
+    seconds = time.perf_counter() - start
+    with step("eval"):
+        eval_loss = trainer.evaluate()["eval_loss"]
+    print(f"Trained {max_steps} steps in {seconds:.1f}s, eval loss {eval_loss:.4f}")
+
+    import torch
+
+    run_dir = directory / run_id
+    with step("save"):
+        trainer.save_model(str(run_dir / "adapter"))
+        torch.save(trainer.optimizer.state_dict(), run_dir / "optimizer.pt")
+        record = {
+            "run_id": run_id, "parent": manifest["run_id"] if plan["mode"] == "incremental" else None,
+            "mode": plan["mode"], "reason": plan["reason"], "base_model": MODEL_CHECKPOINT,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "dataset": hashlib.sha256(Path(dataset_file).read_bytes()).hexdigest(),
+            "new": len(diff["new"]), "changed": len(diff["changed"]), "removed": len(diff["removed"]),
+            "trained_pairs": len(plan["train"]), "replayed": plan["replayed"], "steps": max_steps,
+            "train_loss": result.training_loss, "eval_loss": eval_loss, "seconds": seconds,
+            "adapter": str(run_dir / "adapter"),
+        }
+        with open(run_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump({**record, "pairs": {question_key(pair["question"]): answer_hash(pair) for pair in pairs}},
+                      f, indent=1)
+        # The lineage line is written last: a run only becomes the parent of the next once it is complete.
+        with open(directory / "lineage.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    print(f"Adapter saved to {run_dir / 'adapter'}")
+    return record
+
+
+def print_lineage(directory: str | Path = CONTINUAL_DIR) -> None:
+    lineage = Path(directory) / "lineage.jsonl"
+    if not lineage.exists():
+        print("No continual training runs yet.")
+        return
+    with open(lineage, encoding="utf-8") as f:
+        for line in f:
+            run = json.loads(line)
+            origin = f"from {run['parent']}" if run["parent"] else f"full ({run['reason']})"
+            print(f"{run['run_id']}  {origin:<32} +{run['new']} new ~{run['changed']} changed -{run['removed']} "
+                  f"removed, {run['trained_pairs']} pairs ({run['replayed']} replayed), {run['steps']} steps, "
+                  f"{run['seconds']:.0f}s, eval loss {run['eval_loss']:.4f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fine-tune the GPFS adapter on new and changed Q&A pairs only.")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--replay-ratio", type=float, default=1.0, help="unchanged pairs replayed per new pair")
+    parser.add_argument("--epochs", type=int, default=3, help="passes over the new, changed and replayed pairs")
+    parser.add_argument("--full", action="store_true", help="retrain from scratch and start a new lineage")
+    parser.add_argument("--lineage", action="store_true", help="print the run history and exit")
+    args = parser.parse_args()
+
+    if args.lineage:
+        print_lineage()
+    else:
+        train_continual(args.dataset, replay_ratio=args.replay_ratio, epochs=args.epochs, full=args.full)
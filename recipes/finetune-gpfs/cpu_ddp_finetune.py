@@ -0,0 +1,232 @@
+"""
+Data-parallel LoRA fine-tuning on CPU-only machines.
+
+run_gpfs_finetune.py loads the model with 4-bit bitsandbytes and trains with
+`bf16=True`, both of which need a CUDA GPU. This module trains the same LoRA
+adapter on CPUs instead:
+
+- N worker processes are started, joined with `torch.distributed` over the
+  gloo backend; each trains on its own shard of the data and
+  `DistributedDataParallel` all-reduces the gradients. Only the LoRA
+  parameters require gradients, so only they are synchronized.
+- Each process gets its own set of cores (`sched_setaffinity`) and a matching
+  `torch.set_num_threads`, so the processes don't oversubscribe the machine.
+- bitsandbytes' 4-bit kernels need CUDA, so the frozen base weights are kept
+  in bfloat16 instead, which halves memory against float32 and runs on any
+  CPU (fast on CPUs with AVX512-BF16/AMX). The LoRA weights stay in float32.
+
+    python cpu_ddp_finetune.py train --processes 4
+    python cpu_ddp_finetune.py benchmark --max-processes 8
+
+`benchmark` measures training samples/sec for 1 to N processes on a tiny
+randomly initialized model with Granite's architecture and vocabulary, so
+it runs in seconds and needs no download.
+"""
+import argparse
+import os
+import socket
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+LORA_SETTINGS = {"r": 16, "lora_alpha": 32, "target_modules": ["q_proj", "v_proj"],
+                 "lora_dropout": 0.1, "bias": "none"}
+
+
+def tiny_granite(seed: int = 0):
+    """A small randomly initialized model shaped like granite-3.1 (same vocabulary and scaling)."""
+    from transformers import GraniteConfig, GraniteForCausalLM
+
+    torch.manual_seed(seed)
+    config = GraniteConfig(vocab_size=49155, hidden_size=256, intermediate_size=1024, num_hidden_layers=4,
+                           num_attention_heads=8, num_key_value_heads=4, embedding_multiplier=12.0,
+                           residual_multiplier=0.22, attention_multiplier=0.0078125, logits_scaling=8.0,
+                           tie_word_embeddings=True)
+    return GraniteForCausalLM(config)
+
+
+def load_cpu_model(checkpoint: str, dtype: torch.dtype = torch.bfloat16):
+    """Load the base model for CPU training, without bitsandbytes quantization."""
+    from transformers import AutoModelForCausalLM
+
+    return AutoModelForCausalLM.from_pretrained(checkpoint, dtype=dtype, trust_remote_code=True)
+
+
+def add_lora(model):
+    """Wrap the model with the same LoRA settings as run_gpfs_finetune.py, LoRA weights in float32."""
+    from peft import LoraConfig, get_peft_model
+
+    model = get_peft_model(model, LoraConfig(task_type="CAUSAL_LM", **LORA_SETTINGS))
+    for parameter in model.parameters():
+        if parameter.requires_grad:
+            parameter.data = parameter.data.float()
+    return model
+
+
+def _pin_threads(rank: int, world_size: int) -> int:
+    """Give this process an equal, disjoint share of the available cores; return its thread count."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    share = max(1, len(cores) // world_size)
+    if len(cores) >= world_size:
+        mine = cores[rank * share:(rank + 1) * share]
+        os.sched_setaffinity(0, mine)
+    torch.set_num_threads(share)
+    # Intra-op threads only; extra inter-op threads would compete for the same cores.
+    torch.set_num_interop_threads(1)
+    return share
+
+
+def _collate(examples: list[list[int]], pad_id: int) -> dict:
+    length = max(len(ids) for ids in examples)
+    input_ids = torch.full((len(examples), length), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(examples), length), dtype=torch.long)
+    for i, ids in enumerate(examples):
+        input_ids[i, :len(ids)] = torch.tensor(ids)
+        attention_mask[i, :len(ids)] = 1
+    labels = input_ids.masked_fill(attention_mask == 0, -100)
+    return {"input_ids": input_ids, "attention_mask": attention_mask, "labels": labels}
+
+
+def _worker(rank: int, world_size: int, port: int, job: dict, results) -> None:
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    threads = _pin_threads(rank, world_size)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        if job["model"] == "tiny":
+            base = tiny_granite().to(torch.bfloat16)
+        else:
+            base = load_cpu_model(job["model"])
+        model = add_lora(base)
+        # Parameters are identical on every rank (same seed or same checkpoint); DDP also broadcasts rank 0's.
+        ddp = torch.nn.parallel.DistributedDataParallel(model)
+        optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad], lr=job["learning_rate"])
+
+        examples = job["examples"]
+        batch_size = job["batch_size"]
+        # Every rank must run the same number of steps, or their gradient all-reduces stop pairing up and
+        # they deadlock, so each takes an equal-sized shard (the remainder is dropped each epoch).
+        shard_size = len(examples) // world_size
+        batches_per_epoch = shard_size // batch_size
+        if batches_per_epoch == 0:
+            raise RuntimeError(f"rank {rank}: a shard of {shard_size} examples holds no batch of {batch_size}")
+        generator = torch.Generator().manual_seed(0)
+        ddp.train()
+        steps_done, samples = 0, 0
+        started = None
+        while steps_done < job["max_steps"] + job["warmup_steps"]:
+            # Same permutation on every rank, each rank taking its own stride of it.
+            order = torch.randperm(len(examples), generator=generator).tolist()[rank::world_size][:shard_size]
+            for start in range(0, batches_per_epoch * batch_size, batch_size):
+                if steps_done == job["warmup_steps"]:
+                    dist.barrier()
+                    started = time.perf_counter()
+                batch = _collate([examples[i] for i in order[start:start + batch_size]], job["pad_id"])
+                with torch.autocast("cpu", dtype=torch.bfloat16):
+                    loss = ddp(**batch).loss
+                loss.backward()
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
+                steps_done += 1
+                if steps_done > job["warmup_steps"]:
+                    samples += batch_size
+                if rank == 0 and job["logging_steps"] and steps_done % job["logging_steps"] == 0:
+                    print(f"step {steps_done}: loss {loss.item():.4f}", flush=True)
+                if steps_done >= job["max_steps"] + job["warmup_steps"]:
+                    break
+        dist.barrier()
+        elapsed = time.perf_counter() - started
+
+        total = torch.tensor([samples], dtype=torch.long)
+        dist.all_reduce(total)
+        if rank == 0:
+            if job.get("output_dir"):
+                model.save_pretrained(job["output_dir"])
+            results.put({"processes": world_size, "threads_per_process": threads, "samples": int(total.item()),
+                         "seconds": elapsed, "samples_per_sec": total.item() / elapsed,
+                         "final_loss": loss.item()})
+    finally:
+        dist.destroy_process_group()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(processes: int, examples: list[list[int]], model: str = "tiny", pad_id: int = 0, max_steps: int = 100,
+        batch_size: int = 2, learning_rate: float = 2e-4, warmup_steps: int = 0, logging_steps: int = 10,
+        output_dir: str | None = None) -> dict:
+    """Train on `processes` CPU worker processes and return rank 0's throughput figures.
+
+    `batch_size` is per process, as `per_device_train_batch_size` is in
+    run_gpfs_finetune.py, so the global batch grows with the process count.
+    """
+    if len(examples) < processes * batch_size:
+        raise ValueError(f"{len(examples)} examples can't fill a batch of {batch_size} on each of "
+                         f"{processes} processes; use fewer processes or a smaller batch size")
+    job = {"model": model, "examples": examples, "pad_id": pad_id, "max_steps": max_steps,
+           "batch_size": batch_size, "learning_rate": learning_rate, "warmup_steps": warmup_steps,
+           "logging_steps": logging_steps, "output_dir": output_dir}
+    context = mp.get_context("spawn")
+    results = context.SimpleQueue()
+    mp.start_processes(_worker, args=(processes, _free_port(), job, results), nprocs=processes,
+                       join=True, start_method="spawn")
+    return results.get()
+
+
+def train(processes: int, max_steps: int = 100, output_dir: str = "./gpfs_results/final-cpu") -> dict:
+    """Fine-tune the GPFS adapter on CPU, with the data and split run_gpfs_finetune.py uses."""
+    from transformers import AutoTokenizer
+
+    from dataset_split import tokenize_splits
+    from run_gpfs_finetune import MODEL_CHECKPOINT, formatting_prompts_func, load_dataset
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_CHECKPOINT)
+    splits = load_dataset()
+    tokenized = tokenize_splits(splits, tokenizer, formatting_prompts_func, max_length=512)
+    examples = [example["input_ids"] for example in tokenized["train"]]
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    start = time.perf_counter()
+    result = run(processes, examples, model=MODEL_CHECKPOINT, pad_id=pad_id, max_steps=max_steps,
+                 output_dir=output_dir)
+    print(f"Training completed in {time.perf_counter() - start:.1f}s "
+          f"({result['samples_per_sec']:.2f} samples/sec on {processes} processes)")
+    print(f"Adapter saved to {output_dir}")
+    return result
+
+
+def benchmark(max_processes: int, steps: int = 20, sequence_length: int = 128, batch_size: int = 2) -> list[dict]:
+    """Measure samples/sec for 1 to `max_processes` processes on the tiny Granite-shaped model."""
+    generator = torch.Generator().manual_seed(0)
+    examples = torch.randint(1, 49155, (512, sequence_length), generator=generator).tolist()
+    counts = sorted({1, *[2 ** i for i in range(1, max_processes.bit_length())], max_processes})
+    rows = []
+    for processes in counts:
+        result = run(processes, examples, max_steps=steps, batch_size=batch_size, warmup_steps=2, logging_steps=0)
+        rows.append(result)
+        print(f"{processes:>3} processes x {result['threads_per_process']:>2} threads: "
+              f"{result['samples_per_sec']:>8.2f} samples/sec, "
+              f"speedup {result['samples_per_sec'] / rows[0]['samples_per_sec']:.2f}x", flush=True)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-parallel LoRA fine-tuning on CPU.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="fine-tune the GPFS adapter on CPU")
+    train_parser.add_argument("--processes", type=int, default=2)
+    train_parser.add_argument("--max-steps", type=int, default=100)
+    train_parser.add_argument("--output-dir", default="./gpfs_results/final-cpu")
+    benchmark_parser = commands.add_parser("benchmark", help="samples/sec for 1 to N processes on a tiny model")
+    benchmark_parser.add_argument("--max-processes", type=int, default=os.cpu_count())
+    benchmark_parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.processes, args.max_steps, args.output_dir)
+    else:
+        benchmark(args.max_processes, args.steps)
@@ -0,0 +1,163 @@
+"""
+Reproducible train/test splits and cached tokenization for the GPFS dataset.
+
+`dataset.train_test_split(test_size=0.2)` draws a new random split on every
+run, so two checkpoints are never evaluated on the same test set. Here each
+pair's split is derived from a hash of its question, so it doesn't depend
+on the order of the pairs or on which other pairs exist:
+
+    splits = split_dataset(pairs)                 # {"train": [...], "test": [...]}
+    tokenized = tokenize_splits(splits, tokenizer, formatting_prompts_func)
+
+With `stratify=True`, each source type (manual, markdown or yaml) gets its
+own share of test pairs. Assignments are saved to `gpfs_data/split/split.json`
+and never change once made; pairs added later are assigned so that each
+source type's test share stays close to `test_fraction`.
+
+Tokenized examples are cached next to the split, keyed by a hash of the
+formatted text, so growing the dataset only tokenizes the new pairs.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+SPLIT_DIR = Path("gpfs_data/split")
+
+
+def question_key(question: str) -> str:
+    """Hash of the question, ignoring case and whitespace differences."""
+    normalized = re.sub(r"\s+", " ", question).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def hash_fraction(key: str) -> float:
+    """Map a hex key to a number in [0, 1)."""
+    return int(key[:16], 16) / 16**16
+
+
+def source_type(pair: dict) -> str:
+    """The pair's `source_type` field, or a guess from how generate_qa_pairs.py builds pairs."""
+    if "source_type" in pair:
+        return pair["source_type"]
+    from generate_qa_pairs import MANUAL_QA_PAIRS
+
+    if any(pair["question"] == manual["question"] for manual in MANUAL_QA_PAIRS):
+        return "manual"
+    if "```yaml" in pair["answer"]:
+        return "yaml"
+    return "markdown"
+
+
+def assign_splits(pairs: list[dict], test_fraction: float = 0.2, stratify: bool = False,
+                  previous: dict | None = None) -> dict[str, str]:
+    """Return {question key: "train" or "test"}, keeping any `previous` assignments.
+
+    Without stratification a pair is in the test set when its hash falls
+    below `test_fraction`. With it, each source type tops up its test set
+    to round(test_fraction * size) from its new pairs, lowest hash first.
+    """
+    assignments = dict(previous or {})
+    new = [pair for pair in pairs if question_key(pair["question"]) not in assignments]
+    if not stratify:
+        for pair in new:
+            key = question_key(pair["question"])
+            assignments[key] = "test" if hash_fraction(key) < test_fraction else "train"
+        return assignments
+
+    strata = {}
+    for pair in pairs:
+        strata.setdefault(source_type(pair), []).append(question_key(pair["question"]))
+    new_keys = {question_key(pair["question"]) for pair in new}
+    for keys in strata.values():
+        tests = sum(1 for key in keys if assignments.get(key) == "test")
+        candidates = sorted((key for key in keys if key in new_keys), key=hash_fraction)
+        needed = max(0, round(test_fraction * len(keys)) - tests)
+        for i, key in enumerate(candidates):
+            assignments[key] = "test" if i < needed else "train"
+    return assignments
+
+
+def split_dataset(pairs: list[dict], directory: str | Path = SPLIT_DIR, test_fraction: float = 0.2,
+                  stratify: bool = True) -> dict[str, list[dict]]:
+    """Split pairs into train and test, reusing and extending the saved assignments."""
+    directory = Path(directory)
+    split_file = directory / "split.json"
+    previous = None
+    if split_file.exists():
+        with open(split_file, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["test_fraction"] == test_fraction and saved["stratify"] == stratify:
+            previous = saved["assignments"]
+        else:
+            print(f"Split settings changed; reassigning all pairs (was test_fraction={saved['test_fraction']}, "
+                  f"stratify={saved['stratify']})")
+
+    assignments = assign_splits(pairs, test_fraction, stratify, previous)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(split_file, "w", encoding="utf-8") as f:
+        json.dump({"test_fraction": test_fraction, "stratify": stratify, "assignments": assignments}, f, indent=1)
+
+    splits = {"train": [], "test": []}
+    for pair in pairs:
+        splits[assignments[question_key(pair["question"])]].append(pair)
+    return splits
+
+
+def tokenize_splits(splits: dict[str, list[dict]], tokenizer, format_fn, directory: str | Path = SPLIT_DIR,
+                    max_length: int | None = None) -> dict[str, list[dict]]:
+    """Tokenize each split as `{"input_ids": [...]}` examples, reusing cached token ids.
+
+    The cache file is per tokenizer; only texts that aren't in it yet are
+    tokenized, and the cache is rewritten only when something was added.
+    """
+    directory = Path(directory)
+    name = re.sub(r"[^\w.-]+", "_", getattr(tokenizer, "name_or_path", "") or type(tokenizer).__name__)
+    cache_file = directory / f"tokens-{name}.jsonl"
+    cache = {}
+    if cache_file.exists():
+        with open(cache_file, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                cache[entry["key"]] = entry["input_ids"]
+
+    added = 0
+    tokenized = {}
+    for split, pairs in splits.items():
+        examples = []
+        for pair in pairs:
+            text = format_fn(pair)
+            key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if key not in cache:
+                cache[key] = tokenizer(text)["input_ids"]
+                added += 1
+            input_ids = cache[key]
+            examples.append({"input_ids": input_ids[:max_length] if max_length else input_ids})
+        tokenized[split] = examples
+
+    if added:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as f:
+            for key, input_ids in cache.items():
+                f.write(json.dumps({"key": key, "input_ids": input_ids}) + "\n")
+    print(f"Tokenized {added} new examples, {sum(map(len, tokenized.values())) - added} from cache")
+    return tokenized
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Assign and save the train/test split of a Q&A dataset.")
+    parser.add_argument("dataset", nargs="?", default="gpfs_dataset.jsonl")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--no-stratify", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        pairs = [json.loads(line) for line in f if line.strip()]
+    splits = split_dataset(pairs, test_fraction=args.test_fraction, stratify=not args.no_stratify)
+    for split, split_pairs in splits.items():
+        counts = {}
+        for pair in split_pairs:
+            counts[source_type(pair)] = counts.get(source_type(pair), 0) + 1
+        print(f"{split}: {len(split_pairs)} pairs {counts}")
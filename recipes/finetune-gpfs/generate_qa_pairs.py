@@ -4,8 +4,11 @@ Uses rule-based extraction + templates for quick demo.
 """
 import json
 import re
+from contextlib import nullcontext
 from pathlib import Path
 
+from quality_filter import filter_pairs, print_report
+
 INPUT_FILE = Path("gpfs_data/extracted/gpfs_chunks.json")
 OUTPUT_FILE = Path("gpfs_dataset.jsonl")
 
@@ -168,12 +171,17 @@ def extract_qa_from_yaml(content: str, source: str) -> list[dict]:
     return qa_pairs
 
 
-def generate_dataset():
-    """Generate the complete Q&A dataset."""
+def generate_dataset(step=lambda name: nullcontext()):
+    """Generate the complete Q&A dataset.
+
+    `step(name)` returns a context manager wrapped around each sub-step, so
+    a caller such as gpfs_pipeline.py can time them.
+    """
     
     # Load extracted chunks
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
+    with step("load"):
+        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
     
     all_qa_pairs = []
     
@@ -181,39 +189,47 @@ def generate_dataset():
     all_qa_pairs.extend(MANUAL_QA_PAIRS)
     print(f"Added {len(MANUAL_QA_PAIRS)} manual Q&A pairs")
     
-    # Extract from markdown files
-    md_count = 0
-    for chunk in chunks:
-        if chunk['type'] == 'markdown':
-            pairs = extract_qa_from_readme(chunk['content'], chunk['source'])
-            all_qa_pairs.extend(pairs)
-            md_count += len(pairs)
-    print(f"Extracted {md_count} Q&A pairs from markdown")
-    
-    # Extract from YAML configs (limit to avoid too many similar examples)
-    yaml_count = 0
-    for chunk in chunks[:50]:  # Limit YAML examples
-        if chunk['type'] == 'yaml_config':
-            pairs = extract_qa_from_yaml(chunk['content'], chunk['source'])
-            all_qa_pairs.extend(pairs)
-            yaml_count += len(pairs)
-    print(f"Extracted {yaml_count} Q&A pairs from YAML configs")
+    with step("qa_gen"):
+        # Extract from markdown files
+        md_count = 0
+        for chunk in chunks:
+            if chunk['type'] == 'markdown':
+                pairs = extract_qa_from_readme(chunk['content'], chunk['source'])
+                all_qa_pairs.extend(pairs)
+                md_count += len(pairs)
+        print(f"Extracted {md_count} Q&A pairs from markdown")
+        
+        # Extract from YAML configs (limit to avoid too many similar examples)
+        yaml_count = 0
+        for chunk in chunks[:50]:  # Limit YAML examples
+            if chunk['type'] == 'yaml_config':
+                pairs = extract_qa_from_yaml(chunk['content'], chunk['source'])
+                all_qa_pairs.extend(pairs)
+                yaml_count += len(pairs)
+        print(f"Extracted {yaml_count} Q&A pairs from YAML configs")
     
     # Remove duplicates based on question similarity
-    seen_questions = set()
-    unique_pairs = []
-    for pair in all_qa_pairs:
-        q_key = pair['question'].lower()[:50]
-        if q_key not in seen_questions:
-            seen_questions.add(q_key)
-            unique_pairs.append(pair)
+    with step("dedup"):
+        seen_questions = set()
+        unique_pairs = []
+        for pair in all_qa_pairs:
+            q_key = pair['question'].lower()[:50]
+            if q_key not in seen_questions:
+                seen_questions.add(q_key)
+                unique_pairs.append(pair)
     
     print(f"\nTotal unique Q&A pairs: {len(unique_pairs)}")
     
+    # Drop or down-weight badge, link, HTML and table-heavy answers
+    with step("filter"):
+        unique_pairs, filter_report = filter_pairs(unique_pairs)
+    print_report(filter_report)
+    
     # Save as JSONL
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        for pair in unique_pairs:
-            f.write(json.dumps(pair) + '\n')
+    with step("save"):
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            for pair in unique_pairs:
+                f.write(json.dumps(pair) + '\n')
     
     print(f"Saved to: {OUTPUT_FILE}")
     
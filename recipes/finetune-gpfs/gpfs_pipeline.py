@@ -0,0 +1,280 @@
+"""
+Run the whole GPFS workflow as one pipeline, with a timing report.
+
+The three scripts (collect_gpfs_data.py, generate_qa_pairs.py and
+run_gpfs_finetune.py) are run in order as the stages `collect`,
+`generate` and `finetune`, with `index` (the BM25 index of bm25_index.py)
+built after `collect`. Like `make`, a stage is skipped when its outputs
+exist and none of its inputs (its script and the files it reads) changed
+since it last ran. Inputs are compared by content hash, so a stage that
+reruns but writes identical output doesn't force the next stage to rerun.
+
+Each stage and its sub-steps (clone, walk, extract, qa_gen, dedup,
+filter, tokenize, train, eval, ...) are timed. `--profile` adds a cProfile
+of each stage (the hottest functions go in the report, the full profile in
+a `.prof` file) and `--trace-memory` records peak Python heap use with
+tracemalloc. Every run writes a JSON report to `pipeline_reports/` and is
+compared with the previous run, so regressions stand out:
+
+    python gpfs_pipeline.py                    # rebuild what changed
+    python gpfs_pipeline.py --force generate   # rerun a stage even if it is up to date
+    python gpfs_pipeline.py --profile --trace-memory
+"""
+import argparse
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+RECIPE_DIR = Path(__file__).resolve().parent
+STATE_FILE = Path("gpfs_pipeline_state.json")
+REPORTS_DIR = Path("pipeline_reports")
+
+# Flag stage and step times that grew by more than this fraction since the previous run.
+REGRESSION_THRESHOLD = 0.2
+
+
+def run_collect(step):
+    import collect_gpfs_data
+    collect_gpfs_data.collect_all_data(step=step)
+
+
+def run_generate(step):
+    import generate_qa_pairs
+    generate_qa_pairs.generate_dataset(step=step)
+
+
+def run_index(step):
+    import bm25_index
+    with step("load"):
+        with open(bm25_index.CHUNKS_FILE, encoding="utf-8") as f:
+            chunks = json.load(f)
+    with step("index"):
+        stats = bm25_index.BM25Index.open().update(chunks)
+    print(f"BM25 index: {stats['added']} added, {stats['removed']} removed, {stats['documents']} documents")
+
+
+def run_finetune(step):
+    import run_gpfs_finetune
+    run_gpfs_finetune.main(step=step)
+
+
+STAGES = [
+    {"name": "collect", "run": run_collect,
+     "inputs": ["collect_gpfs_data.py"],
+     "outputs": ["gpfs_data/extracted/gpfs_chunks.json"]},
+    {"name": "index", "run": run_index,
+     "inputs": ["bm25_index.py", "gpfs_data/extracted/gpfs_chunks.json"],
+     "outputs": ["gpfs_data/bm25/meta.json"]},
+    {"name": "generate", "run": run_generate,
+     "inputs": ["generate_qa_pairs.py", "quality_filter.py", "gpfs_data/extracted/gpfs_chunks.json"],
+     "outputs": ["gpfs_dataset.jsonl"]},
+    {"name": "finetune", "run": run_finetune,
+     "inputs": ["run_gpfs_finetune.py", "streaming_generate.py", "dataset_split.py",
+                "gpfs_dataset.jsonl"],
+     "outputs": ["gpfs_results/final"]},
+]
+
+
+def hash_inputs(paths: list[str]) -> str | None:
+    """Hash the contents of the input files; None if any of them is missing."""
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        if not path.exists():
+            return None
+        digest.update(str(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class StageReport:
+    """Timing, profile and memory figures for one stage."""
+
+    def __init__(self, name: str, profile: bool, trace_memory: bool):
+        self.name = name
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.data = {"name": name, "status": "ran", "seconds": 0.0, "steps": {}}
+
+    @contextmanager
+    def step(self, name: str):
+        """Time a sub-step; repeated steps (such as per-repo extraction) add up."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            step = self.data["steps"].setdefault(name, {"seconds": 0.0, "calls": 0})
+            step["seconds"] += time.perf_counter() - started
+            step["calls"] += 1
+
+    def run(self, fn, profile_path: Path) -> None:
+        profiler = cProfile.Profile() if self.profile else None
+        if self.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            if profiler is not None:
+                profiler.runcall(fn, self.step)
+            else:
+                fn(self.step)
+        except BaseException as e:
+            self.data["status"] = "failed"
+            self.data["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.data["seconds"] = time.perf_counter() - started
+            self.data["cpu_seconds"] = time.process_time() - cpu_started
+            # ru_maxrss is in kilobytes on Linux; it is the peak for the whole process so far.
+            self.data["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.data["python_heap_peak_mb"] = peak / 2**20
+            if profiler is not None:
+                profile_path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(profile_path)
+                self.data["profile"] = str(profile_path)
+                self.data["hotspots"] = hotspots(profiler)
+
+
+def hotspots(profiler: cProfile.Profile, limit: int = 15) -> list[dict]:
+    """The functions with the most cumulative time in a profile."""
+    stats = pstats.Stats(profiler).stats
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.items():
+        rows.append({"function": f"{Path(filename).name}:{line}({function})", "calls": calls,
+                     "total_seconds": total, "cumulative_seconds": cumulative})
+    return sorted(rows, key=lambda row: row["cumulative_seconds"], reverse=True)[:limit]
+
+
+def load_state() -> dict:
+    if STATE_FILE.exists():
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state: dict) -> None:
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def run_pipeline(force: list[str] = (), profile: bool = False, trace_memory: bool = False,
+                 stages: list[dict] = STAGES) -> dict:
+    """Run the stages that are out of date and return the run's report."""
+    state = load_state()
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    report = {"run": run_id, "started": time.time(), "stages": []}
+    started = time.perf_counter()
+
+    try:
+        for stage in stages:
+            name = stage["name"]
+            inputs_hash = hash_inputs(stage["inputs"])
+            outputs_exist = all(Path(path).exists() for path in stage["outputs"])
+            up_to_date = (outputs_exist and inputs_hash is not None
+                          and state.get(name, {}).get("inputs") == inputs_hash)
+            if up_to_date and name not in force and "all" not in force:
+                print(f"\n##### {name}: up to date, skipping #####")
+                report["stages"].append({"name": name, "status": "skipped", "seconds": 0.0, "steps": {}})
+                continue
+
+            print(f"\n##### {name} #####")
+            stage_report = StageReport(name, profile, trace_memory)
+            report["stages"].append(stage_report.data)
+            stage_report.run(stage["run"], REPORTS_DIR / run_id / f"{name}.prof")
+            # Hash again after the run: this stage may have written files it also reads.
+            state[name] = {"inputs": hash_inputs(stage["inputs"]), "finished": time.time()}
+            save_state(state)
+    finally:
+        report["seconds"] = time.perf_counter() - started
+        write_report(report)
+    return report
+
+
+def write_report(report: dict) -> Path:
+    REPORTS_DIR.mkdir(exist_ok=True)
+    path = REPORTS_DIR / f"{report['run']}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def previous_report(report: dict) -> dict | None:
+    """The most recent earlier report, if any."""
+    paths = sorted(p for p in REPORTS_DIR.glob("*.json") if p.stem < report["run"])
+    if not paths:
+        return None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(previous: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """List the stages and steps that got slower by more than `threshold` since `previous`."""
+    before = {}
+    for stage in previous["stages"]:
+        if stage["status"] == "ran":
+            before[stage["name"]] = stage["seconds"]
+            for step, timing in stage["steps"].items():
+                before[f"{stage['name']}.{step}"] = timing["seconds"]
+
+    regressions = []
+    for stage in current["stages"]:
+        if stage["status"] != "ran":
+            continue
+        timings = {stage["name"]: stage["seconds"],
+                   **{f"{stage['name']}.{step}": t["seconds"] for step, t in stage["steps"].items()}}
+        for name, seconds in timings.items():
+            old = before.get(name)
+            # Ignore sub-10ms timings, which are mostly noise.
+            if old and seconds > 0.01 and seconds > old * (1 + threshold):
+                regressions.append(f"{name}: {old:.2f}s -> {seconds:.2f}s (+{seconds / old - 1:.0%})")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"\n=== Pipeline report ({report['seconds']:.1f}s) ===")
+    for stage in report["stages"]:
+        extra = ""
+        if "python_heap_peak_mb" in stage:
+            extra += f", heap peak {stage['python_heap_peak_mb']:.1f} MB"
+        if "max_rss_mb" in stage:
+            extra += f", max RSS {stage['max_rss_mb']:.0f} MB"
+        print(f"{stage['name']:<10} {stage['status']:<8} {stage['seconds']:>8.2f}s{extra}")
+        for step, timing in stage["steps"].items():
+            print(f"  {step:<14} {timing['seconds']:>8.2f}s  x{timing['calls']}")
+        for row in stage.get("hotspots", [])[:5]:
+            print(f"    {row['cumulative_seconds']:>8.2f}s  {row['function']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the GPFS data collection and fine-tuning pipeline.")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="rerun these stages even if up to date; with no names, rerun all")
+    parser.add_argument("--profile", action="store_true", help="cProfile each stage that runs")
+    parser.add_argument("--trace-memory", action="store_true", help="record peak Python heap use with tracemalloc")
+    args = parser.parse_args()
+
+    # The scripts use paths relative to the recipe directory.
+    os.chdir(RECIPE_DIR)
+    force = ["all"] if args.force == [] else args.force or []
+    report = run_pipeline(force=force, profile=args.profile, trace_memory=args.trace_memory)
+    print_report(report)
+    previous = previous_report(report)
+    if previous is not None:
+        regressions = compare(previous, report)
+        print(f"\nCompared with run {previous['run']}: "
+              + ("no regressions" if not regressions else f"{len(regressions)} slower"))
+        for line in regressions:
+            print(f"  SLOWER {line}")
@@ -0,0 +1,205 @@
+"""
+Heuristic quality filter for the generated Q&A pairs.
+
+generate_qa_pairs.py only checks answer length, so sections made of
+badges, HTML, link lists or raw tables go straight into training and cost
+tokens without teaching the model anything. `filter_pairs` computes these
+features for all pairs at once:
+
+- `symbol_ratio`: punctuation and symbol characters per letter,
+- `duplicate_lines`: fraction of non-blank lines that repeat an earlier line,
+- `link_density`: fraction of characters in URLs and markdown links/images,
+- `html_density`: fraction of characters in HTML tags,
+- `table_lines`: fraction of non-blank lines that are markdown table rows,
+- `unbalanced_fences`: 1 if a ``` code fence is left open, and
+- `tokens`: estimated tokens for the question and answer together.
+
+The answers are joined into one byte array, so per-character counts
+are NumPy lookups summed per pair with `np.add.reduceat`, and regex and
+line features are aggregated per pair with `np.bincount`.
+
+Each feature has two thresholds. Above the first, the pair is
+down-weighted: its weight halves for each such feature, and pairs are kept
+with probability equal to their weight, chosen by a hash of the question
+so the result is reproducible. Above the second, the pair is dropped.
+
+    kept, report = filter_pairs(pairs)
+    print_report(report)
+
+or, on an existing dataset: `python quality_filter.py gpfs_dataset.jsonl --dry-run`.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+# feature: (down-weight above, drop above); None disables that level.
+THRESHOLDS = {
+    "symbol_ratio": (0.35, 0.8),
+    "duplicate_lines": (0.2, 0.5),
+    "link_density": (0.15, 0.4),
+    "html_density": (0.05, 0.2),
+    "table_lines": (0.5, 0.9),
+    "unbalanced_fences": (None, 0.5),
+    "tokens": (600, 1200),
+}
+
+# Byte patterns, since match offsets must line up with the packed byte array. None of them
+# can match SEPARATOR, so no match runs from one answer into the next.
+SEPARATOR = b"\n"
+LINK_RE = re.compile(rb"!?\[[^\]\n]*\]\([^)\n]*\)|https?://[^\s)>\]]+")
+HTML_RE = re.compile(rb"</?[a-zA-Z][^<>\n]*>")
+
+# Byte classes for the per-character counts; non-ASCII (UTF-8) bytes count as neither.
+_ALPHA = np.zeros(256, dtype=bool)
+_SYMBOL = np.zeros(256, dtype=bool)
+for _byte in range(128):
+    _char = chr(_byte)
+    _ALPHA[_byte] = _char.isalpha()
+    _SYMBOL[_byte] = _char.isprintable() and not (_char.isalnum() or _char.isspace())
+
+
+def _pack(texts: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray, bytes]:
+    """Join UTF-8 encoded texts with SEPARATOR; return the bytes as an array, the texts' start offsets
+    and lengths, and the raw bytes."""
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    starts = (np.concatenate([[0], np.cumsum(lengths + len(SEPARATOR))[:-1]]) if len(encoded)
+              else np.zeros(0, dtype=np.int64))
+    raw = SEPARATOR.join(encoded)
+    return np.frombuffer(raw, dtype=np.uint8), starts, lengths, raw
+
+
+def _per_text(counts: np.ndarray, starts: np.ndarray, total: int) -> np.ndarray:
+    """Sum a per-byte array over each text, allowing empty texts.
+
+    Each sum runs up to the next text's start, so it includes the separator
+    byte, which counts as neither a letter nor a symbol.
+    """
+    sums = np.zeros(len(starts), dtype=np.int64)
+    nonempty = np.flatnonzero(np.diff(np.append(starts, total)) > 0)
+    if len(nonempty):
+        sums[nonempty] = np.add.reduceat(counts, starts[nonempty])[:len(nonempty)]
+    return sums
+
+
+def _span_lengths(pattern: re.Pattern, raw: bytes, starts: np.ndarray) -> np.ndarray:
+    """Total length of the pattern's matches within each text."""
+    spans = np.array([m.span() for m in pattern.finditer(raw)], dtype=np.int64).reshape(-1, 2)
+    owners = np.searchsorted(starts, spans[:, 0], side="right") - 1
+    return np.bincount(owners, weights=spans[:, 1] - spans[:, 0], minlength=len(starts))
+
+
+def compute_features(pairs: list[dict]) -> dict[str, np.ndarray]:
+    """Compute the quality features for every pair, as one array per feature."""
+    answers = [pair["answer"] for pair in pairs]
+    data, starts, lengths, raw = _pack(answers)
+    sizes = lengths.astype(np.float64)
+    alpha = _per_text(_ALPHA[data], starts, len(data))
+    symbols = _per_text(_SYMBOL[data], starts, len(data))
+
+    # Line features: one entry per non-blank line, tagged with its pair's index.
+    line_owner, line_keys, table_rows, fence_lines = [], [], [], []
+    for i, answer in enumerate(answers):
+        for line in answer.splitlines():
+            line = line.strip()
+            if line:
+                line_owner.append(i)
+                line_keys.append(hash(line))
+                table_rows.append(line.startswith("|") and line.endswith("|"))
+                fence_lines.append(line.startswith("```"))
+    line_owner = np.array(line_owner, dtype=np.int64)
+    lines = np.bincount(line_owner, minlength=len(pairs))
+    pairs_and_lines = np.stack([line_owner, np.array(line_keys, dtype=np.int64)], axis=1).reshape(-1, 2)
+    unique_lines = np.bincount(np.unique(pairs_and_lines, axis=0)[:, 0], minlength=len(pairs))
+    tables = np.bincount(line_owner, weights=np.array(table_rows, dtype=np.float64), minlength=len(pairs))
+    fences = np.bincount(line_owner, weights=np.array(fence_lines, dtype=np.float64), minlength=len(pairs))
+
+    question_bytes = np.fromiter((len(pair["question"].encode("utf-8")) for pair in pairs),
+                                 dtype=np.float64, count=len(pairs))
+    return {
+        "symbol_ratio": symbols / np.maximum(alpha, 1),
+        "duplicate_lines": np.where(lines > 0, 1 - unique_lines / np.maximum(lines, 1), 0.0),
+        "link_density": _span_lengths(LINK_RE, raw, starts) / np.maximum(sizes, 1),
+        "html_density": _span_lengths(HTML_RE, raw, starts) / np.maximum(sizes, 1),
+        "table_lines": tables / np.maximum(lines, 1),
+        "unbalanced_fences": (fences % 2).astype(np.float64),
+        # About four bytes per token, as for the Granite tokenizer on English text.
+        "tokens": np.ceil((sizes + question_bytes) / 4),
+    }
+
+
+def _keep_fraction(question: str) -> float:
+    """A stable pseudo-random number in [0, 1) derived from the question."""
+    digest = hashlib.sha256(question.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def filter_pairs(pairs: list[dict], thresholds: dict = THRESHOLDS) -> tuple[list[dict], dict]:
+    """Drop or down-weight low-quality pairs; return the kept pairs and a report."""
+    features = compute_features(pairs)
+    weights = np.ones(len(pairs))
+    dropped = np.zeros(len(pairs), dtype=bool)
+    reasons = {}
+    for name, (soft, hard) in thresholds.items():
+        values = features[name]
+        if soft is not None:
+            breached = values > soft
+            weights[breached] *= 0.5
+            reasons[f"{name} > {soft}"] = int(breached.sum())
+        if hard is not None:
+            breached = values > hard
+            dropped |= breached
+            reasons[f"{name} > {hard} (dropped)"] = int(breached.sum())
+
+    draws = np.fromiter((_keep_fraction(pair["question"]) for pair in pairs), dtype=np.float64, count=len(pairs))
+    sampled_out = ~dropped & (draws >= weights)
+    keep = ~dropped & ~sampled_out
+    tokens = features["tokens"]
+    report = {
+        "pairs": len(pairs),
+        "kept": int(keep.sum()),
+        "dropped": int(dropped.sum()),
+        "down_weighted": int((~dropped & (weights < 1)).sum()),
+        "sampled_out": int(sampled_out.sum()),
+        "tokens": int(tokens.sum()),
+        "tokens_removed": int(tokens[~keep].sum()),
+        "reasons": {reason: count for reason, count in reasons.items() if count},
+    }
+    return [pair for pair, kept in zip(pairs, keep) if kept], report
+
+
+def print_report(report: dict) -> None:
+    share = report["tokens_removed"] / report["tokens"] if report["tokens"] else 0.0
+    print(f"Quality filter: kept {report['kept']} of {report['pairs']} pairs "
+          f"({report['dropped']} dropped, {report['sampled_out']} of {report['down_weighted']} "
+          f"down-weighted sampled out)")
+    print(f"  Removed ~{report['tokens_removed']} of ~{report['tokens']} tokens ({share:.0%})")
+    for reason, count in report["reasons"].items():
+        print(f"  {reason}: {count}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Filter a Q&A JSONL dataset with the quality heuristics.")
+    parser.add_argument("dataset", nargs="?", default="gpfs_dataset.jsonl")
+    parser.add_argument("--output", help="where to write the kept pairs (default: overwrite the dataset)")
+    parser.add_argument("--dry-run", action="store_true", help="only print the features and the report")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        pairs = [json.loads(line) for line in f if line.strip()]
+    if args.dry_run:
+        features = compute_features(pairs)
+        print(f"{'question':<50} " + " ".join(f"{name[:10]:>10}" for name in features))
+        for i, pair in enumerate(pairs):
+            print(f"{pair['question'][:50]:<50} " + " ".join(f"{values[i]:>10.2f}" for values in features.values()))
+    kept, report = filter_pairs(pairs)
+    print_report(report)
+    if not args.dry_run:
+        with open(Path(args.output or args.dataset), "w", encoding="utf-8") as f:
+            for pair in kept:
+                f.write(json.dumps(pair) + "\n")
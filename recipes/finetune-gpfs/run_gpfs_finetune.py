@@ -4,122 +4,184 @@ Uses PyTorch 2.9.1+cu128 for RTX 5070 Ti (Blackwell) support.
 """
 import timeit
 import json
+from contextlib import nullcontext
 from datasets import Dataset
+from dataset_split import split_dataset, tokenize_splits
 
-# Load GPFS dataset
-print('Loading GPFS dataset...')
-start_time = timeit.default_timer()
-
-qa_pairs = []
-with open('gpfs_dataset.jsonl', 'r', encoding='utf-8') as f:
-    for line in f:
-        qa_pairs.append(json.loads(line))
-
-dataset = Dataset.from_list(qa_pairs)
-split_dataset = dataset.train_test_split(test_size=0.2)
-print(f'Dataset loaded in {timeit.default_timer() - start_time:.1f}s')
-print(f'Training samples: {len(split_dataset["train"])}, Test samples: {len(split_dataset["test"])}')
-
-# Model loading
-print('\nLoading model...')
-start_time = timeit.default_timer()
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
-from peft import LoraConfig
-from trl import SFTTrainer, SFTConfig
-
-model_checkpoint = 'ibm-granite/granite-3.1-2b-instruct'
-tokenizer = AutoTokenizer.from_pretrained(model_checkpoint)
-if tokenizer.pad_token is None:
-    tokenizer.pad_token = tokenizer.eos_token
-
-# RTX 5070 Ti works with PyTorch 2.9.1+cu128
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_quant_type='nf4',
-    bnb_4bit_use_double_quant=True,
-    bnb_4bit_compute_dtype=torch.bfloat16
-)
-
-model = AutoModelForCausalLM.from_pretrained(
-    model_checkpoint,
-    quantization_config=bnb_config,
-    trust_remote_code=True
-)
-print(f'Model loaded in {timeit.default_timer() - start_time:.1f}s')
-
-# Sanity check - ask about GPFS before training
-print('\n=== Before Training ===')
-input_text = '<|start_of_role|>user<|end_of_role|>How do I check network connectivity in GPFS?<|end_of_text|>\n<|start_of_role|>assistant<|end_of_role|>'
-inputs = tokenizer(input_text, return_tensors='pt').to(model.device)
-outputs = model.generate(**inputs, max_new_tokens=150)
-print('Q: How do I check network connectivity in GPFS?')
-print('A:', tokenizer.decode(outputs[0], skip_special_tokens=True).split('assistant')[-1].strip())
-
-# Training setup
-print('\nSetting up training...')
+DATASET_FILE = 'gpfs_dataset.jsonl'
+MODEL_CHECKPOINT = 'ibm-granite/granite-3.1-2b-instruct'
+OUTPUT_DIR = './gpfs_results'
 
-def formatting_prompts_func(example):
-    # Format for granite-3.1 instruction format
-    return f"<|start_of_role|>user<|end_of_role|>{example['question']}<|end_of_text|>\n<|start_of_role|>assistant<|end_of_role|>{example['answer']}<|end_of_text|>"
-
-qlora_config = LoraConfig(
-    r=16,
-    lora_alpha=32,
-    target_modules=['q_proj', 'v_proj'],
-    lora_dropout=0.1,
-    bias='none'
-)
-
-training_args = SFTConfig(
-    output_dir='./gpfs_results',
-    learning_rate=2e-4,
-    per_device_train_batch_size=2,
-    per_device_eval_batch_size=2,
-    num_train_epochs=3,  # Multiple epochs since dataset is small
-    max_steps=100,  # Quick demo: 100 steps
-    logging_steps=10,
-    bf16=True,
-    report_to='none',
-    max_length=512,
-    save_steps=50,
-)
-
-trainer = SFTTrainer(
-    model=model,
-    args=training_args,
-    train_dataset=split_dataset['train'],
-    eval_dataset=split_dataset['test'],
-    processing_class=tokenizer,
-    peft_config=qlora_config,
-    formatting_func=formatting_prompts_func,
-)
-
-# Training
-print('\nStarting training...')
-start_time = timeit.default_timer()
-trainer.train()
-print(f'Training completed in {timeit.default_timer() - start_time:.1f}s')
-
-# Save the model
-trainer.save_model('./gpfs_results/final')
-print('Model saved to ./gpfs_results/final')
-
-# Evaluation - test with GPFS questions
-print('\n=== After Training ===')
-
-test_questions = [
+TEST_QUESTIONS = [
     "How do I check network connectivity in GPFS?",
     "What is mmdiag used for?",
     "How do I deploy the IBM Spectrum Scale CSI driver?",
 ]
 
-for question in test_questions:
-    input_text = f'<|start_of_role|>user<|end_of_role|>{question}<|end_of_text|>\n<|start_of_role|>assistant<|end_of_role|>'
-    inputs = tokenizer(input_text, return_tensors='pt').to(model.device)
-    outputs = model.generate(**inputs, max_new_tokens=200)
-    answer = tokenizer.decode(outputs[0], skip_special_tokens=True).split('assistant')[-1].strip()
-    print(f'\nQ: {question}')
-    print(f'A: {answer[:300]}...' if len(answer) > 300 else f'A: {answer}')
 
-print('\nDone! GPFS-tuned model saved to ./gpfs_results/final')
+def load_dataset(path=DATASET_FILE):
+    """Load the Q&A pairs and split them into train and test sets.
+
+    The split is keyed by a hash of each question and saved in gpfs_data/split,
+    so it is the same on every run and stays put as pairs are added.
+    """
+    print('Loading GPFS dataset...')
+    start_time = timeit.default_timer()
+
+    qa_pairs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            qa_pairs.append(json.loads(line))
+
+    splits = split_dataset(qa_pairs, test_fraction=0.2, stratify=True)
+    print(f'Dataset loaded in {timeit.default_timer() - start_time:.1f}s')
+    print(f'Training samples: {len(splits["train"])}, Test samples: {len(splits["test"])}')
+    return splits
+
+
+def load_model():
+    """Load the tokenizer and the 4-bit quantized base model."""
+    print('\nLoading model...')
+    start_time = timeit.default_timer()
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_CHECKPOINT)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    # RTX 5070 Ti works with PyTorch 2.9.1+cu128
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type='nf4',
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_compute_dtype=torch.bfloat16
+    )
+
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_CHECKPOINT,
+        quantization_config=bnb_config,
+        trust_remote_code=True
+    )
+    print(f'Model loaded in {timeit.default_timer() - start_time:.1f}s')
+    return model, tokenizer
+
+
+def formatting_prompts_func(example):
+    # Format for granite-3.1 instruction format
+    return f"<|start_of_role|>user<|end_of_role|>{example['question']}<|end_of_text|>\n<|start_of_role|>assistant<|end_of_role|>{example['answer']}<|end_of_text|>"
+
+
+def build_trainer(model, tokenizer, splits, max_steps=100, callbacks=None):
+    """Set up qLoRA training on the splits, tokenized with the on-disk cache.
+
+    A model that is already a PeftModel (such as a resumed adapter) is
+    trained as it is instead of getting a new LoRA adapter.
+    """
+    from peft import LoraConfig, PeftModel
+    from trl import SFTTrainer, SFTConfig
+
+    qlora_config = LoraConfig(
+        r=16,
+        lora_alpha=32,
+        target_modules=['q_proj', 'v_proj'],
+        lora_dropout=0.1,
+        bias='none'
+    )
+
+    training_args = SFTConfig(
+        output_dir=OUTPUT_DIR,
+        learning_rate=2e-4,
+        per_device_train_batch_size=2,
+        per_device_eval_batch_size=2,
+        num_train_epochs=3,  # Multiple epochs since dataset is small
+        max_steps=max_steps,  # Quick demo: 100 steps
+        logging_steps=10,
+        bf16=True,
+        report_to='none',
+        max_length=512,
+        save_steps=50,
+    )
+
+    tokenized = tokenize_splits(splits, tokenizer, formatting_prompts_func, max_length=training_args.max_length)
+
+    return SFTTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=Dataset.from_list(tokenized['train']),
+        eval_dataset=Dataset.from_list(tokenized['test']),
+        processing_class=tokenizer,
+        peft_config=None if isinstance(model, PeftModel) else qlora_config,
+        callbacks=callbacks,
+    )
+
+
+def main(step=lambda name: nullcontext()):
+    """Run the whole fine-tuning workflow.
+
+    `step(name)` returns a context manager wrapped around each sub-step, so
+    a caller such as gpfs_pipeline.py can time them.
+    """
+    # Answers are streamed as they are generated and stop at <|end_of_text|>
+    from streaming_generate import generate_answer
+
+    with step("load_dataset"):
+        splits = load_dataset()
+    with step("load_model"):
+        model, tokenizer = load_model()
+
+    # Sanity check - ask about GPFS before training
+    print('\n=== Before Training ===')
+    print('Q: How do I check network connectivity in GPFS?')
+    print('A: ', end='', flush=True)
+    with step("eval_before"):
+        generate_answer(model, tokenizer, 'How do I check network connectivity in GPFS?', max_new_tokens=150, echo=True)
+
+    # Training setup
+    print('\nSetting up training...')
+    with step("tokenize"):
+        trainer = build_trainer(model, tokenizer, splits)
+
+    # Training
+    print('\nStarting training...')
+    start_time = timeit.default_timer()
+    with step("train"):
+        trainer.train()
+    print(f'Training completed in {timeit.default_timer() - start_time:.1f}s')
+
+    # Save the model
+    with step("save"):
+        trainer.save_model(f'{OUTPUT_DIR}/final')
+    print(f'Model saved to {OUTPUT_DIR}/final')
+
+    # Evaluation - test with GPFS questions
+    print('\n=== After Training ===')
+    with step("eval"):
+        for question in TEST_QUESTIONS:
+            print(f'\nQ: {question}')
+            print('A: ', end='', flush=True)
+            # Stop generating once 300 characters have been shown rather than truncating afterwards
+            generate_answer(model, tokenizer, question, max_new_tokens=200, max_chars=300, echo=True)
+
+    print(f'\nDone! GPFS-tuned model saved to {OUTPUT_DIR}/final')
+    return trainer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fine-tune Granite on the GPFS dataset.")
+    parser.add_argument("--cpu-processes", type=int, default=0,
+                        help="train on CPU with this many data-parallel processes instead of on the GPU")
+    parser.add_argument("--continual", action="store_true",
+                        help="continue the last adapter on new and changed pairs (see continual_finetune.py)")
+    args = parser.parse_args()
+
+    if args.cpu_processes:
+        from cpu_ddp_finetune import train
+        train(args.cpu_processes, output_dir=f'{OUTPUT_DIR}/final-cpu')
+    elif args.continual:
+        from continual_finetune import train_continual
+        train_continual()
+    else:
+        main()
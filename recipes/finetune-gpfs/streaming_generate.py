@@ -0,0 +1,131 @@
+"""
+Streaming text generation for the GPFS fine-tuning checks.
+
+`model.generate` blocks until all `max_new_tokens` are produced, and the
+answer only appears once the whole sequence is decoded. `stream_generate`
+runs `generate` on a background thread with a `TextIteratorStreamer` and
+yields text as it is produced. Generation stops early when:
+
+- a stop sequence is generated (by default `<|end_of_text|>`, or the
+  model starting another `<|start_of_role|>` turn), or
+- the caller stops iterating, e.g. after printing enough of the answer.
+
+    for text in stream_generate(model, tokenizer, granite_prompt(question)):
+        print(text, end="", flush=True)
+"""
+import threading
+from typing import Iterator
+
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+STOP_SEQUENCES = ("<|end_of_text|>", "<|start_of_role|>")
+
+
+def granite_prompt(question: str) -> str:
+    """Wrap a question in the granite-3.1 chat format, ready for the assistant's answer."""
+    return (f"<|start_of_role|>user<|end_of_role|>{question}<|end_of_text|>\n"
+            f"<|start_of_role|>assistant<|end_of_role|>")
+
+
+class StopCriteria(StoppingCriteria):
+    """Stops `generate` once `cancel` is set or every sequence has produced a stop sequence.
+
+    Only the last few new tokens are decoded at each step: a stop sequence of
+    n characters spans at most n tokens.
+    """
+
+    def __init__(self, tokenizer, stop: tuple[str, ...], prompt_length: int, cancel: threading.Event):
+        self.tokenizer = tokenizer
+        self.stop = stop
+        self.prompt_length = prompt_length
+        self.window = max((len(s) for s in stop), default=0)
+        self.cancel = cancel
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if self.cancel.is_set():
+            return torch.ones(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        start = max(self.prompt_length, input_ids.shape[1] - self.window)
+        tails = self.tokenizer.batch_decode(input_ids[:, start:], skip_special_tokens=False)
+        done = [any(s in tail for s in self.stop) for tail in tails]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+def stream_generate(model, tokenizer, prompt: str, max_new_tokens: int = 200,
+                    stop: tuple[str, ...] = STOP_SEQUENCES, **generate_kwargs) -> Iterator[str]:
+    """Yield the generated text in pieces as the model produces it.
+
+    The stop sequences themselves are never yielded. Breaking out of the loop
+    (or calling `close()` on the generator) cancels generation at the next
+    token instead of running on to `max_new_tokens`. Errors raised by
+    `generate` are re-raised here.
+    """
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    # Special tokens are kept in the stream so stop sequences like <|end_of_text|> can be seen.
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=False)
+    cancel = threading.Event()
+    # Checked inside generate too, so a stop sequence doesn't cost any further tokens.
+    criteria = StoppingCriteriaList([StopCriteria(tokenizer, stop, inputs["input_ids"].shape[1], cancel)])
+    errors = []
+
+    def run():
+        try:
+            model.generate(**inputs, **generate_kwargs, max_new_tokens=max_new_tokens,
+                           streamer=streamer, stopping_criteria=criteria)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            streamer.end()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    # Hold back text that could be the start of a stop sequence split across tokens.
+    hold = max((len(s) for s in stop), default=1) - 1
+    buffer = ""
+    try:
+        for text in streamer:
+            buffer += text
+            positions = [i for i in (buffer.find(s) for s in stop) if i != -1]
+            if positions:
+                if min(positions):
+                    yield buffer[:min(positions)]
+                return
+            if len(buffer) > hold:
+                yield buffer[:len(buffer) - hold]
+                buffer = buffer[len(buffer) - hold:]
+        if buffer:
+            yield buffer
+    finally:
+        cancel.set()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def generate_answer(model, tokenizer, question: str, max_new_tokens: int = 200,
+                    max_chars: int | None = None, echo: bool = False) -> str:
+    """Generate an answer to a question, stopping at `<|end_of_text|>`.
+
+    With `max_chars`, generation is cancelled as soon as that much text has
+    been produced. With `echo=True` the answer is printed as it streams.
+    """
+    pieces = []
+    length = 0
+    stream = stream_generate(model, tokenizer, granite_prompt(question), max_new_tokens=max_new_tokens)
+    try:
+        for text in stream:
+            if max_chars is not None and length + len(text) >= max_chars:
+                text = text[:max_chars - length]
+            pieces.append(text)
+            length += len(text)
+            if echo:
+                print(text, end="", flush=True)
+            if max_chars is not None and length >= max_chars:
+                break
+    finally:
+        stream.close()
+    if echo:
+        print()
+    return "".join(pieces).strip()